@@ -0,0 +1,100 @@
+"""Store pattern categorical columns as enums
+
+Revision ID: 2dc973b26b4c
+Revises: 007245457eda
+Create Date: 2026-10-19 18:46:49.689340
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '2dc973b26b4c'
+down_revision: Union[str, None] = '007245457eda'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# The labels as of this revision, later ones are added by their migrations
+ENUMS = {
+    'brand': ('patternbrand', ['Fibre Mood', 'Other', 'Seamwork', 'Katia', 'Burda', 'Patrones']),
+    'version': ('patternversion', ['Paper', 'Digital']),
+    'for_who': ('patternforwho', ['Baby', 'Kids', 'Men', 'Women', 'Pets', 'Unisex']),
+    'category': ('patterncategory', ['Accessories', 'Bags', 'Blazers', 'Bodywarmer', 'Cardigans', 'Coats', 'DIY', 'Dresses', 'Hoodie', 'Jackets', 'Jumpers', 'Jumpsuits', 'Overalls', 'Overshirt', 'Pullovers', 'Shirts', 'Shorts', 'Skirts', 'Sweaters', 'Swimwear', 'T-shirts', 'Tops', 'Trousers']),
+}
+
+# The search vector reads the labels with CASE, a cast of an enum to text
+# is not immutable
+SEARCH_VECTOR = "setweight(to_tsvector('english', coalesce(title, '')), 'A') || setweight(to_tsvector('english', CASE brand WHEN 'Fibre Mood' THEN 'Fibre Mood' WHEN 'Other' THEN 'Other' WHEN 'Seamwork' THEN 'Seamwork' WHEN 'Katia' THEN 'Katia' WHEN 'Burda' THEN 'Burda' WHEN 'Patrones' THEN 'Patrones' ELSE '' END || ' ' || CASE category WHEN 'Accessories' THEN 'Accessories' WHEN 'Bags' THEN 'Bags' WHEN 'Blazers' THEN 'Blazers' WHEN 'Bodywarmer' THEN 'Bodywarmer' WHEN 'Cardigans' THEN 'Cardigans' WHEN 'Coats' THEN 'Coats' WHEN 'DIY' THEN 'DIY' WHEN 'Dresses' THEN 'Dresses' WHEN 'Hoodie' THEN 'Hoodie' WHEN 'Jackets' THEN 'Jackets' WHEN 'Jumpers' THEN 'Jumpers' WHEN 'Jumpsuits' THEN 'Jumpsuits' WHEN 'Overalls' THEN 'Overalls' WHEN 'Overshirt' THEN 'Overshirt' WHEN 'Pullovers' THEN 'Pullovers' WHEN 'Shirts' THEN 'Shirts' WHEN 'Shorts' THEN 'Shorts' WHEN 'Skirts' THEN 'Skirts' WHEN 'Sweaters' THEN 'Sweaters' WHEN 'Swimwear' THEN 'Swimwear' WHEN 'T-shirts' THEN 'T-shirts' WHEN 'Tops' THEN 'Tops' WHEN 'Trousers' THEN 'Trousers' ELSE '' END), 'B') || setweight(to_tsvector('english', coalesce(fabric, '')), 'C') || setweight(to_tsvector('english', coalesce(description, '')), 'D')"
+VARCHAR_SEARCH_VECTOR = "setweight(to_tsvector('english', coalesce(title, '')), 'A') || setweight(to_tsvector('english', coalesce(brand, '') || ' ' || coalesce(category, '')), 'B') || setweight(to_tsvector('english', coalesce(fabric, '')), 'C') || setweight(to_tsvector('english', coalesce(description, '')), 'D')"
+
+
+def _replace_columns(alterations: list[str], search_vector: str) -> None:
+    # The generated column depends on the altered ones, it is added back in
+    # the same statement so the table is rewritten once
+    op.drop_index('ix_pattern_search_vector', table_name='pattern', postgresql_using='gin')
+    op.drop_column('pattern', 'search_vector')
+    op.execute(
+        f"ALTER TABLE pattern {', '.join(alterations)}, "
+        f"ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ({search_vector}) STORED"
+    )
+    op.create_index('ix_pattern_search_vector', 'pattern', ['search_vector'], unique=False, postgresql_using='gin')
+
+
+def _check_labels() -> None:
+    # Values differing from a label only by case or surrounding spaces are
+    # normalized, any other one would abort the cast half way
+    bind = op.get_bind()
+    unknown = []
+    for column, (_, labels) in ENUMS.items():
+        bind.execute(
+            sa.text(
+                f"UPDATE pattern SET {column} = labels.label "
+                "FROM unnest(CAST(:labels AS varchar[])) AS labels(label) "
+                f"WHERE lower(trim({column})) = lower(labels.label) "
+                f"AND {column} <> labels.label"
+            ),
+            {"labels": labels},
+        )
+        values = bind.execute(
+            sa.text(
+                f"SELECT DISTINCT {column} FROM pattern "
+                f"WHERE {column} <> ALL(CAST(:labels AS varchar[])) ORDER BY 1"
+            ),
+            {"labels": labels},
+        ).scalars()
+        unknown += [f"{column} {value!r}" for value in values]
+    if unknown:
+        raise RuntimeError(
+            "Patterns have values that are not labels of the enums, update "
+            f"them before upgrading: {', '.join(unknown)}"
+        )
+
+
+def upgrade() -> None:
+    _check_labels()
+    for name, labels in ENUMS.values():
+        postgresql.ENUM(*labels, name=name).create(op.get_bind())
+    _replace_columns(
+        [
+            f"ALTER COLUMN {column} TYPE {name} USING {column}::{name}"
+            for column, (name, _) in ENUMS.items()
+        ],
+        SEARCH_VECTOR,
+    )
+
+
+def downgrade() -> None:
+    _replace_columns(
+        [
+            f"ALTER COLUMN {column} TYPE varchar USING {column}::text"
+            for column in ENUMS
+        ],
+        VARCHAR_SEARCH_VECTOR,
+    )
+    for name, _ in ENUMS.values():
+        postgresql.ENUM(name=name).drop(op.get_bind())
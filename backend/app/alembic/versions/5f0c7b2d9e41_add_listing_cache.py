@@ -0,0 +1,62 @@
+"""add listing cache
+
+Revision ID: 5f0c7b2d9e41
+Revises: 23e79aa1e936
+Create Date: 2026-10-19 18:12:31.418207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f0c7b2d9e41'
+down_revision: Union[str, None] = '23e79aa1e936'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'cachegeneration',
+        sa.Column('name', sqlmodel.sql.sqltypes.AutoString(length=64), nullable=False),
+        sa.Column('value', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('name'),
+    )
+    op.create_table(
+        'listingcache',
+        sa.Column('key', sqlmodel.sql.sqltypes.AutoString(length=64), nullable=False),
+        sa.Column('generation', sa.BigInteger(), nullable=False),
+        sa.Column('body', sa.LargeBinary(), nullable=False),
+        sa.PrimaryKeyConstraint('key'),
+        prefixes=['UNLOGGED'],
+    )
+    op.execute("INSERT INTO cachegeneration (name, value) VALUES ('pattern', 0)")
+    # A statement level trigger, a bulk write bumps the generation once
+    op.execute(
+        """
+        CREATE FUNCTION bump_pattern_generation() RETURNS trigger AS $$
+        BEGIN
+            UPDATE cachegeneration SET value = value + 1 WHERE name = 'pattern';
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER pattern_bump_generation
+        AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON pattern
+        FOR EACH STATEMENT EXECUTE FUNCTION bump_pattern_generation()
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER pattern_bump_generation ON pattern")
+    op.execute("DROP FUNCTION bump_pattern_generation()")
+    op.drop_table('listingcache')
+    op.drop_table('cachegeneration')
@@ -0,0 +1,120 @@
+"""Bump the pattern generation with a sequence
+
+Revision ID: de9d0971f47b
+Revises: 1d6c51f0205e
+Create Date: 2026-10-19 19:17:47.014355
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'de9d0971f47b'
+down_revision: Union[str, None] = '1d6c51f0205e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # A sequence instead of a row, nextval is not transactional, concurrent
+    # writers don't wait for each other. Starts after the last generation of
+    # the table, the shared listings cached with it are stale
+    op.execute("CREATE SEQUENCE pattern_generation")
+    op.execute(
+        "SELECT setval('pattern_generation', value + 1) "
+        "FROM cachegeneration WHERE name = 'pattern'"
+    )
+    op.execute("DROP TRIGGER pattern_bump_generation ON pattern")
+    op.execute("DROP FUNCTION bump_pattern_generation()")
+    # Bumped before the commit, so listings cached before the write are
+    # stale once it is visible, and again by the workers once notified of
+    # the commit, for listings cached while it was running. A statement
+    # changing no row bumps nothing. The transition table can't be read by
+    # the TRUNCATE trigger, whose condition is checked apart
+    op.execute(
+        """
+        CREATE FUNCTION bump_pattern_generation() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP <> 'TRUNCATE' THEN
+                IF NOT EXISTS (SELECT FROM changed_rows) THEN
+                    RETURN NULL;
+                END IF;
+            END IF;
+            PERFORM nextval('pattern_generation');
+            PERFORM pg_notify('pattern_generation', '');
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER pattern_bump_generation_inserts AFTER INSERT ON pattern
+        REFERENCING NEW TABLE AS changed_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION bump_pattern_generation()
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER pattern_bump_generation_updates AFTER UPDATE ON pattern
+        REFERENCING NEW TABLE AS changed_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION bump_pattern_generation()
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER pattern_bump_generation_deletes AFTER DELETE ON pattern
+        REFERENCING OLD TABLE AS changed_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION bump_pattern_generation()
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER pattern_bump_generation_truncates AFTER TRUNCATE ON pattern
+        FOR EACH STATEMENT EXECUTE FUNCTION bump_pattern_generation()
+        """
+    )
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.drop_table('cachegeneration')
+    # ### end Alembic commands ###
+
+
+def downgrade() -> None:
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.create_table('cachegeneration',
+    sa.Column('name', sa.VARCHAR(length=64), autoincrement=False, nullable=False),
+    sa.Column('value', sa.BIGINT(), autoincrement=False, nullable=False),
+    sa.PrimaryKeyConstraint('name', name=op.f('cachegeneration_pkey'))
+    )
+    # ### end Alembic commands ###
+    op.execute(
+        "INSERT INTO cachegeneration (name, value) "
+        "SELECT 'pattern', nextval('pattern_generation')"
+    )
+    op.execute("DROP TRIGGER pattern_bump_generation_truncates ON pattern")
+    op.execute("DROP TRIGGER pattern_bump_generation_deletes ON pattern")
+    op.execute("DROP TRIGGER pattern_bump_generation_updates ON pattern")
+    op.execute("DROP TRIGGER pattern_bump_generation_inserts ON pattern")
+    op.execute("DROP FUNCTION bump_pattern_generation()")
+    op.execute(
+        """
+        CREATE FUNCTION bump_pattern_generation() RETURNS trigger AS $$
+        BEGIN
+            UPDATE cachegeneration SET value = value + 1 WHERE name = 'pattern';
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER pattern_bump_generation
+        AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON pattern
+        FOR EACH STATEMENT EXECUTE FUNCTION bump_pattern_generation()
+        """
+    )
+    op.execute("DROP SEQUENCE pattern_generation")
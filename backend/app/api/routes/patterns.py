@@ -1,63 +1,244 @@
+import asyncio
+import hashlib
+import logging
+import mimetypes
+import os
+import shutil
+import tempfile
+import time
 import uuid
+from collections import defaultdict
 from datetime import datetime, timezone
-from typing import Any
+from functools import partial
+from typing import Annotated, Any, BinaryIO, TypeVar
 
-from fastapi import APIRouter, File, Form, HTTPException, Query, UploadFile
-from fastapi.responses import StreamingResponse
-from sqlmodel import func, select
-from sqlmodel.sql.expression import SelectOfScalar
+import sqlalchemy as sa
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Body,
+    Depends,
+    File,
+    Form,
+    Header,
+    HTTPException,
+    Query,
+    UploadFile,
+)
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response, StreamingResponse
+from pydantic import ValidationError
+from sqlmodel import Session, col, func, or_, select
 
 from app.api.deps import CurrentUser, SessionDep
 from app.core.config import settings
-from app.core.s3_storage import delete_minio_item, s3_client, upload_to_minio
+from app.core.database import engine
+from app.core.etag import etag_headers, etag_matches, not_modified, weak_etag
+from app.core.events import (
+    Event,
+    event_stream,
+    parse_token,
+    pattern_events,
+    replay,
+)
+from app.core.export import (
+    MEDIA_TYPES,
+    ExportFormat,
+    export_rows,
+    parquet_available,
+)
+from app.core.idempotency import (
+    REPLAYED_HEADER,
+    IdempotencyKeyInUseError,
+    IdempotencyKeyReusedError,
+    fingerprint,
+    idempotency_keys,
+)
+from app.core.listing_cache import listing_cache, listing_key
+from app.core.pattern_import import ImportFormat, run_import
+from app.core.responses import FastJSONResponse
+from app.core.search import search_match, search_query, search_rank
+from app.core.security import create_file_signature, verify_file_signature
+from app.core.sorting import (
+    InvalidCursorError,
+    PatternSort,
+    after_cursor,
+    encode_cursor,
+    sort_order,
+    sorted_column,
+)
+from app.core.storage import delete_file, get_storage, upload_file
+from app.core.suggest import suggestion_index
+from app.core.timing import TimedRoute, timed
+from app.core.tracing import in_current_context
+from app.core.zipstream import ZipEntry, ZipStream
 from app.models import (
+    PATTERN_FILE_FIELDS,
+    BulkItemResult,
+    BulkResults,
+    FileUrl,
     Message,
     Pattern,
+    PatternBrand,
+    PatternBulkUpdate,
+    PatternCategory,
     PatternCreate,
+    PatternForWho,
+    PatternImport,
+    PatternImportError,
+    PatternImportPublic,
     PatternPublic,
+    PatternsPartialPublic,
     PatternsPublic,
+    PatternSuggestions,
     PatternUpdate,
+    PatternVersion,
 )
 
-router = APIRouter(prefix="/patterns", tags=["patterns"])
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/patterns", tags=["patterns"], route_class=TimedRoute)
+
+# The count, the page of patterns or of some of their columns
+S = TypeVar("S", bound=sa.Select[Any])
 
 
 async def pattern_filtering(
     *,
-    title: str,
-    brand: str,
-    version: str,
-    for_who: str,
-    category: str,
-    difficulty: int,
-    fabric: str,
-    fabric_amount: float,
-    statement: SelectOfScalar[Pattern],
-) -> SelectOfScalar[Pattern]:
+    title: str | None,
+    brand: list[PatternBrand] | None,
+    version: PatternVersion | None,
+    for_who: list[PatternForWho] | None,
+    category: list[PatternCategory] | None,
+    difficulty: int | None,
+    fabric: str | None,
+    fabric_amount: float | None,
+    statement: S,
+    q: str | None = None,
+    difficulty_min: int | None = None,
+    difficulty_max: int | None = None,
+    fabric_amount_min: float | None = None,
+    fabric_amount_max: float | None = None,
+) -> S:
+    if q is not None and (query := search_query(q)) is not None:
+        statement = statement.where(search_match(query))
     if title is not None:
-        statement = statement.where(Pattern.title.ilike(f"%{title}%"))
-    if brand is not None:
-        statement = statement.where(Pattern.brand == brand)
+        statement = statement.where(col(Pattern.title).ilike(f"%{title}%"))
+    if brand:
+        statement = statement.where(col(Pattern.brand).in_(brand))
     if version is not None:
-        statement = statement.where(Pattern.version == version)
-    if for_who is not None:
-        statement = statement.where(Pattern.for_who == for_who)
-    if category is not None:
-        statement = statement.where(Pattern.category == category)
+        statement = statement.where(col(Pattern.version) == version)
+    if for_who:
+        statement = statement.where(col(Pattern.for_who).in_(for_who))
+    if category:
+        statement = statement.where(col(Pattern.category).in_(category))
     if difficulty is not None:
-        statement = statement.where(Pattern.difficulty == difficulty)
+        statement = statement.where(col(Pattern.difficulty) == difficulty)
+    if difficulty_min is not None:
+        statement = statement.where(col(Pattern.difficulty) >= difficulty_min)
+    if difficulty_max is not None:
+        statement = statement.where(col(Pattern.difficulty) <= difficulty_max)
     if fabric is not None:
-        statement = statement.where(Pattern.fabric == fabric)
+        statement = statement.where(col(Pattern.fabric) == fabric)
     if fabric_amount is not None:
-        statement = statement.where(Pattern.fabric_amount == fabric_amount)
+        statement = statement.where(col(Pattern.fabric_amount) == fabric_amount)
+    if fabric_amount_min is not None:
+        statement = statement.where(col(Pattern.fabric_amount) >= fabric_amount_min)
+    if fabric_amount_max is not None:
+        statement = statement.where(col(Pattern.fabric_amount) <= fabric_amount_max)
     return statement
 
 
-@router.post("/upload/")
+_SEARCH_DESCRIPTION = (
+    "Full-text search in the title, brand, category, fabric and description, "
+    "the words may be incomplete. Results are ranked by relevance"
+)
+
+
+def pattern_filters(
+    q: str | None = Query(default=None, description=_SEARCH_DESCRIPTION),
+    title: str | None = Query(default=None),
+    brand: list[PatternBrand] | None = Query(
+        default=None, description="Any of these brands, repeat it for several"
+    ),
+    version: PatternVersion | None = Query(default=None),
+    for_who: list[PatternForWho] | None = Query(
+        default=None, description="Any of these, repeat it for several"
+    ),
+    category: list[PatternCategory] | None = Query(
+        default=None, description="Any of these categories, repeat it for several"
+    ),
+    difficulty: int | None = Query(default=None),
+    difficulty_min: int | None = Query(default=None, ge=1, le=5),
+    difficulty_max: int | None = Query(default=None, ge=1, le=5),
+    fabric: str | None = Query(default=None),
+    fabric_amount: float | None = Query(
+        default=None,
+        deprecated=True,
+        description="Exact amount, use fabric_amount_min and fabric_amount_max",
+    ),
+    fabric_amount_min: float | None = Query(default=None, ge=0),
+    fabric_amount_max: float | None = Query(default=None, ge=0),
+) -> dict[str, Any]:
+    """The filters of the routes listing patterns, for `pattern_filtering`."""
+    return {
+        "q": q,
+        "title": title,
+        "brand": brand,
+        "version": version,
+        "for_who": for_who,
+        "category": category,
+        "difficulty": difficulty,
+        "difficulty_min": difficulty_min,
+        "difficulty_max": difficulty_max,
+        "fabric": fabric,
+        "fabric_amount": fabric_amount,
+        "fabric_amount_min": fabric_amount_min,
+        "fabric_amount_max": fabric_amount_max,
+    }
+
+
+PatternFilters = Annotated[dict[str, Any], Depends(pattern_filters)]
+
+
+def _replayed_response(
+    session: SessionDep,
+    current_user: CurrentUser,
+    idempotency_key: str,
+    request: str,
+    digest: str,
+) -> Response | None:
+    """The stored response of a request already processed with the key."""
+    try:
+        stored = idempotency_keys.claim(
+            session, current_user.id, idempotency_key, request, digest
+        )
+    except IdempotencyKeyInUseError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except IdempotencyKeyReusedError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if stored is None:
+        return None
+    return Response(
+        stored.body,
+        status_code=stored.status_code,
+        media_type="application/json",
+        headers={REPLAYED_HEADER: "true"},
+    )
+
+
+_IDEMPOTENCY_KEY_DESCRIPTION = (
+    "Unique per request, a retry with the same key gets the response of the "
+    "first request instead of processing it again"
+)
+
+
+@router.post("/upload/", response_model=PatternPublic)
 async def upload_files(
     *,
     session: SessionDep,
-    current_user: CurrentUser,  # noqa: ARG001
+    current_user: CurrentUser,
     id: uuid.UUID = Form(...),
     pattern_a0_file: UploadFile | None = File(None),
     pattern_a0_sa_file: UploadFile | None = File(None),
@@ -67,18 +248,13 @@ async def upload_files(
     pattern_a4_sa_file: UploadFile | None = File(None),
     pattern_instructables_file: UploadFile | None = File(None),
     icon: UploadFile | None = File(None),
-):
+    idempotency_key: str | None = Header(
+        default=None, max_length=255, description=_IDEMPOTENCY_KEY_DESCRIPTION
+    ),
+) -> Any:
     """
     Upload files to a pattern.
     """
-    pattern = session.get(Pattern, id)
-    if not pattern:
-        raise HTTPException(status_code=404, detail="Pattern not found")
-    if not current_user.is_superuser and (pattern.owner_id != current_user.id):
-        raise HTTPException(status_code=403, detail="Not enough permissions")
-
-    # Upload files to MinIO and store their IDs, excluding None values
-    file_ids = {}
     new_files = {
         "pattern_a0_file_id": pattern_a0_file,
         "pattern_a0_sa_file_id": pattern_a0_sa_file,
@@ -89,71 +265,399 @@ async def upload_files(
         "pattern_instructables_file_id": pattern_instructables_file,
         "icon": icon,
     }
+    if idempotency_key is not None:
+        parts = [str(id)]
+        for key, new_file in new_files.items():
+            if new_file:
+                parts += [key, new_file.filename or ""]
+        files = [new_file.file for new_file in new_files.values() if new_file]
+        digest = await run_in_threadpool(fingerprint, *parts, *files)
+        replayed = _replayed_response(
+            session, current_user, idempotency_key, "POST /patterns/upload/", digest
+        )
+        if replayed is not None:
+            return replayed
 
-    for key, new_file in new_files.items():
-        if new_file:
-            # Check if the pattern already has a value for this key
-            old_file_id = getattr(pattern, key, None)
-            if old_file_id:
-                # Call delete_minio_item with the old value
-                await delete_minio_item(old_file_id)
-
-            # Upload the new file and store its ID
-            file_ids[key] = await upload_to_minio(new_file, resize_as_icon=(key == "icon"))
-    pattern.sqlmodel_update(file_ids)
-    session.add(pattern)
-    session.commit()
-    session.refresh(pattern)
+    with idempotency_keys.released_on_error(session, current_user.id, idempotency_key):
+        pattern = session.get(Pattern, id)
+        if not pattern:
+            raise HTTPException(status_code=404, detail="Pattern not found")
+        if not current_user.is_superuser and (pattern.owner_id != current_user.id):
+            raise HTTPException(status_code=403, detail="Not enough permissions")
+
+        # Upload files to the storage and store their IDs, excluding None values
+        file_ids = {}
+        old_file_ids = []
+        for key, new_file in new_files.items():
+            if new_file:
+                file_ids[key] = await upload_file(
+                    new_file, resize_as_icon=(key == "icon")
+                )
+                if old_file_id := getattr(pattern, key, None):
+                    old_file_ids.append(old_file_id)
+        # The ETag of the pattern changes with it
+        extra_data = {"updated_at": datetime.now(tz=timezone.utc)}
+        pattern.sqlmodel_update(file_ids, update=extra_data)
+        session.add(pattern)
+        session.flush()
+        session.refresh(pattern)
+        body = PatternPublic.model_validate(pattern).model_dump_json().encode()
+        if idempotency_key is not None:
+            idempotency_keys.complete(
+                session, current_user.id, idempotency_key, 200, body
+            )
+        session.commit()
+
+    # Once the pattern refers to the new files, a failed upload keeps the old.
+    # The response is committed, old files that could not be deleted are
+    # unreferenced and removed by the storage GC
+    if old_file_ids:
+        try:
+            failed = await run_in_threadpool(get_storage().delete_many, old_file_ids)
+        except Exception:
+            failed = old_file_ids
+            logger.exception(f"Could not delete {len(failed)} stored files: {failed}")
+        else:
+            if failed:
+                logger.warning(f"Could not delete {len(failed)} stored files: {failed}")
+    return Response(body, media_type="application/json")
+
+
+# Stored files are never modified, a new upload gets a new key
+_IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+
+
+async def _stored_file_response(
+    filename: str,
+    *,
+    cache_control: str,
+    if_none_match: str | None,
+    download: bool = True,
+) -> Response:
+    # The key identifies the content, so it is a strong ETag by itself
+    headers = {"Cache-Control": cache_control, "ETag": f'"{filename}"'}
+    if etag_matches(headers["ETag"], if_none_match):
+        return Response(status_code=304, headers=headers)
+    media_type = "application/octet-stream"
+    if not download:
+        media_type = mimetypes.guess_type(filename)[0] or media_type
+    try:
+        return await run_in_threadpool(
+            get_storage().file_response,
+            filename,
+            filename if download else None,
+            media_type=media_type,
+            headers=headers,
+        )
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="File not found")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-    return pattern
+
+def _file_owner(session: SessionDep, filename: str) -> uuid.UUID:
+    """The owner of the pattern referencing a stored file, 404 if none does."""
+    owner_id = session.exec(
+        select(Pattern.owner_id)
+        .where(
+            or_(
+                *(col(getattr(Pattern, key)) == filename for key in PATTERN_FILE_FIELDS)
+            )
+        )
+        .limit(1)
+    ).first()
+    if owner_id is None:
+        raise HTTPException(status_code=404, detail="File not found")
+    return owner_id
 
 
 @router.get("/download/{filename}")
 async def download_file(
+    session: SessionDep,
     current_user: CurrentUser,  # noqa: ARG001
     filename: str,
+    if_none_match: str | None = Header(default=None),
+) -> Response:
+    """
+    Download a stored file.
+    """
+    _file_owner(session, filename)
+    return await _stored_file_response(
+        filename,
+        cache_control=f"private, max-age={_IMMUTABLE_MAX_AGE}, immutable",
+        if_none_match=if_none_match,
+    )
+
+
+@router.get("/icons/{filename}")
+async def read_icon(
+    session: SessionDep,
+    filename: str,
+    if_none_match: str | None = Header(default=None),
+) -> Response:
+    """
+    Get a pattern icon, public and cacheable by browsers and proxies.
+    """
+    # Only icons are public, not every stored file
+    if not session.exec(select(Pattern.id).where(Pattern.icon == filename)).first():
+        raise HTTPException(status_code=404, detail="File not found")
+    return await _stored_file_response(
+        filename,
+        cache_control=f"public, max-age={_IMMUTABLE_MAX_AGE}, immutable",
+        if_none_match=if_none_match,
+        download=False,
+    )
+
+
+@router.get("/download-url/{filename}", response_model=FileUrl)
+def create_download_url(
+    session: SessionDep,
+    current_user: CurrentUser,
+    filename: str,
+) -> Any:
+    """
+    Get a signed URL to download a stored file without the access token.
+    """
+    # The URL can be shared, it is only given to who can read the pattern
+    owner_id = _file_owner(session, filename)
+    if not current_user.is_superuser and (owner_id != current_user.id):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    expire_seconds = settings.FILE_URL_EXPIRE_MINUTES * 60
+    # Round the expiration up, so the URL stays the same for a while and
+    # browsers can reuse the file they cached for it
+    expires = (int(time.time()) // expire_seconds + 2) * expire_seconds
+    signature = create_file_signature(filename, expires)
+    return FileUrl(
+        url=f"{settings.API_V1_STR}/patterns/files/{filename}"
+        f"?expires={expires}&signature={signature}",
+        expires_at=datetime.fromtimestamp(expires, tz=timezone.utc),
+    )
+
+
+@router.get("/files/{filename}")
+async def download_signed_file(
+    session: SessionDep,
+    filename: str,
+    expires: int,
+    signature: str,
+    if_none_match: str | None = Header(default=None),
+) -> Response:
+    """
+    Download a stored file with a signed URL.
+    """
+    if not verify_file_signature(filename, expires, signature):
+        raise HTTPException(status_code=403, detail="Invalid or expired URL")
+    _file_owner(session, filename)
+    return await _stored_file_response(
+        filename,
+        cache_control=f"private, max-age={expires - int(time.time())}, immutable",
+        if_none_match=if_none_match,
+    )
+
+
+def _parse_range(range_header: str, size: int) -> tuple[int, int] | None:
+    """Parse a single `bytes=start-end` range, multiple ranges are ignored."""
+    unit, _, spec = range_header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        return None
+    start_str, _, end_str = spec.strip().partition("-")
+    try:
+        if start_str:
+            start = int(start_str)
+            end = int(end_str) if end_str else size - 1
+        else:
+            # Suffix range, the last N bytes
+            start = size - int(end_str)
+            end = size - 1
+    except ValueError:
+        return None
+    start = max(start, 0)
+    end = min(end, size - 1)
+    if start > end:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+    return start, end
+
+
+@router.get("/{id}/bundle.zip")
+def download_bundle(
+    session: SessionDep,
+    current_user: CurrentUser,
+    id: uuid.UUID,
+    range_header: str | None = Header(default=None, alias="Range"),
+    if_range: str | None = Header(default=None),
 ) -> StreamingResponse:
     """
-    Download a file from MinIO.
+    Download all the files of a pattern in a single ZIP archive.
     """
+    pattern = session.get(Pattern, id)
+    if not pattern:
+        raise HTTPException(status_code=404, detail="Pattern not found")
+    if not current_user.is_superuser and (pattern.owner_id != current_user.id):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+
+    storage = get_storage()
+    entries = []
+    file_ids = []
+    for key in PATTERN_FILE_FIELDS:
+        file_id = getattr(pattern, key)
+        if key == "icon" or not file_id:
+            continue
+        try:
+            stored = storage.stat(file_id)
+        except FileNotFoundError:
+            continue
+        entries.append(
+            ZipEntry(
+                name=f"{key.removesuffix('_file_id')}.{file_id.rsplit('.', 1)[-1]}",
+                size=stored.size,
+                modified=stored.last_modified,
+                open=partial(storage.iter_chunks, file_id),
+            )
+        )
+        file_ids.append(file_id)
+    if not entries:
+        raise HTTPException(status_code=404, detail="Pattern has no files")
     try:
-        s3_object = s3_client.get_object(Bucket=settings.S3_BUCKET, Key=filename)
-    except s3_client.exceptions.NoSuchKey:
-        raise HTTPException(status_code=404, detail="File not found")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-    # The file is returned as a stream, no disk storage needed
+        bundle = ZipStream(entries)
+    except ValueError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    # Stored files are immutable, the archive only changes with its files
+    etag = f'"{hashlib.sha256("|".join(file_ids).encode()).hexdigest()}"'
+    headers = {
+        "Content-Disposition": f"attachment; filename={pattern.id}.zip",
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+    }
+    byte_range = None
+    if range_header and (if_range is None or if_range == etag):
+        byte_range = _parse_range(range_header, bundle.size)
+    if byte_range is None:
+        headers["Content-Length"] = str(bundle.size)
+        return StreamingResponse(
+            bundle.iter_range(), media_type="application/zip", headers=headers
+        )
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{bundle.size}"
+    headers["Content-Length"] = str(end - start + 1)
     return StreamingResponse(
-        s3_object["Body"],
-        media_type="application/octet-stream",
-        headers={"Content-Disposition": f"attachment; filename={filename}"},
+        bundle.iter_range(start, end),
+        status_code=206,
+        media_type="application/zip",
+        headers=headers,
     )
 
 
-@router.get("/", response_model=PatternsPublic)
+_SORT_DESCRIPTION = (
+    "A column to sort by, with a leading - for the descending order. By "
+    "default the most relevant first when searching, then the latest updated"
+)
+_AFTER_DESCRIPTION = (
+    "The next cursor of the previous page, to get the page after it. Needs "
+    "a sort when searching"
+)
+
+
+def _listing_sort(q: str | None, sort: PatternSort | None) -> PatternSort | None:
+    """The sort of a listing, None when ranked by relevance."""
+    if sort is None and q is not None and search_query(q) is not None:
+        return None
+    return sort or "-updated_at"
+
+
+def _listing_order(q: str | None, sort: PatternSort | None) -> list[Any]:
+    """The most relevant patterns first when searching, then the latest."""
+    if sort is None and q is not None and (query := search_query(q)) is not None:
+        return [search_rank(query).desc(), *sort_order("-updated_at")]
+    return sort_order(sort or "-updated_at")
+
+
+def _listed_fields(fields: str | None) -> list[str]:
+    """The public fields requested with `fields=`, in their usual order."""
+    if fields is None:
+        return list(PatternPublic.model_fields)
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested - PatternPublic.model_fields.keys()
+    if unknown:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}"
+        )
+    # The id is always needed to link to the pattern
+    requested.add("id")
+    return [name for name in PatternPublic.model_fields if name in requested]
+
+
+@router.get("/", response_model=PatternsPublic | PatternsPartialPublic)
 async def read_patterns(
     *,
-    title: str = Query(default=None),
-    brand: str = Query(default=None),
-    version: str = Query(default=None),
-    for_who: str = Query(default=None),
-    category: str = Query(default=None),
-    difficulty: int = Query(default=None),
-    fabric: str = Query(default=None),
-    fabric_amount: float = Query(default=None),
+    filters: PatternFilters,
     session: SessionDep,
     current_user: CurrentUser,
     skip: int = 0,
     limit: int = 100,
+    sort: PatternSort | None = Query(default=None, description=_SORT_DESCRIPTION),
+    after: str | None = Query(default=None, description=_AFTER_DESCRIPTION),
     self_patterns: bool = False,
+    fields: str | None = Query(
+        default=None,
+        description="Comma separated fields to return, all by default, the id "
+        "is always returned",
+    ),
+    if_none_match: str | None = Header(default=None),
 ) -> Any:
     """
     Retrieve patterns.
     """
+    listing_sort = _listing_sort(filters["q"], sort)
+    condition = None
+    if after is not None:
+        if listing_sort is None:
+            raise HTTPException(
+                status_code=400, detail="A cursor needs a sort when searching"
+            )
+        try:
+            condition = after_cursor(listing_sort, after)
+        except InvalidCursorError as error:
+            raise HTTPException(status_code=400, detail=str(error))
+    # Only the requested columns are selected, and sent as rows encoded
+    # without building and validating models. The SQLAlchemy select always
+    # gives rows, even for a single column
+    listed_fields = _listed_fields(fields)
+    # The sorted column is also read for the cursor of the next page
+    unlisted = None
+    if listing_sort is not None and sorted_column(listing_sort) not in listed_fields:
+        unlisted = sorted_column(listing_sort)
+    columns = [getattr(Pattern, name) for name in listed_fields]
+    if unlisted is not None:
+        columns.append(getattr(Pattern, unlisted))
+    # Only the listings of the user's own patterns depend on the user
+    key = listing_key(
+        {**filters, "sort": listing_sort, "after": after},
+        skip=skip,
+        limit=limit,
+        owner_id=current_user.id if self_patterns else None,
+        fields=listed_fields,
+    )
+    with timed("cache"):
+        # The version of every listing, bumped by any write to the patterns
+        generation = listing_cache.generation(session)
+    etag = weak_etag(generation, key)
+    if etag_matches(etag, if_none_match):
+        return not_modified(etag)
+    headers = etag_headers(etag)
+    if listing_cache.enabled:
+        with timed("cache"):
+            body = listing_cache.get(session, generation, key)
+        if body is not None:
+            return Response(body, media_type="application/json", headers=headers)
 
     if not self_patterns:
         count_statement = select(func.count()).select_from(Pattern)
-        statement = select(Pattern).offset(skip).limit(limit)
+        statement = sa.select(*columns).offset(skip).limit(limit)
     else:
         count_statement = (
             select(func.count())
@@ -162,52 +666,466 @@ async def read_patterns(
         )
 
         statement = (
-            select(Pattern)
-            .where(Pattern.owner_id == current_user.id)
+            sa.select(*columns)
+            .where(col(Pattern.owner_id) == current_user.id)
             .offset(skip)
             .limit(limit)
         )
-    count_statement = await pattern_filtering(
-        title=title,
-        brand=brand,
-        version=version,
-        for_who=for_who,
-        category=category,
-        difficulty=difficulty,
-        fabric=fabric,
-        fabric_amount=fabric_amount,
-        statement=count_statement,
+    count_statement = await pattern_filtering(**filters, statement=count_statement)
+    with timed("count"):
+        count = session.exec(count_statement).one()
+
+    statement = await pattern_filtering(**filters, statement=statement)
+    if condition is not None:
+        statement = statement.where(condition)
+    with timed("page"):
+        rows = session.execute(
+            statement.order_by(*_listing_order(filters["q"], sort))
+        ).mappings()
+        patterns = [dict(row) for row in rows]
+
+    next_cursor = None
+    if listing_sort is not None and patterns and len(patterns) == limit:
+        next_cursor = encode_cursor(listing_sort, patterns[-1])
+    if unlisted is not None:
+        for pattern in patterns:
+            del pattern[unlisted]
+    response = FastJSONResponse(
+        {"data": patterns, "count": count, "next": next_cursor}, headers=headers
     )
-    count = session.exec(count_statement).one()
-
-    statement = await pattern_filtering(
-        title=title,
-        brand=brand,
-        version=version,
-        for_who=for_who,
-        category=category,
-        difficulty=difficulty,
-        fabric=fabric,
-        fabric_amount=fabric_amount,
-        statement=statement,
+    if listing_cache.enabled:
+        listing_cache.set(session, generation, key, bytes(response.body))
+    return response
+
+
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "content": {media_type: {} for media_type in MEDIA_TYPES.values()},
+            "description": "The patterns, a row per pattern",
+        }
+    },
+)
+async def export_patterns(
+    *,
+    filters: PatternFilters,
+    current_user: CurrentUser,
+    self_patterns: bool = False,
+    fields: str | None = Query(
+        default=None,
+        description="Comma separated fields to export, all by default, the id "
+        "is always exported",
+    ),
+    sort: PatternSort | None = Query(default=None, description=_SORT_DESCRIPTION),
+    format: ExportFormat = "ndjson",
+) -> Any:
+    """
+    Export the patterns matching the filters, without pagination.
+    """
+    if format == "parquet" and not parquet_available():
+        raise HTTPException(
+            status_code=400, detail="The Parquet export is not available"
+        )
+    columns = [getattr(Pattern, name) for name in _listed_fields(fields)]
+    statement = sa.select(*columns)
+    if self_patterns:
+        statement = statement.where(col(Pattern.owner_id) == current_user.id)
+    statement = await pattern_filtering(**filters, statement=statement)
+    # Streamed from a server-side cursor, a batch of rows at a time
+    return StreamingResponse(
+        export_rows(statement.order_by(*_listing_order(filters["q"], sort)), format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="patterns.{format}"'},
+    )
+
+
+@router.get("/suggest", response_model=PatternSuggestions)
+def suggest_patterns(
+    session: SessionDep,
+    current_user: CurrentUser,
+    prefix: str = Query(min_length=1, max_length=255),
+    limit: int = Query(default=10, ge=1, le=50),
+    self_patterns: bool = False,
+) -> Any:
+    """
+    Titles and fabrics starting with a prefix, for a search being typed, the
+    most frequent first.
+    """
+    # Scoped as the listing being searched
+    owner_id = current_user.id if self_patterns else None
+    with timed("refresh"):
+        suggestion_index.refresh(session, owner_id)
+    with timed("suggest"):
+        titles, fabrics = suggestion_index.suggest(prefix, limit, owner_id)
+    return PatternSuggestions(titles=titles, fabrics=fabrics)
+
+
+def _replay(token: str) -> list[Event] | None:
+    with Session(engine) as session:
+        return replay(session, *parse_token(token))
+
+
+# `<id>:<horizon>` as sent with the events, or an event id
+_RESUME_TOKEN = r"^\d{1,18}(:\d{1,18})?$"
+
+
+@router.get(
+    "/events",
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "content": {"text/event-stream": {}},
+            "description": "The `created`, `updated`, `uploaded` and `deleted` "
+            "events of the patterns, `reset` when they must be refetched",
+        }
+    },
+)
+async def stream_pattern_events(
+    *,
+    session: SessionDep,
+    current_user: CurrentUser,
+    self_patterns: bool = False,
+    after: str | None = Query(
+        default=None,
+        pattern=_RESUME_TOKEN,
+        description="Resume after the event with this id",
+    ),
+    last_event_id: str | None = Header(
+        default=None,
+        pattern=_RESUME_TOKEN,
+        description="Resume after the event with this id",
+    ),
+) -> Any:
+    """
+    Stream the changes of the patterns as Server-Sent Events.
+    """
+    owner_id = current_user.id if self_patterns else None
+    # Not held by the stream, the events are read with their own sessions
+    session.close()
+    try:
+        subscription = await run_in_threadpool(
+            pattern_events.subscribe, asyncio.get_running_loop(), owner_id
+        )
+    except TimeoutError:
+        raise HTTPException(status_code=503, detail="Pattern events unavailable")
+    resume = last_event_id if last_event_id is not None else after
+    replayed: list[Event] | None = []
+    if resume is not None:
+        replayed = await run_in_threadpool(_replay, resume)
+    return StreamingResponse(
+        event_stream(subscription, replayed),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+_IMPORT_FORMATS: dict[str, ImportFormat] = {
+    ".csv": "csv",
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+}
+
+
+def _spool(source: BinaryIO, suffix: str) -> tuple[str, int]:
+    # The upload is closed with the request, before the import runs
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as target:
+        try:
+            shutil.copyfileobj(source, target)
+        except BaseException:
+            os.unlink(target.name)
+            raise
+        return target.name, target.tell()
+
+
+@router.post("/import", response_model=PatternImportPublic, status_code=202)
+async def import_patterns(
+    *,
+    session: SessionDep,
+    current_user: CurrentUser,
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    format: ImportFormat | None = Query(
+        default=None, description="Guessed from the file name by default"
+    ),
+) -> Any:
+    """
+    Import the patterns of a CSV or NDJSON file in the background.
+
+    The import is polled with its id, the rows that could not be imported
+    are reported with their line in the file.
+    """
+    suffix = os.path.splitext(file.filename or "")[1].lower()
+    format = format or _IMPORT_FORMATS.get(suffix)
+    if format is None:
+        raise HTTPException(status_code=400, detail="Unknown import format")
+    path, size = await run_in_threadpool(_spool, file.file, suffix)
+    try:
+        job = PatternImport(owner_id=current_user.id, format=format, size=size)
+        session.add(job)
+        session.commit()
+        session.refresh(job)
+        background_tasks.add_task(in_current_context(run_import), job.id, path)
+    except BaseException:
+        # The import removes the file, it won't run
+        os.unlink(path)
+        raise
+    return job
+
+
+def _get_import(
+    session: SessionDep, current_user: CurrentUser, import_id: uuid.UUID
+) -> PatternImport:
+    job = session.get(PatternImport, import_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Import not found")
+    if not current_user.is_superuser and (job.owner_id != current_user.id):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    return job
+
+
+@router.get("/import/{import_id}", response_model=PatternImportPublic)
+def read_pattern_import(
+    session: SessionDep, current_user: CurrentUser, import_id: uuid.UUID
+) -> Any:
+    """
+    Get the progress of an import.
+    """
+    return _get_import(session, current_user, import_id)
+
+
+@router.get(
+    "/import/{import_id}/errors",
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "content": {MEDIA_TYPES["ndjson"]: {}},
+            "description": "The rejected rows, by line in the file",
+        }
+    },
+)
+def read_pattern_import_errors(
+    session: SessionDep, current_user: CurrentUser, import_id: uuid.UUID
+) -> Any:
+    """
+    Download the report of the rows that could not be imported.
+    """
+    job = _get_import(session, current_user, import_id)
+    statement = (
+        sa.select(col(PatternImportError.line), col(PatternImportError.detail))
+        .where(col(PatternImportError.import_id) == job.id)
+        .order_by(col(PatternImportError.line))
+    )
+    return StreamingResponse(
+        export_rows(statement, "ndjson"),
+        media_type=MEDIA_TYPES["ndjson"],
+        headers={"Content-Disposition": 'attachment; filename="import-errors.ndjson"'},
+    )
+
+
+# The multi-row statements of bulk requests stay well below the limit of
+# 65535 parameters per statement of Postgres
+_BULK_MAX_ITEMS = 1000
+BulkItems = Annotated[list[dict[str, Any]], Body(max_length=_BULK_MAX_ITEMS)]
+
+
+def _validation_errors(error: ValidationError) -> Any:
+    # As in the 422 responses of single requests
+    return jsonable_encoder(error.errors(include_url=False, include_context=False))
+
+
+@router.post("/bulk", response_model=BulkResults)
+def create_patterns_bulk(
+    *, session: SessionDep, current_user: CurrentUser, items: BulkItems
+) -> Any:
+    """
+    Create several patterns in a single transaction.
+
+    Each item is validated as a pattern to create, the valid ones are
+    inserted with a single statement and the others are reported with their
+    validation errors.
+    """
+    results = []
+    rows = []
+    for index, item in enumerate(items):
+        try:
+            pattern_in = PatternCreate.model_validate(item)
+        except ValidationError as e:
+            results.append(
+                BulkItemResult(index=index, status=422, detail=_validation_errors(e))
+            )
+            continue
+        pattern = Pattern.model_validate(
+            pattern_in, update={"owner_id": current_user.id}
+        )
+        rows.append(pattern.model_dump())
+        results.append(BulkItemResult(index=index, status=200, id=pattern.id))
+
+    if rows:
+        session.exec(sa.insert(Pattern).values(rows))
+        session.commit()
+    return BulkResults(data=results)
+
+
+def _update_from_values(
+    names: tuple[str, ...],
+    rows: list[tuple[uuid.UUID, dict[str, Any]]],
+    updated_at: datetime,
+) -> sa.Update:
+    """`UPDATE pattern ... FROM (VALUES ...)` setting the same columns of rows."""
+    table = Pattern.__table__  # type: ignore[attr-defined]
+    changes = sa.values(
+        *(sa.column(name, table.c[name].type) for name in ("id", *names)),
+        name="changes",
+    ).data([(id, *(data[name] for name in names)) for id, data in rows])
+    # Cast, the parameters of the VALUES are sent as text for the enum columns
+    values = {name: sa.cast(changes.c[name], table.c[name].type) for name in names}
+    return (
+        sa.update(table)
+        .where(table.c.id == changes.c.id)
+        .values({**values, "updated_at": updated_at})
+    )
+
+
+@router.patch("/bulk", response_model=BulkResults)
+def update_patterns_bulk(
+    *, session: SessionDep, current_user: CurrentUser, items: BulkItems
+) -> Any:
+    """
+    Update several patterns in a single transaction.
+
+    Each item has the `id` of a pattern and the fields to update. Items
+    updating the same fields are written with a single statement.
+    """
+    results: dict[int, BulkItemResult] = {}
+    updates = []
+    for index, item in enumerate(items):
+        try:
+            updates.append((index, PatternBulkUpdate.model_validate(item)))
+        except ValidationError as e:
+            results[index] = BulkItemResult(
+                index=index, status=422, detail=_validation_errors(e)
+            )
+
+    ids = [pattern_in.id for _, pattern_in in updates]
+    owners = dict(
+        session.exec(
+            select(Pattern.id, Pattern.owner_id).where(col(Pattern.id).in_(ids))
+        ).all()
+    )
+    # Items grouped by the fields they update
+    groups: dict[tuple[str, ...], list[tuple[uuid.UUID, dict[str, Any]]]] = defaultdict(
+        list
     )
-    patterns = session.exec(statement.order_by(Pattern.updated_at.desc())).all()
+    updated = set()
+    for index, pattern_in in updates:
+        id = pattern_in.id
+        owner_id = owners.get(id)
+        status, detail = 200, None
+        if owner_id is None:
+            status, detail = 404, "Pattern not found"
+        elif not current_user.is_superuser and owner_id != current_user.id:
+            status, detail = 403, "Not enough permissions"
+        elif id in updated:
+            status, detail = 400, "Pattern updated by an earlier item"
+        else:
+            updated.add(id)
+            data = pattern_in.model_dump(exclude_unset=True, exclude={"id"})
+            groups[tuple(sorted(data))].append((id, data))
+        results[index] = BulkItemResult(
+            index=index, status=status, id=id, detail=detail
+        )
+
+    updated_at = datetime.now(tz=timezone.utc)
+    for names, rows in groups.items():
+        session.exec(_update_from_values(names, rows, updated_at))
+    session.commit()
+    return BulkResults(data=[results[index] for index in sorted(results)])
+
+
+@router.delete("/bulk", response_model=BulkResults)
+def delete_patterns_bulk(
+    *,
+    session: SessionDep,
+    current_user: CurrentUser,
+    ids: Annotated[list[uuid.UUID], Body(max_length=_BULK_MAX_ITEMS)],
+) -> Any:
+    """
+    Delete several patterns and their stored files.
+    """
+    file_columns = [getattr(Pattern, key) for key in PATTERN_FILE_FIELDS]
+    patterns = {
+        row.id: row
+        for row in session.execute(
+            sa.select(col(Pattern.id), col(Pattern.owner_id), *file_columns).where(
+                col(Pattern.id).in_(ids)
+            )
+        )
+    }
+    results = []
+    deleted = set()
+    for index, id in enumerate(ids):
+        pattern = patterns.get(id)
+        if pattern is None:
+            status, detail = 404, "Pattern not found"
+        elif not current_user.is_superuser and pattern.owner_id != current_user.id:
+            status, detail = 403, "Not enough permissions"
+        else:
+            status, detail = 200, None
+            deleted.add(id)
+        results.append(BulkItemResult(index=index, status=status, id=id, detail=detail))
 
-    return PatternsPublic(data=patterns, count=count)
+    if deleted:
+        session.exec(sa.delete(Pattern).where(col(Pattern.id).in_(deleted)))
+        session.commit()
+        # Deleted in batches once the rows are gone, objects that could not
+        # be deleted are unreferenced and removed by the storage GC
+        file_ids = [
+            file_id
+            for id in deleted
+            for key in PATTERN_FILE_FIELDS
+            if (file_id := getattr(patterns[id], key))
+        ]
+        failed = get_storage().delete_many(file_ids)
+        if failed:
+            logger.warning(f"Could not delete {len(failed)} stored files: {failed}")
+    return BulkResults(data=results)
+
+
+def _pattern_etag(id: uuid.UUID, updated_at: datetime) -> str:
+    return weak_etag(id, updated_at.isoformat())
 
 
 @router.get("/{id}", response_model=PatternPublic)
 async def read_pattern(
-    session: SessionDep, current_user: CurrentUser, id: uuid.UUID
+    session: SessionDep,
+    current_user: CurrentUser,
+    id: uuid.UUID,
+    response: Response,
+    if_none_match: str | None = Header(default=None),
 ) -> Any:
     """
     Get pattern by ID.
     """
+    if if_none_match:
+        # Check the version before fetching the whole row
+        version = session.exec(
+            select(Pattern.owner_id, Pattern.updated_at).where(Pattern.id == id)
+        ).first()
+        if version is not None:
+            owner_id, updated_at = version
+            if current_user.is_superuser or owner_id == current_user.id:
+                etag = _pattern_etag(id, updated_at)
+                if etag_matches(etag, if_none_match):
+                    return not_modified(etag)
+
     pattern = session.get(Pattern, id)
     if not pattern:
         raise HTTPException(status_code=404, detail="Pattern not found")
     if not current_user.is_superuser and (pattern.owner_id != current_user.id):
         raise HTTPException(status_code=403, detail="Not enough permissions")
+    response.headers.update(etag_headers(_pattern_etag(pattern.id, pattern.updated_at)))
     return pattern
 
 
@@ -217,18 +1135,36 @@ async def create_pattern(
     session: SessionDep,
     current_user: CurrentUser,
     pattern_in: PatternCreate,
+    idempotency_key: str | None = Header(
+        default=None, max_length=255, description=_IDEMPOTENCY_KEY_DESCRIPTION
+    ),
 ) -> Any:
     """
     Create new pattern.
     """
-    pattern = Pattern.model_validate(
-        pattern_in,
-        update={"owner_id": current_user.id},
-    )
-    session.add(pattern)
-    session.commit()
-    session.refresh(pattern)
-    return pattern
+    if idempotency_key is not None:
+        digest = fingerprint(pattern_in.model_dump_json())
+        replayed = _replayed_response(
+            session, current_user, idempotency_key, "POST /patterns/", digest
+        )
+        if replayed is not None:
+            return replayed
+
+    with idempotency_keys.released_on_error(session, current_user.id, idempotency_key):
+        pattern = Pattern.model_validate(
+            pattern_in,
+            update={"owner_id": current_user.id},
+        )
+        session.add(pattern)
+        session.flush()
+        session.refresh(pattern)
+        body = PatternPublic.model_validate(pattern).model_dump_json().encode()
+        if idempotency_key is not None:
+            idempotency_keys.complete(
+                session, current_user.id, idempotency_key, 200, body
+            )
+        session.commit()
+    return Response(body, media_type="application/json")
 
 
 @router.put("/{id}", response_model=PatternPublic)
@@ -262,7 +1198,7 @@ async def delete_pattern(
     session: SessionDep, current_user: CurrentUser, id: uuid.UUID
 ) -> Message:
     """
-    Delete a pattern and its associated files in MinIO.
+    Delete a pattern and its associated stored files.
     """
     pattern = session.get(Pattern, id)
     if not pattern:
@@ -270,7 +1206,7 @@ async def delete_pattern(
     if not current_user.is_superuser and (pattern.owner_id != current_user.id):
         raise HTTPException(status_code=403, detail="Not enough permissions")
 
-    # List of file IDs to delete from MinIO
+    # List of file IDs to delete from the storage
     file_ids = [
         pattern.pattern_a0_file_id,
         pattern.pattern_a0_sa_file_id,
@@ -282,17 +1218,11 @@ async def delete_pattern(
         pattern.icon,
     ]
 
-    # Delete files from MinIO if they exist
+    # Delete stored files if they exist
     for file_id in file_ids:
         if file_id:
-            try:
-                print(f"Deleting file: {file_id}")
-                s3_client.delete_object(Bucket=settings.S3_BUCKET, Key=str(file_id))
-            except s3_client.exceptions.NoSuchKey:
-                # File does not exist in MinIO, continue
-                print(f"File {file_id} not found in MinIO, skipping deletion.")
-            except Exception as e:
-                raise HTTPException(status_code=500, detail=f"Error deleting file: {e}")
+            print(f"Deleting file: {file_id}")
+            await delete_file(file_id)
 
     # Delete the pattern from the database
     session.delete(pattern)
@@ -5,12 +5,13 @@ from pydantic import BaseModel
 
 from app.api.deps import SessionDep
 from app.core.security import get_password_hash
+from app.core.timing import TimedRoute
 from app.models import (
     User,
     UserPublic,
 )
 
-router = APIRouter(tags=["private"], prefix="/private")
+router = APIRouter(tags=["private"], prefix="/private", route_class=TimedRoute)
 
 
 class PrivateUserCreate(BaseModel):
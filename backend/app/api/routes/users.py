@@ -1,7 +1,7 @@
 import uuid
 from typing import Any
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
 from sqlmodel import col, delete, func, select
 
 from app import crud
@@ -11,7 +11,9 @@ from app.api.deps import (
     get_current_active_superuser,
 )
 from app.core.config import settings
+from app.core.etag import etag_headers, etag_matches, not_modified, weak_etag
 from app.core.security import get_password_hash, verify_password
+from app.core.timing import TimedRoute
 from app.models import (
     Item,
     Message,
@@ -26,7 +28,7 @@ from app.models import (
 )
 from app.utils import generate_new_account_email, send_email
 
-router = APIRouter(prefix="/users", tags=["users"])
+router = APIRouter(prefix="/users", tags=["users"], route_class=TimedRoute)
 
 
 @router.get(
@@ -118,11 +120,22 @@ def update_password_me(
 
 
 @router.get("/me", response_model=UserPublic)
-def read_user_me(current_user: CurrentUser) -> Any:
+def read_user_me(
+    current_user: CurrentUser,
+    response: Response,
+    if_none_match: str | None = Header(default=None),
+) -> Any:
     """
     Get current user.
     """
-    return current_user
+    # Users have no modification time, the version is their public fields,
+    # already fetched to authenticate the request
+    user = UserPublic.model_validate(current_user)
+    etag = weak_etag(user.model_dump_json())
+    if etag_matches(etag, if_none_match):
+        return not_modified(etag)
+    response.headers.update(etag_headers(etag))
+    return user
 
 
 @router.delete("/me", response_model=Message)
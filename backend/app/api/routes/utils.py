@@ -1,11 +1,16 @@
-from fastapi import APIRouter, Depends
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse
 from pydantic.networks import EmailStr
 
 from app.api.deps import get_current_active_superuser
+from app.core.profiler import SamplingProfiler, profiler_lock
+from app.core.timing import TimedRoute
 from app.models import Message
 from app.utils import generate_test_email, send_email
 
-router = APIRouter(prefix="/utils", tags=["utils"])
+router = APIRouter(prefix="/utils", tags=["utils"], route_class=TimedRoute)
 
 
 @router.post(
@@ -29,3 +34,25 @@ def test_email(email_to: EmailStr) -> Message:
 @router.get("/health-check/")
 async def health_check() -> bool:
     return True
+
+
+@router.get("/profile", dependencies=[Depends(get_current_active_superuser)])
+async def profile(
+    seconds: float = Query(default=10, gt=0, le=60),
+    interval_ms: float = Query(default=5, ge=1, le=100),
+) -> JSONResponse:
+    """
+    Sample the stacks of every thread of the worker serving this request
+    for some seconds and return them as a speedscope profile.
+    """
+    if not profiler_lock.acquire(blocking=False):
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    try:
+        with SamplingProfiler(interval_ms / 1000) as profiler:
+            await asyncio.sleep(seconds)
+    finally:
+        profiler_lock.release()
+    return JSONResponse(
+        profiler.speedscope(f"Worker profile ({seconds}s)"),
+        headers={"Content-Disposition": "attachment; filename=profile.speedscope.json"},
+    )
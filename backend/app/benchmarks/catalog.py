@@ -0,0 +1,396 @@
+"""
+Synthetic pattern catalog for performance testing and index tuning.
+
+Generates owners and up to millions of patterns following realistic
+distributions over the categorical columns, with a power-law (Zipf) number
+of patterns per owner, and bulk-inserts them with Postgres `COPY`. The
+allowed values come from the `Literal` annotations in `app.models`, so the
+catalog follows the model. Runs are deterministic for a given `--seed`, ids
+and timestamps included, so benchmark results on two catalogs generated
+with the same options are comparable.
+
+Generated owners use the `catalog.example.com` email domain, running the
+generator again first removes the previous catalog.
+
+Run it with `python -m app.benchmarks.catalog --help`.
+"""
+
+import argparse
+import io
+import itertools
+import logging
+import math
+import random
+import uuid
+from collections.abc import Iterable, Iterator, Mapping, Sequence
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, get_args
+
+from PIL import Image
+from sqlmodel import Session, col, delete, select, text
+
+from app.core.database import engine
+from app.core.security import get_password_hash
+from app.core.storage import get_storage
+from app.models import PATTERN_FILE_FIELDS, Pattern, PatternBase, User
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+EMAIL_DOMAIN = "catalog.example.com"
+PASSWORD = "catalog-password"
+
+# Timestamps are spread over the years before this date, not before now,
+# so that runs are reproducible
+END_DATE = datetime(2025, 1, 1, tzinfo=timezone.utc)
+HISTORY = timedelta(days=3 * 365)
+
+# Relative frequency of the categorical values, values of the `Literal`
+# missing here get a weight of 1
+BRAND_WEIGHTS = {
+    "Fibre Mood": 30,
+    "Other": 25,
+    "Seamwork": 15,
+    "Burda": 15,
+    "Katia": 10,
+    "Patrones": 5,
+}
+VERSION_WEIGHTS = {"Digital": 70, "Paper": 30}
+FOR_WHO_WEIGHTS = {
+    "Women": 55,
+    "Kids": 12,
+    "Men": 12,
+    "Unisex": 10,
+    "Baby": 8,
+    "Pets": 3,
+}
+CATEGORY_WEIGHTS = {
+    "Dresses": 20,
+    "Tops": 14,
+    "Trousers": 10,
+    "Skirts": 9,
+    "Shirts": 7,
+    "T-shirts": 6,
+    "Jackets": 5,
+    "Coats": 4,
+    "Jumpsuits": 4,
+    "Bags": 4,
+    "Accessories": 4,
+    "Sweaters": 3,
+    "Cardigans": 3,
+    "Hoodie": 3,
+    "Shorts": 3,
+}
+DIFFICULTY_WEIGHTS = {1: 15, 2: 35, 3: 30, 4: 15, 5: 5}
+FABRICS = {
+    "Cotton": 25,
+    "Linen": 15,
+    "Jersey": 15,
+    "Viscose": 10,
+    "Denim": 8,
+    "Wool": 7,
+    "Silk": 4,
+    "Fleece": 4,
+    "Corduroy": 4,
+    "Tencel": 3,
+}
+ADJECTIVES = (
+    "Classic",
+    "Relaxed",
+    "Wrap",
+    "Oversized",
+    "Fitted",
+    "Summer",
+    "Winter",
+    "Basic",
+    "Pleated",
+    "Cropped",
+)
+
+PATTERN_COLUMNS = (
+    "id",
+    "owner_id",
+    "title",
+    "description",
+    "brand",
+    "version",
+    "pattern_url",
+    "for_who",
+    "category",
+    "difficulty",
+    "fabric",
+    "fabric_amount",
+    "pattern_a4_file_id",
+    "icon",
+    "created_at",
+    "updated_at",
+)
+USER_COLUMNS = (
+    "id",
+    "email",
+    "hashed_password",
+    "is_active",
+    "is_superuser",
+    "full_name",
+)
+
+
+def literal_values(name: str) -> tuple[Any, ...]:
+    """Values allowed by the `Literal` annotation of a pattern field."""
+    annotation = PatternBase.model_fields[name].annotation
+    for arg in (annotation, *get_args(annotation)):
+        values = get_args(arg)
+        if values and all(isinstance(value, str) for value in values):
+            return values
+    raise ValueError(f"{name} is not a Literal field")
+
+
+class _Weighted:
+    """Values drawn with fixed relative weights."""
+
+    def __init__(self, weights: Mapping[Any, float]) -> None:
+        self.values = list(weights)
+        self.cum_weights = list(itertools.accumulate(weights.values()))
+
+    @classmethod
+    def literal(cls, name: str, weights: Mapping[str, float]) -> "_Weighted":
+        return cls({value: weights.get(value, 1) for value in literal_values(name)})
+
+    def __call__(self, rng: random.Random) -> Any:
+        return rng.choices(self.values, cum_weights=self.cum_weights)[0]
+
+
+def zipf_weights(count: int, exponent: float) -> list[float]:
+    """Weight of each rank in a Zipf distribution, the first rank is heaviest."""
+    return [1 / rank**exponent for rank in range(1, count + 1)]
+
+
+def _random_uuid(rng: random.Random) -> uuid.UUID:
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+
+class CatalogGenerator:
+    """Deterministic stream of owner and pattern rows."""
+
+    def __init__(
+        self,
+        *,
+        seed: int,
+        owners: int,
+        zipf_exponent: float = 1.1,
+        files_ratio: float = 0.0,
+    ) -> None:
+        self.rng = random.Random(seed)
+        self.owner_ids = [_random_uuid(self.rng) for _ in range(owners)]
+        self.owner_weights = list(
+            itertools.accumulate(zipf_weights(owners, zipf_exponent))
+        )
+        self.files_ratio = files_ratio
+        self.brand = _Weighted.literal("brand", BRAND_WEIGHTS)
+        self.version = _Weighted.literal("version", VERSION_WEIGHTS)
+        self.for_who = _Weighted.literal("for_who", FOR_WHO_WEIGHTS)
+        self.category = _Weighted.literal("category", CATEGORY_WEIGHTS)
+        self.difficulty = _Weighted(DIFFICULTY_WEIGHTS)
+        self.fabric = _Weighted(FABRICS)
+
+    def owners(self, hashed_password: str) -> Iterator[tuple[Any, ...]]:
+        """Rows of `USER_COLUMNS` for the owners, all sharing a password."""
+        for i, owner_id in enumerate(self.owner_ids):
+            email = f"owner{i}@{EMAIL_DOMAIN}"
+            yield owner_id, email, hashed_password, True, False, f"Owner {i}"
+
+    def patterns(self, count: int) -> Iterator[tuple[Any, ...]]:
+        """Rows of `PATTERN_COLUMNS`."""
+        rng = self.rng
+        for i in range(count):
+            category = self.category(rng)
+            fabric = self.fabric(rng) if rng.random() < 0.8 else None
+            fabric_amount = None
+            if rng.random() < 0.85:
+                # Most patterns need 1 to 3 meters, a few a lot more
+                amount = rng.lognormvariate(math.log(180), 0.45)
+                fabric_amount = float(min(max(round(amount, -1), 20), 800))
+            created_at = END_DATE - HISTORY * rng.random()
+            # A third of the patterns were edited after their creation
+            updated_at = created_at
+            if rng.random() < 0.3:
+                updated_at += (END_DATE - created_at) * rng.random()
+            file_id = icon = None
+            if rng.random() < self.files_ratio:
+                file_id = f"{_random_uuid(rng)}.pdf"
+                icon = f"{_random_uuid(rng)}.webp"
+            words = (rng.choice(ADJECTIVES), fabric, category, str(i))
+            title = " ".join(word for word in words if word)
+            yield (
+                _random_uuid(rng),
+                rng.choices(self.owner_ids, cum_weights=self.owner_weights)[0],
+                title,
+                f"{title} sewing pattern" if rng.random() < 0.7 else None,
+                self.brand(rng),
+                self.version(rng),
+                None,
+                self.for_who(rng),
+                category,
+                self.difficulty(rng),
+                fabric,
+                fabric_amount,
+                file_id,
+                icon,
+                created_at,
+                updated_at,
+            )
+
+
+def _copy(table: str, columns: Sequence[str], rows: Iterable[tuple[Any, ...]]) -> None:
+    connection = engine.raw_connection()
+    try:
+        driver_connection = connection.driver_connection
+        assert driver_connection is not None
+        with driver_connection.cursor() as cursor:
+            with cursor.copy(
+                f'COPY "{table}" ({", ".join(columns)}) FROM STDIN'
+            ) as copy:
+                for row in rows:
+                    copy.write_row(row)
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def _dummy_files(file_size: int) -> tuple[bytes, bytes]:
+    pdf = b"%PDF-1.4\n%synthetic catalog\n"
+    pdf += b"\0" * max(file_size - len(pdf), 0)
+    buf = io.BytesIO()
+    Image.new("RGB", (64, 64), (200, 180, 160)).save(buf, format="WEBP")
+    return pdf, buf.getvalue()
+
+
+def remove_catalog() -> int:
+    """Delete the generated owners, their patterns and stored files."""
+    storage = get_storage()
+    with Session(engine) as session:
+        owners = select(User.id).where(col(User.email).endswith(f"@{EMAIL_DOMAIN}"))
+        rows = session.exec(
+            select(*(getattr(Pattern, name) for name in PATTERN_FILE_FIELDS)).where(
+                col(Pattern.owner_id).in_(owners)
+            )
+        ).all()
+        keys = [key for row in rows for key in row if key]
+        # Patterns are deleted by the foreign key cascade
+        result = session.exec(delete(User).where(col(User.id).in_(owners)))
+        session.commit()
+    if keys:
+        storage.delete_many(keys)
+    return result.rowcount
+
+
+def generate_catalog(
+    *,
+    patterns: int,
+    owners: int,
+    seed: int = 0,
+    zipf_exponent: float = 1.1,
+    files_ratio: float = 0.0,
+    file_size: int = 4096,
+) -> None:
+    """Replace the generated catalog by a new one."""
+    removed = remove_catalog()
+    if removed:
+        logger.info(f"Removed the previous catalog of {removed} owners")
+
+    generator = CatalogGenerator(
+        seed=seed,
+        owners=owners,
+        zipf_exponent=zipf_exponent,
+        files_ratio=files_ratio,
+    )
+    _copy("user", USER_COLUMNS, generator.owners(get_password_hash(PASSWORD)))
+
+    storage = get_storage()
+    if files_ratio:
+        storage.setup()
+    pdf, icon = _dummy_files(file_size)
+    file_id_index = PATTERN_COLUMNS.index("pattern_a4_file_id")
+    icon_index = PATTERN_COLUMNS.index("icon")
+
+    def with_uploads(
+        rows: Iterable[tuple[Any, ...]], executor: ThreadPoolExecutor
+    ) -> Iterator[tuple[Any, ...]]:
+        # Files are uploaded while the rows are copied, a bounded number
+        # of uploads at a time
+        uploads: list[Future[None]] = []
+        for i, row in enumerate(rows, 1):
+            if row[file_id_index]:
+                uploads.append(
+                    executor.submit(storage.save, row[file_id_index], io.BytesIO(pdf))
+                )
+                uploads.append(
+                    executor.submit(storage.save, row[icon_index], io.BytesIO(icon))
+                )
+                if len(uploads) >= 1000:
+                    for upload in uploads:
+                        upload.result()
+                    uploads = []
+            if i % 100_000 == 0:
+                logger.info(f"{i} patterns written")
+            yield row
+        for upload in uploads:
+            upload.result()
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        _copy(
+            "pattern",
+            PATTERN_COLUMNS,
+            with_uploads(generator.patterns(patterns), executor),
+        )
+
+    with engine.connect() as connection:
+        connection.execute(text("ANALYZE pattern"))
+        connection.execute(text('ANALYZE "user"'))
+        connection.commit()
+    logger.info(f"Generated {owners} owners and {patterns} patterns")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--patterns", type=int, default=1_000_000)
+    parser.add_argument("--owners", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--zipf-exponent",
+        type=float,
+        default=1.1,
+        help="Skew of the number of patterns per owner (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--files-ratio",
+        type=float,
+        default=0.0,
+        help="Share of the patterns getting a dummy PDF and icon in the storage",
+    )
+    parser.add_argument(
+        "--file-size", type=int, default=4096, help="Size of the dummy PDFs"
+    )
+    parser.add_argument(
+        "--remove",
+        action="store_true",
+        help="Only remove the previously generated catalog",
+    )
+    args = parser.parse_args()
+
+    if args.remove:
+        logger.info(f"Removed the catalog of {remove_catalog()} owners")
+        return
+    generate_catalog(
+        patterns=args.patterns,
+        owners=args.owners,
+        seed=args.seed,
+        zipf_exponent=args.zipf_exponent,
+        files_ratio=args.files_ratio,
+        file_size=args.file_size,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,587 @@
+"""
+Load benchmark of the main API routes.
+
+Seeds users and patterns with attached files, then drives a weighted mix of
+catalog browsing, pattern detail, download, upload and login requests from
+concurrent clients. Latency percentiles and throughput are reported per
+route and saved as JSON, so the results of two commits can be compared.
+
+By default the app is served in-process by uvicorn against the database
+and storage of the current settings, use a local Postgres and either MinIO,
+`--moto` or `STORAGE_BACKEND=local`. Seeded users and their files are
+removed at the end of the run.
+
+Run it with `python -m app.benchmarks.load --help`.
+"""
+
+import argparse
+import io
+import json
+import logging
+import math
+import random
+import socket
+import subprocess
+import threading
+import time
+import uuid
+from collections import defaultdict
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+from urllib.parse import urlsplit
+
+import httpx
+import uvicorn
+from sqlmodel import Session, col, delete, select
+
+from app.benchmarks.catalog import literal_values
+from app.core.config import settings
+from app.core.database import engine
+from app.core.security import get_password_hash
+from app.core.storage import get_storage
+from app.models import PATTERN_FILE_FIELDS, Pattern, User
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+RESULTS_DIR = Path(__file__).parent / "results"
+EMAIL_DOMAIN = "bench.example.com"
+PASSWORD = "benchmark-password"
+PAGE_SIZE = 10
+
+# Share of each scenario in the request mix
+DEFAULT_MIX = {
+    "browse": 50,
+    "detail": 25,
+    "download": 15,
+    "upload": 5,
+    "login": 5,
+}
+
+
+BRANDS = literal_values("brand")
+VERSIONS = literal_values("version")
+FOR_WHO = literal_values("for_who")
+CATEGORIES = literal_values("category")
+
+
+@dataclass
+class SeededPattern:
+    id: uuid.UUID
+    file_id: str
+
+
+@dataclass
+class SeededUser:
+    email: str
+    patterns: list[SeededPattern] = field(default_factory=list)
+
+
+def seed(
+    *, users: int, patterns: int, file_size: int, rng: random.Random
+) -> list[SeededUser]:
+    """Create benchmark users owning `patterns` patterns with a file each."""
+    storage = get_storage()
+    storage.setup()
+    # Hashing is slow on purpose, every benchmark user shares the password
+    hashed_password = get_password_hash(PASSWORD)
+    seeded = []
+    with Session(engine) as session:
+        db_users = []
+        for i in range(users):
+            user = User(
+                email=f"user{i}-{uuid.uuid4().hex[:8]}@{EMAIL_DOMAIN}",
+                hashed_password=hashed_password,
+                is_active=True,
+            )
+            db_users.append(user)
+            seeded.append(SeededUser(email=user.email))
+        session.add_all(db_users)
+        session.flush()
+
+        content = rng.randbytes(file_size)
+        for i in range(patterns):
+            owner = i % users
+            file_id = f"{uuid.uuid4()}.pdf"
+            storage.save(file_id, io.BytesIO(content))
+            pattern = Pattern(
+                title=f"Benchmark pattern {i}",
+                description="Seeded by the load benchmark",
+                brand=rng.choice(BRANDS),
+                version=rng.choice(VERSIONS),
+                for_who=rng.choice(FOR_WHO),
+                category=rng.choice(CATEGORIES),
+                difficulty=rng.randint(1, 5),
+                fabric_amount=rng.randrange(50, 400, 10),
+                owner_id=db_users[owner].id,
+                pattern_a4_file_id=file_id,
+            )
+            session.add(pattern)
+            seeded[owner].patterns.append(SeededPattern(pattern.id, file_id))
+        session.commit()
+    logger.info(f"Seeded {users} users and {patterns} patterns")
+    return seeded
+
+
+def cleanup() -> None:
+    """Delete every benchmark user, their patterns and stored files."""
+    with Session(engine) as session:
+        bench_users = select(User.id).where(col(User.email).endswith(EMAIL_DOMAIN))
+        rows = session.exec(
+            select(*(getattr(Pattern, name) for name in PATTERN_FILE_FIELDS)).where(
+                col(Pattern.owner_id).in_(bench_users)
+            )
+        ).all()
+        keys = [key for row in rows for key in row if key]
+        # Patterns are deleted by the foreign key cascade
+        session.exec(delete(User).where(col(User.id).in_(bench_users)))
+        session.commit()
+    failed = get_storage().delete_many(keys)
+    logger.info(f"Removed benchmark data, {len(failed)} files could not be deleted")
+
+
+@dataclass
+class Sample:
+    route: str
+    latency: float
+    ok: bool
+
+
+class Worker:
+    """Client logged in as one benchmark user, sending the request mix."""
+
+    def __init__(
+        self,
+        client: httpx.Client,
+        user: SeededUser,
+        patterns: list[SeededPattern],
+        rng: random.Random,
+    ) -> None:
+        self.client = client
+        self.user = user
+        self.patterns = patterns
+        self.rng = rng
+        self.samples: list[Sample] = []
+        # Requests sent before this time are not recorded
+        self.record_from = 0.0
+        self.scenarios: dict[str, Callable[[], None]] = {
+            "browse": self.browse,
+            "detail": self.detail,
+            "download": self.download,
+            "upload": self.upload,
+            "login": self.login,
+        }
+
+    def request(self, route: str, method: str, url: str, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        response = self.client.request(method, url, **kwargs)
+        end = time.perf_counter()
+        if start >= self.record_from:
+            self.samples.append(Sample(route, end - start, response.is_success))
+        return response
+
+    def login(self) -> None:
+        r = self.request(
+            "POST /login/access-token",
+            "POST",
+            f"{settings.API_V1_STR}/login/access-token",
+            data={"username": self.user.email, "password": PASSWORD},
+        )
+        if r.is_success:
+            token = r.json()["access_token"]
+            self.client.headers["Authorization"] = f"Bearer {token}"
+
+    def browse(self) -> None:
+        params: dict[str, Any] = {"limit": PAGE_SIZE}
+        # Most visits filter on one or two of the catalog facets
+        if self.rng.random() < 0.6:
+            params["category"] = self.rng.choice(CATEGORIES)
+        if self.rng.random() < 0.4:
+            params["for_who"] = self.rng.choice(FOR_WHO)
+        if self.rng.random() < 0.2:
+            params["brand"] = self.rng.choice(BRANDS)
+        if self.rng.random() < 0.1:
+            params["difficulty"] = self.rng.randint(1, 5)
+        params["skip"] = PAGE_SIZE * min(int(self.rng.expovariate(0.7)), 20)
+        self.request(
+            "GET /patterns/", "GET", f"{settings.API_V1_STR}/patterns/", params=params
+        )
+
+    def detail(self) -> None:
+        pattern = self.rng.choice(self.patterns)
+        self.request(
+            "GET /patterns/{id}",
+            "GET",
+            f"{settings.API_V1_STR}/patterns/{pattern.id}",
+        )
+
+    def download(self) -> None:
+        pattern = self.rng.choice(self.patterns)
+        self.request(
+            "GET /patterns/download/{filename}",
+            "GET",
+            f"{settings.API_V1_STR}/patterns/download/{pattern.file_id}",
+        )
+
+    def upload(self) -> None:
+        pattern = self.rng.choice(self.patterns)
+        content = self.rng.randbytes(16 * 1024)
+        r = self.request(
+            "POST /patterns/upload/",
+            "POST",
+            f"{settings.API_V1_STR}/patterns/upload/",
+            data={"id": str(pattern.id)},
+            files={"pattern_a4_file": ("pattern.pdf", content, "application/pdf")},
+        )
+        if r.is_success:
+            # The previous file is deleted by the upload
+            pattern.file_id = r.json()["pattern_a4_file_id"]
+
+    def run(
+        self, mix: dict[str, int], warmup_until: float, stop_at: float
+    ) -> list[Sample]:
+        self.record_from = warmup_until
+        self.login()
+        names = list(mix)
+        weights = list(mix.values())
+        while time.perf_counter() < stop_at:
+            name = self.rng.choices(names, weights)[0]
+            if not self.patterns and name in ("detail", "download", "upload"):
+                name = "browse"
+            self.scenarios[name]()
+        return self.samples
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Nearest-rank percentile of already sorted values."""
+    if not values:
+        return 0.0
+    rank = math.ceil(q / 100 * len(values))
+    return values[min(max(rank, 1), len(values)) - 1]
+
+
+def _route_stats(samples: list[Sample], duration: float) -> dict[str, Any]:
+    latencies = sorted(sample.latency * 1000 for sample in samples)
+    return {
+        "requests": len(samples),
+        "errors": sum(not sample.ok for sample in samples),
+        "throughput": round(len(samples) / duration, 2),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 2),
+            "p95": round(percentile(latencies, 95), 2),
+            "p99": round(percentile(latencies, 99), 2),
+            "mean": round(sum(latencies) / len(latencies), 2) if latencies else 0,
+            "max": round(latencies[-1], 2) if latencies else 0,
+        },
+    }
+
+
+def summarize(samples: Iterable[Sample], duration: float) -> dict[str, Any]:
+    """Per route and overall latency percentiles and throughput."""
+    by_route: dict[str, list[Sample]] = defaultdict(list)
+    all_samples = []
+    for sample in samples:
+        by_route[sample.route].append(sample)
+        all_samples.append(sample)
+    return {
+        "routes": {
+            route: _route_stats(route_samples, duration)
+            for route, route_samples in sorted(by_route.items())
+        },
+        "total": _route_stats(all_samples, duration),
+    }
+
+
+def compare(current: dict[str, Any], baseline: dict[str, Any]) -> list[dict[str, Any]]:
+    """
+    Relative change of each route metric against a baseline, in percent.
+
+    Positive latency changes and negative throughput changes are
+    regressions.
+    """
+    rows = []
+    routes = {**current["routes"], "total": current["total"]}
+    base_routes = {**baseline["routes"], "total": baseline["total"]}
+    for route, stats in routes.items():
+        base = base_routes.get(route)
+        if base is None:
+            continue
+        row: dict[str, Any] = {"route": route}
+        for metric in ("p50", "p95", "p99"):
+            row[metric] = _change(
+                stats["latency_ms"][metric], base["latency_ms"][metric]
+            )
+        row["throughput"] = _change(stats["throughput"], base["throughput"])
+        rows.append(row)
+    return rows
+
+
+def _change(value: float, base: float) -> float | None:
+    if not base:
+        return None
+    return round((value - base) / base * 100, 1)
+
+
+def _format_change(change: float | None) -> str:
+    return "n/a" if change is None else f"{change:+.1f}%"
+
+
+def print_report(result: dict[str, Any], changes: list[dict[str, Any]]) -> None:
+    changes_by_route = {row["route"]: row for row in changes}
+    header = (
+        f"{'route':<36}{'reqs':>8}{'err':>6}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}"
+    )
+    print(header)
+    routes = {**result["routes"], "total": result["total"]}
+    for route, stats in routes.items():
+        latency = stats["latency_ms"]
+        print(
+            f"{route:<36}{stats['requests']:>8}{stats['errors']:>6}"
+            f"{stats['throughput']:>9.1f}{latency['p50']:>9.1f}"
+            f"{latency['p95']:>9.1f}{latency['p99']:>9.1f}"
+        )
+        if route in changes_by_route:
+            row = changes_by_route[route]
+            print(
+                f"{'  vs baseline':<50}{_format_change(row['throughput']):>9}"
+                f"{_format_change(row['p50']):>9}{_format_change(row['p95']):>9}"
+                f"{_format_change(row['p99']):>9}"
+            )
+
+
+def _git_commit() -> str:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+        dirty = subprocess.run(["git", "diff", "--quiet", "HEAD"]).returncode != 0
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{commit}-dirty" if dirty else commit
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port: int = sock.getsockname()[1]
+        return port
+
+
+class _Server(uvicorn.Server):
+    def install_signal_handlers(self) -> None:
+        # Running in a thread, leave the signals to the benchmark
+        pass
+
+
+def start_server() -> tuple[str, Callable[[], None]]:
+    """Serve the app from a background thread, return its URL and a stop."""
+    from app.main import app
+
+    port = _free_port()
+    server = _Server(
+        uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    )
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError("The app server failed to start")
+        time.sleep(0.05)
+
+    def stop() -> None:
+        server.should_exit = True
+        thread.join()
+
+    return f"http://127.0.0.1:{port}", stop
+
+
+def start_moto() -> Callable[[], None]:
+    """Serve a moto S3 stand-in on the port of `S3_ENDPOINT`."""
+    try:
+        from moto.server import ThreadedMotoServer
+    except ImportError:
+        raise SystemExit("--moto needs the moto[server] package")
+    endpoint = urlsplit(str(settings.S3_ENDPOINT))
+    server = ThreadedMotoServer(
+        ip_address=endpoint.hostname or "127.0.0.1", port=endpoint.port or 80
+    )
+    server.start()
+    return server.stop
+
+
+def run(
+    *,
+    base_url: str,
+    users: list[SeededUser],
+    mix: dict[str, int],
+    concurrency: int,
+    duration: float,
+    warmup: float,
+    seed: int,
+) -> dict[str, Any]:
+    workers = []
+    # Workers sharing a user use distinct patterns, so a download never
+    # races with the upload replacing its file
+    shares = -(-concurrency // len(users))
+    for i in range(concurrency):
+        user = users[i % len(users)]
+        patterns = user.patterns[i // len(users) :: shares]
+        client = httpx.Client(base_url=base_url, timeout=60)
+        workers.append(Worker(client, user, patterns, random.Random(seed + i)))
+
+    start = time.perf_counter()
+    warmup_until = start + warmup
+    stop_at = warmup_until + duration
+    threads = [
+        threading.Thread(target=worker.run, args=(mix, warmup_until, stop_at))
+        for worker in workers
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for worker in workers:
+        worker.client.close()
+
+    return summarize(
+        (sample for worker in workers for sample in worker.samples), duration
+    )
+
+
+def parse_mix(value: str) -> dict[str, int]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in DEFAULT_MIX or not weight.isdigit():
+            raise argparse.ArgumentTypeError(
+                f"Invalid mix entry {part!r}, expected <scenario>=<weight> with "
+                f"scenario in {', '.join(DEFAULT_MIX)}"
+            )
+        mix[name] = int(weight)
+    return mix
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--patterns", type=int, default=500)
+    parser.add_argument(
+        "--file-size",
+        type=int,
+        default=64 * 1024,
+        help="Size in bytes of the file attached to each pattern",
+    )
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=30, help="Measured seconds")
+    parser.add_argument(
+        "--warmup", type=float, default=5, help="Seconds excluded from the results"
+    )
+    parser.add_argument(
+        "--mix",
+        type=parse_mix,
+        default=DEFAULT_MIX,
+        help="Scenario weights (default: %(default)s), e.g. browse=80,detail=20",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--base-url",
+        help="Benchmark a running server sharing this database and storage "
+        "instead of serving the app in-process",
+    )
+    parser.add_argument(
+        "--moto", action="store_true", help="Run a moto S3 server for the run"
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        help="Result file (default: app/benchmarks/results/<commit>.json)",
+    )
+    parser.add_argument("--baseline", type=Path, help="Result file to compare with")
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        help="Exit with an error when a route p95 latency grew by more than "
+        "this percentage over the baseline",
+    )
+    parser.add_argument(
+        "--keep-data", action="store_true", help="Do not delete the seeded data"
+    )
+    args = parser.parse_args()
+
+    stops = []
+    if args.moto:
+        stops.append(start_moto())
+    try:
+        base_url = args.base_url
+        if not base_url:
+            # Started first, its lifespan applies the migrations
+            base_url, stop_server = start_server()
+            stops.append(stop_server)
+        users = seed(
+            users=args.users,
+            patterns=args.patterns,
+            file_size=args.file_size,
+            rng=random.Random(args.seed),
+        )
+        try:
+            result = run(
+                base_url=base_url,
+                users=users,
+                mix=args.mix,
+                concurrency=args.concurrency,
+                duration=args.duration,
+                warmup=args.warmup,
+                seed=args.seed,
+            )
+        finally:
+            if not args.keep_data:
+                cleanup()
+    finally:
+        for stop in reversed(stops):
+            stop()
+
+    commit = _git_commit()
+    result = {
+        "commit": commit,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            "users": args.users,
+            "patterns": args.patterns,
+            "file_size": args.file_size,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "mix": args.mix,
+            "seed": args.seed,
+            "storage": settings.STORAGE_BACKEND,
+        },
+        **result,
+    }
+    output = args.output or RESULTS_DIR / f"{commit}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, indent=2) + "\n")
+
+    changes = []
+    if args.baseline:
+        changes = compare(result, json.loads(args.baseline.read_text()))
+    print_report(result, changes)
+    logger.info(f"Results written to {output}")
+
+    if args.max_regression is not None:
+        regressed = [
+            row["route"]
+            for row in changes
+            if row["p95"] is not None and row["p95"] > args.max_regression
+        ]
+        if regressed:
+            logger.error(f"p95 latency regressed on {', '.join(regressed)}")
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Benchmark of the pattern search, full-text against `ILIKE`.
+
+Runs searched texts against the patterns of the database, usually a
+catalog generated with `app.benchmarks.catalog` (`--generate` does it
+first), as `read_patterns` does: the count of the matches, then the first
+page. Three strategies:
+
+* `title`: `title ILIKE '%text%'`, the `title=` filter, which only finds
+  the text as typed in the title.
+* `ilike`: each word with `ILIKE` in any of the searched columns, what the
+  full-text search finds without a text index.
+* `fts`: the `q=` search, on the GIN indexed `search_vector` and ranked by
+  `ts_rank`.
+
+Run it with `python -m app.benchmarks.search --help`.
+"""
+
+import argparse
+import logging
+import statistics
+import time
+from typing import Any
+
+from sqlalchemy import ColumnElement, UnaryExpression
+from sqlmodel import Session, String, and_, cast, col, func, or_, select
+
+from app.benchmarks.catalog import generate_catalog
+from app.core.database import engine
+from app.core.search import search_match, search_query, search_rank
+from app.models import Pattern
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+QUERIES = ("linen wrap dress", "jersey", "oversized wool coat", "pleat", "fleece 12")
+STRATEGIES = ("title", "ilike", "fts")
+SEARCHED_COLUMNS = ("title", "brand", "category", "fabric", "description")
+
+
+def statements(strategy: str, text: str, limit: int = 100) -> tuple[Any, Any]:
+    """Count and page statements of a search."""
+    order: list[UnaryExpression[Any]] = [col(Pattern.updated_at).desc()]
+    condition: ColumnElement[bool]
+    if strategy == "title":
+        condition = col(Pattern.title).ilike(f"%{text}%")
+    elif strategy == "ilike":
+        # The enum columns as text, ILIKE is a text operator
+        columns = [cast(getattr(Pattern, name), String) for name in SEARCHED_COLUMNS]
+        condition = and_(
+            *(
+                or_(*(column.ilike(f"%{word}%") for column in columns))
+                for word in text.split()
+            )
+        )
+    else:
+        query = search_query(text)
+        assert query is not None
+        condition = search_match(query)
+        order.insert(0, search_rank(query).desc())
+    count = select(func.count()).select_from(Pattern).where(condition)
+    page = select(Pattern.id).where(condition).order_by(*order).limit(limit)
+    return count, page
+
+
+def measure(session: Session, statement: Any, repeat: int) -> tuple[Any, float]:
+    """Result of the statement and its median duration in seconds."""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = session.exec(statement).all()
+        durations.append(time.perf_counter() - start)
+    return result, statistics.median(durations)
+
+
+def run(queries: list[str], repeat: int) -> dict[str, dict[str, dict[str, float]]]:
+    results: dict[str, dict[str, dict[str, float]]] = {}
+    with Session(engine) as session:
+        for text in queries:
+            results[text] = {}
+            for strategy in STRATEGIES:
+                count_statement, page_statement = statements(strategy, text)
+                (matches,), count = measure(session, count_statement, repeat)
+                _, page = measure(session, page_statement, repeat)
+                results[text][strategy] = {
+                    "matches": matches,
+                    "count": count,
+                    "page": page,
+                }
+    return results
+
+
+def print_report(results: dict[str, dict[str, dict[str, float]]]) -> None:
+    print(
+        f"{'search':<20} {'strategy':<8} {'matches':>8} {'count':>10} "
+        f"{'page':>10} {'speedup':>8}"
+    )
+    for text, strategies in results.items():
+        baseline = strategies["ilike"]["count"] + strategies["ilike"]["page"]
+        for strategy, timing in strategies.items():
+            total = timing["count"] + timing["page"]
+            print(
+                f"{text:<20} {strategy:<8} {timing['matches']:>8} "
+                f"{timing['count'] * 1000:>8.2f}ms {timing['page'] * 1000:>8.2f}ms "
+                f"{baseline / total:>7.1f}x"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--generate",
+        type=int,
+        metavar="PATTERNS",
+        help="First generate a catalog of this many patterns",
+    )
+    parser.add_argument("--queries", nargs="+", default=list(QUERIES))
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    if args.generate:
+        generate_catalog(patterns=args.generate, owners=max(args.generate // 100, 1))
+    print_report(run(args.queries, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Microbenchmark of the serialization of pattern listings.
+
+Compares two routes answering the same listing, called through a FastAPI
+app without a server or a database:
+
+* `models`: returns `PatternsPublic(data=patterns, count=count)` built from
+  ORM objects, validated against the response model and encoded by
+  FastAPI. The path of `read_patterns` before rows were encoded directly.
+* `rows`: returns the row mappings of the public columns in a
+  `FastJSONResponse`, encoded by pydantic-core without validation. The
+  path of `read_patterns` now.
+
+Loading the rows is not measured, selecting columns instead of ORM objects
+saves some more time there. The rows are synthetic catalog rows.
+
+Run it with `python -m app.benchmarks.serialization --help`.
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from typing import Any
+
+from fastapi import FastAPI
+from starlette.types import Message
+
+from app.benchmarks.catalog import PATTERN_COLUMNS, CatalogGenerator
+from app.core.responses import FastJSONResponse
+from app.models import Pattern, PatternPublic, PatternsPublic
+
+
+def listing_rows(count: int, seed: int = 0) -> list[dict[str, Any]]:
+    """Synthetic rows of the public pattern columns."""
+    generator = CatalogGenerator(seed=seed, owners=max(count // 10, 1))
+    rows = []
+    for values in generator.patterns(count):
+        row = dict(zip(PATTERN_COLUMNS, values, strict=True))
+        rows.append({name: row.get(name) for name in PatternPublic.model_fields})
+    return rows
+
+
+def listing_app(rows: list[dict[str, Any]]) -> FastAPI:
+    patterns = [Pattern(**row) for row in rows]
+    app = FastAPI()
+
+    @app.get("/models", response_model=PatternsPublic)
+    def models() -> Any:
+        # Validated from the ORM objects, as the listing route did
+        return PatternsPublic(data=patterns, count=len(patterns))  # type: ignore[arg-type]
+
+    @app.get("/rows", response_model=PatternsPublic)
+    def rows_response() -> Any:
+        return FastJSONResponse({"data": rows, "count": len(rows), "next": None})
+
+    return app
+
+
+async def call(app: FastAPI, path: str) -> bytes:
+    """Send a GET request to the ASGI app, return the response body."""
+    body = bytearray()
+
+    async def receive() -> Message:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: Message) -> None:
+        if message["type"] == "http.response.body":
+            body.extend(message.get("body", b""))
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [],
+        "client": ("127.0.0.1", 0),
+        "server": ("127.0.0.1", 80),
+    }
+    await app(scope, receive, send)
+    return bytes(body)
+
+
+def measure(app: FastAPI, path: str, repeat: int) -> dict[str, float]:
+    """Seconds per response, median and best of `repeat` requests."""
+    loop = asyncio.new_event_loop()
+    try:
+        durations = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            loop.run_until_complete(call(app, path))
+            durations.append(time.perf_counter() - start)
+    finally:
+        loop.close()
+    return {"median": statistics.median(durations), "min": min(durations)}
+
+
+PATHS = ("models", "rows")
+
+
+def run(sizes: list[int], repeat: int) -> dict[int, dict[str, dict[str, float]]]:
+    results = {}
+    for size in sizes:
+        app = listing_app(listing_rows(size))
+        # Both paths must send the same listing
+        outputs = [json.loads(asyncio.run(call(app, f"/{name}"))) for name in PATHS]
+        if outputs[0] != outputs[1]:
+            raise AssertionError(f"Listings of {size} rows differ")
+        results[size] = {name: measure(app, f"/{name}", repeat) for name in PATHS}
+    return results
+
+
+def print_report(results: dict[int, dict[str, dict[str, float]]]) -> None:
+    print(f"{'rows':>6} {'path':<8} {'median':>10} {'min':>10} {'speedup':>8}")
+    for size, paths in results.items():
+        baseline = paths["models"]["median"]
+        for name, timing in paths.items():
+            print(
+                f"{size:>6} {name:<8} {timing['median'] * 1000:>8.2f}ms "
+                f"{timing['min'] * 1000:>8.2f}ms {baseline / timing['median']:>7.1f}x"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--rows", type=int, nargs="+", default=[100, 1000], help="Listing sizes"
+    )
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    print_report(run(args.rows, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,7 @@ from pydantic import (
     AnyUrl,
     BeforeValidator,
     EmailStr,
+    Field,
     HttpUrl,
     PostgresDsn,
     computed_field,
@@ -35,6 +36,8 @@ class Settings(BaseSettings):
     SECRET_KEY: str = secrets.token_urlsafe(32)
     # 60 minutes * 24 hours * 8 days = 8 days
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8
+    # Signed file URLs are valid between 1 and 2 times this
+    FILE_URL_EXPIRE_MINUTES: int = 60
     FRONTEND_HOST: str = "http://localhost:5173"
     ENVIRONMENT: Literal["local", "staging", "production"] = "local"
 
@@ -54,6 +57,19 @@ class Settings(BaseSettings):
     # Configuration for Observability
     SENTRY_DSN: HttpUrl | None = None
     PROMETHEUS_METRICS: bool = False
+    # Send the time spent per phase (auth, db, s3...) in a Server-Timing
+    # header, by default only locally, and log the breakdown of requests
+    # slower than the threshold
+    SERVER_TIMING: bool | None = None
+
+    SLOW_REQUEST_THRESHOLD_MS: float | None = 1000
+    # A statement executed this many times in one request is logged as a
+    # likely N+1 query
+    REPEATED_QUERY_THRESHOLD: int = 10
+    # OpenTelemetry traces are exported over OTLP/HTTP when the endpoint is
+    # set, e.g. http://otel-collector:4318
+    OTEL_EXPORTER_OTLP_ENDPOINT: HttpUrl | None = None
+    OTEL_TRACES_SAMPLE_RATE: float = Field(default=0.1, ge=0, le=1)
 
     # Configuration for PostgreSQL
     POSTGRES_SERVER: str
@@ -74,13 +90,33 @@ class Settings(BaseSettings):
             path=self.POSTGRES_DB,
         )
 
+    # Where pattern files are stored: "s3" for MinIO or AWS S3, "local" to keep
+    # them in STORAGE_LOCAL_PATH on single node installs
+    STORAGE_BACKEND: Literal["s3", "local"] = "s3"
+    STORAGE_LOCAL_PATH: str = "/app/data"
+
     # Configuration for either MinIO or AWS S3
-    S3_ACCESS_KEY: str
-    S3_SECRET_KEY: str
+    S3_ACCESS_KEY: str = ""
+    S3_SECRET_KEY: str = ""
     S3_ENDPOINT: HttpUrl = "http://localhost:9000"
     S3_REGION: str = "us-east-1"
     S3_BUCKET: str = "patternland"
 
+    # Optional local disk cache for files downloaded from S3, the least
+    # recently used files are evicted above FILE_CACHE_MAX_BYTES per worker
+    FILE_CACHE_DIR: str | None = None
+    FILE_CACHE_MAX_BYTES: int = 1024 * 1024 * 1024
+
+    # Pattern listings are cached in each worker, up to this many (0 disables
+    # it), and with LISTING_CACHE_SHARED in a table shared by every worker.
+    # Any write to the patterns invalidates them
+    LISTING_CACHE_SIZE: int = 1024
+    LISTING_CACHE_SHARED: bool = False
+
+    # Unreferenced objects younger than this are kept by the garbage collector
+    # so uploads whose pattern row is not committed yet are not removed
+    STORAGE_GC_GRACE_HOURS: int = 24
+
     @computed_field  # type: ignore[prop-decorator]
     @property
     def S3_CONFIG(self) -> dict[str, str]:
@@ -131,6 +167,12 @@ class Settings(BaseSettings):
             else:
                 raise ValueError(message)
 
+    @model_validator(mode="after")
+    def _set_default_server_timing(self) -> Self:
+        if self.SERVER_TIMING is None:
+            self.SERVER_TIMING = self.ENVIRONMENT == "local"
+        return self
+
     @model_validator(mode="after")
     def _enforce_non_default_secrets(self) -> Self:
         self._check_default_secret("SECRET_KEY", self.SECRET_KEY)
@@ -4,9 +4,11 @@ from sqlmodel import Session, create_engine, select
 
 from app import crud
 from app.core.config import settings
+from app.core.timing import instrument_engine
 from app.models import User, UserCreate
 
 engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI))
+instrument_engine(engine)
 
 
 def create_db_and_tables(session: Session) -> None:
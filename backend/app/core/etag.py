@@ -0,0 +1,43 @@
+"""
+Conditional requests of the JSON resources.
+
+The ETags are weak, they identify a version of the resource rather than
+the exact bytes sent, and are derived from what changes with it: `id` and
+`updated_at` of a pattern, the cache generation of the pattern listings.
+The responses are sent with `Cache-Control: private, no-cache`, so browsers
+keep them but revalidate them on every use, getting a `304` without a body
+while they are unchanged.
+"""
+
+import hashlib
+
+from fastapi.responses import Response
+
+# Kept by the browser, but always revalidated
+CACHE_CONTROL = "private, no-cache"
+
+
+def weak_etag(*parts: object) -> str:
+    digest = hashlib.sha256("|".join(str(part) for part in parts).encode())
+    return f'W/"{digest.hexdigest()[:32]}"'
+
+
+def etag_matches(etag: str, if_none_match: str | None) -> bool:
+    """Weak comparison of an ETag with an `If-None-Match` header."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque
+        for candidate in if_none_match.split(",")
+    )
+
+
+def etag_headers(etag: str) -> dict[str, str]:
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers=etag_headers(etag))
@@ -0,0 +1,362 @@
+"""
+Change feed of the patterns, sent as Server-Sent Events.
+
+Every write to the pattern table records its events in `patternevent`,
+with triggers, so no write is missed whichever code does it (routes,
+imports, cascaded user deletions). A statement notifies the
+`pattern_events` channel with the range of the ids of its events, once
+its transaction is committed.
+
+Each worker listens to the channel on a dedicated connection, in a thread
+started with the worker. The same thread bumps the generation of the
+cached pattern listings when notified of a committed write to the
+patterns (see `app.core.listing_cache`). The events of a notification are
+read with the pattern they are about, in batches of `_BATCH_SIZE` so a
+statement writing many patterns is not loaded at once, encoded once, and
+put in the queue of every subscribed stream of the worker.
+
+An event is sent with a resume token, `<id>:<horizon>`. A stream resuming
+after an event first replays the recorded events that followed it, then
+sends the live ones. Ids are allocated before the commit, so a
+transaction committing after a later one, e.g. a long import, has its
+events sent after theirs, with lower ids. Each event also records its
+transaction and the horizon, the oldest transaction still running when it
+was recorded:
+
+* Transactions older than the horizon committed before the one of the
+  event, their notifications were delivered before it, so their events
+  were sent before it.
+* Any event sent after it is then either later by id, or from a
+  transaction not older than the horizon.
+
+A resume replays the events following the id, and the events of the
+transactions since the horizon, which clients may receive twice. The
+events carry the current state of the pattern, so applying one again is
+harmless. A token without horizon only resumes by id.
+
+A stream is told to `reset`, to refetch what it shows, when the events it
+would resume from are no longer kept or are more than its queue holds,
+when the worker lost its connection
+to the database or when it does not read its events fast enough.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Iterator, Sequence
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+import psycopg
+import sqlalchemy as sa
+from pydantic_core import to_json
+from sqlalchemy import cast, func
+from sqlalchemy.dialects.postgresql import REGCLASS
+from sqlalchemy.exc import DBAPIError
+from sqlmodel import Session, col, delete, select
+
+from app.core.database import engine
+from app.core.listing_cache import PATTERN_GENERATION, listing_cache
+from app.models import Pattern, PatternEvent, PatternPublic
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "pattern_events"
+
+# Events older than this are removed, a stream resuming from one is reset
+_RETENTION = timedelta(days=1)
+_PRUNE_INTERVAL = 3600.0
+_CONNECT_TIMEOUT = 10.0
+# A comment line is sent when no event was sent for this long, so proxies
+# and clients keep the connection open
+_HEARTBEAT_INTERVAL = 15.0
+# Streams end after this long, the clients reconnect with the id of the
+# last event they got
+_STREAM_DURATION = 300.0
+_RETRY_MILLISECONDS = 3000
+# Events waiting to be sent to a stream before it is reset, also the most
+# events replayed on resume
+_QUEUE_SIZE = 10_000
+# Events read at once
+_BATCH_SIZE = 1000
+# Ids of the events recently sent, a notification can cover events that
+# were already sent, the ranges of concurrent statements overlap
+_SENT_IDS = 100_000
+
+
+@dataclass
+class Event:
+    id: int
+    owner_id: uuid.UUID
+    message: bytes
+
+
+# Put in a queue instead of an event, the stream tells its client to reset
+RESET = Event(0, uuid.UUID(int=0), b"event: reset\ndata: {}\n\n")
+
+
+def _message(id: int, horizon: int, kind: str, data: dict[str, Any]) -> bytes:
+    return b"id: %d:%d\nevent: %s\ndata: %s\n\n" % (
+        id,
+        horizon,
+        kind.encode(),
+        to_json(data),
+    )
+
+
+def parse_token(token: str) -> tuple[int, int | None]:
+    """The id and horizon of a resume token, checked by the route."""
+    id, _, horizon = token.partition(":")
+    return int(id), int(horizon) if horizon else None
+
+
+def read_events(
+    session: Session, *conditions: Any, limit: int | None = None
+) -> list[Event]:
+    """Recorded events, in the order of their ids, with their pattern."""
+    columns = [getattr(Pattern, name) for name in PatternPublic.model_fields]
+    rows = session.execute(
+        sa.select(
+            col(PatternEvent.id),
+            col(PatternEvent.horizon),
+            col(PatternEvent.kind),
+            col(PatternEvent.pattern_id),
+            col(PatternEvent.owner_id),
+            col(Pattern.id).label("found"),
+            *columns,
+        )
+        .outerjoin(Pattern, col(Pattern.id) == PatternEvent.pattern_id)
+        .where(*conditions)
+        .order_by(col(PatternEvent.id))
+        .limit(limit)
+    ).all()
+    events = []
+    for row in rows:
+        id, horizon, kind, pattern_id, owner_id, found, *values = row
+        # The pattern as it is now, none once deleted
+        pattern = None
+        if found is not None and kind != "deleted":
+            pattern = dict(zip(PatternPublic.model_fields, values, strict=True))
+        data = {"id": pattern_id, "owner_id": owner_id, "pattern": pattern}
+        events.append(Event(id, owner_id, _message(id, horizon, kind, data)))
+    return events
+
+
+def read_event_batches(session: Session, *conditions: Any) -> Iterator[list[Event]]:
+    """Recorded events, in batches following each other by id."""
+    keyset: list[Any] = []
+    while True:
+        events = read_events(session, *conditions, *keyset, limit=_BATCH_SIZE)
+        if events:
+            yield events
+        if len(events) < _BATCH_SIZE:
+            return
+        keyset = [col(PatternEvent.id) > events[-1].id]
+
+
+def replay(
+    session: Session, after: int, horizon: int | None = None
+) -> list[Event] | None:
+    """
+    The events following `after`, None if some are no longer kept or if
+    there are more than a stream would queue.
+    """
+    first = session.exec(select(func.min(PatternEvent.id))).one()
+    if first is None:
+        # None if no event was ever recorded
+        first = session.exec(
+            select(func.pg_sequence_last_value(cast("patternevent_id_seq", REGCLASS)))
+        ).one()
+        first = (first or 0) + 1
+    if after + 1 < first:
+        return None
+    condition = col(PatternEvent.id) > after
+    if horizon is not None:
+        condition |= col(PatternEvent.xid) >= horizon
+    events = read_events(session, condition, limit=_QUEUE_SIZE + 1)
+    return events if len(events) <= _QUEUE_SIZE else None
+
+
+@dataclass(eq=False)
+class Subscription:
+    loop: asyncio.AbstractEventLoop
+    owner_id: uuid.UUID | None = None
+    queue: asyncio.Queue[Event] = field(
+        default_factory=lambda: asyncio.Queue(_QUEUE_SIZE)
+    )
+    overflowed: bool = False
+
+    def put(self, events: Sequence[Event]) -> None:
+        """Queue events, called in the loop of the stream."""
+        if self.overflowed:
+            return
+        for event in events:
+            if self.owner_id is not None and event.owner_id != self.owner_id:
+                continue
+            if self.queue.full():
+                self.overflowed = True
+                # Room for the reset, the stream ends after it
+                self.queue.get_nowait()
+                self.queue.put_nowait(RESET)
+                return
+            self.queue.put_nowait(event)
+
+
+class EventBroker:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._subscriptions: set[Subscription] = set()
+        self._thread: threading.Thread | None = None
+        self._stopped = threading.Event()
+        # Set while the worker listens, events committed then are sent
+        self._listening = threading.Event()
+        self._sent: OrderedDict[int, None] = OrderedDict()
+        self._pruned_at = float("-inf")
+
+    def subscribe(
+        self, loop: asyncio.AbstractEventLoop, owner_id: uuid.UUID | None = None
+    ) -> Subscription:
+        """Subscribe a stream, blocks until the events are listened to."""
+        subscription = Subscription(loop, owner_id)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        self.start()
+        if not self._listening.wait(_CONNECT_TIMEOUT):
+            self.unsubscribe(subscription)
+            raise TimeoutError("Not listening to the pattern events")
+        return subscription
+
+    def start(self) -> None:
+        """Start listening, if not already."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopped.clear()
+                self._thread = threading.Thread(
+                    target=self._run, name="pattern-events", daemon=True
+                )
+                self._thread.start()
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _publish(self, events: Sequence[Event]) -> None:
+        fresh = [event for event in events if event.id not in self._sent]
+        for event in fresh:
+            self._sent[event.id] = None
+        while len(self._sent) > _SENT_IDS:
+            self._sent.popitem(last=False)
+        if fresh:
+            self._broadcast(fresh)
+
+    def _broadcast(self, events: Sequence[Event]) -> None:
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, events)
+            except RuntimeError:
+                # The loop of the stream is closed
+                self.unsubscribe(subscription)
+
+    def _run(self) -> None:
+        conninfo = engine.url.set(drivername="postgresql").render_as_string(
+            hide_password=False
+        )
+        while not self._stopped.is_set():
+            try:
+                with psycopg.connect(conninfo, autocommit=True) as connection:
+                    connection.execute(f"LISTEN {CHANNEL}")
+                    connection.execute(f"LISTEN {PATTERN_GENERATION}")
+                    # Writes may have been committed while not listening
+                    self._bump_generation()
+                    self._listening.set()
+                    self._listen(connection)
+            except (psycopg.Error, DBAPIError):
+                logger.exception("Pattern events connection lost")
+                # The streams may have missed events, their clients resume
+                self._listening.clear()
+                self._broadcast([RESET])
+                self._stopped.wait(1.0)
+        self._listening.clear()
+
+    def _listen(self, connection: psycopg.Connection[Any]) -> None:
+        while not self._stopped.is_set():
+            # Returns after a second without notification to check the stop
+            for notification in connection.notifies(timeout=1.0):
+                if notification.channel == PATTERN_GENERATION:
+                    self._bump_generation()
+                    continue
+                first, last = map(int, notification.payload.split())
+                with Session(engine) as session:
+                    for events in read_event_batches(
+                        session, col(PatternEvent.id).between(first, last)
+                    ):
+                        self._publish(events)
+            self._prune()
+
+    def _bump_generation(self) -> None:
+        with Session(engine) as session:
+            listing_cache.bump(session)
+
+    def _prune(self) -> None:
+        now = time.monotonic()
+        if now - self._pruned_at < _PRUNE_INTERVAL:
+            return
+        self._pruned_at = now
+        with Session(engine) as session:
+            session.exec(
+                delete(PatternEvent).where(
+                    col(PatternEvent.created_at)
+                    < datetime.now(tz=timezone.utc) - _RETENTION
+                )
+            )
+            session.commit()
+
+
+pattern_events = EventBroker()
+
+
+async def event_stream(
+    subscription: Subscription, replayed: list[Event] | None
+) -> AsyncIterator[bytes]:
+    """The SSE stream of a subscription, after the replayed events."""
+    try:
+        yield b"retry: %d\n\n" % _RETRY_MILLISECONDS
+        if replayed is None:
+            yield RESET.message
+            return
+        sent = set()
+        for event in replayed:
+            if subscription.owner_id is None or event.owner_id == subscription.owner_id:
+                sent.add(event.id)
+                yield event.message
+        deadline = subscription.loop.time() + _STREAM_DURATION
+        while (remaining := deadline - subscription.loop.time()) > 0:
+            try:
+                event = await asyncio.wait_for(
+                    subscription.queue.get(),
+                    min(_HEARTBEAT_INTERVAL, remaining),
+                )
+            except TimeoutError:
+                yield b": heartbeat\n\n"
+                continue
+            if event is RESET:
+                yield event.message
+                return
+            # Sent by the replay, received again live
+            if event.id in sent:
+                sent.discard(event.id)
+                continue
+            yield event.message
+    finally:
+        pattern_events.unsubscribe(subscription)
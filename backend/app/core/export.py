@@ -0,0 +1,164 @@
+"""
+Streaming export of pattern rows.
+
+Rows are read from a server-side cursor in batches of `BATCH_SIZE`, each
+batch is encoded and sent before the next one is fetched, so the memory
+used does not depend on the number of exported rows. The export runs in
+its own session, it outlives the request handler.
+
+Formats:
+
+* `ndjson`: a JSON object per line.
+* `csv`: a header line with the column names, then a line per row.
+* `parquet`: a row group per batch, needs `pyarrow` (the `parquet` extra).
+"""
+
+import csv
+import io
+import uuid
+from collections.abc import Callable, Iterator, Sequence
+from datetime import datetime
+from typing import Any, Literal
+
+import sqlalchemy as sa
+from pydantic_core import to_json
+from sqlalchemy import Row, Select
+from sqlmodel import Session
+
+from app.core.database import engine
+
+BATCH_SIZE = 1000
+
+ExportFormat = Literal["ndjson", "csv", "parquet"]
+
+MEDIA_TYPES: dict[ExportFormat, str] = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow  # type: ignore[import-untyped]  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _batches(statement: Select[Any]) -> Iterator[Sequence[Row[Any]]]:
+    with Session(engine) as session:
+        result = session.execute(statement.execution_options(yield_per=BATCH_SIZE))
+        yield from result.partitions()
+
+
+def _ndjson(
+    _statement: Select[Any], batches: Iterator[Sequence[Row[Any]]]
+) -> Iterator[bytes]:
+    for batch in batches:
+        yield b"".join(to_json(row._asdict()) + b"\n" for row in batch)
+
+
+def _csv_value(value: Any) -> Any:
+    # As in the JSON responses
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _csv(
+    statement: Select[Any], batches: Iterator[Sequence[Row[Any]]]
+) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(column.name for column in statement.selected_columns)
+    for batch in batches:
+        writer.writerows([_csv_value(value) for value in row] for row in batch)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # Only the header, nothing was exported
+        yield buffer.getvalue().encode()
+
+
+class _Sink(io.RawIOBase):
+    """Write-only file keeping what was written until it is taken."""
+
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: Any) -> int:
+        chunk = bytes(data)
+        self._chunks.append(chunk)
+        self._position += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self._position
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _parquet(
+    statement: Select[Any], batches: Iterator[Sequence[Row[Any]]]
+) -> Iterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq  # type: ignore[import-untyped]
+
+    types = [
+        (sa.Uuid, pa.string()),
+        (sa.String, pa.string()),
+        (sa.Integer, pa.int64()),
+        (sa.Float, pa.float64()),
+        (sa.DateTime, pa.timestamp("us", tz="UTC")),
+    ]
+
+    def arrow_type(column: Any) -> Any:
+        # AutoString and the other decorated types are stored as their impl
+        sql_type = column.type
+        if isinstance(sql_type, sa.TypeDecorator):
+            sql_type = sql_type.impl_instance
+        return next(type_ for sql, type_ in types if isinstance(sql_type, sql))
+
+    # Explicit, a batch with only nulls in a column would not tell its type
+    schema = pa.schema(
+        [(column.name, arrow_type(column)) for column in statement.selected_columns]
+    )
+    sink = _Sink()
+    with pq.ParquetWriter(sink, schema) as writer:
+        for batch in batches:
+            columns: list[Sequence[Any]] = list(zip(*batch, strict=True)) or [
+                [] for _ in schema
+            ]
+            writer.write_table(
+                pa.table(
+                    [
+                        [
+                            str(value) if isinstance(value, uuid.UUID) else value
+                            for value in values
+                        ]
+                        for values in columns
+                    ],
+                    schema=schema,
+                )
+            )
+            yield sink.take()
+    # The footer
+    yield sink.take()
+
+
+_WRITERS: dict[
+    ExportFormat,
+    Callable[[Select[Any], Iterator[Sequence[Row[Any]]]], Iterator[bytes]],
+] = {"ndjson": _ndjson, "csv": _csv, "parquet": _parquet}
+
+
+def export_rows(statement: Select[Any], format: ExportFormat) -> Iterator[bytes]:
+    """Stream the rows selected by `statement` encoded in `format`."""
+    return _WRITERS[format](statement, _batches(statement))
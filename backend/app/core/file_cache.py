@@ -0,0 +1,272 @@
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Iterable, Iterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, BinaryIO
+
+import anyio
+from fastapi.responses import FileResponse, Response
+from prometheus_client import Counter, Gauge
+from starlette.types import Receive, Scope, Send
+
+from app.core.storage import CHUNK_SIZE, StorageBackend, StoredObject
+
+_TMP_PREFIX = ".fetch-"
+
+_hits = Counter(
+    "patternland_file_cache_hits_total",
+    "Downloads served from the local file cache",
+)
+_misses = Counter(
+    "patternland_file_cache_misses_total",
+    "Downloads that had to be fetched from the storage backend",
+)
+_bytes_saved = Counter(
+    "patternland_file_cache_bytes_saved_total",
+    "Bytes served from the local file cache instead of the storage backend",
+)
+_hit_ratio = Gauge(
+    "patternland_file_cache_hit_ratio",
+    "Ratio of downloads served from the local file cache",
+)
+_size = Gauge(
+    "patternland_file_cache_size_bytes",
+    "Bytes currently stored in the local file cache",
+)
+
+
+@dataclass
+class _Fetch:
+    """Lock of the requests fetching the same object."""
+
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    waiters: int = 0
+
+
+class _OpenFileResponse(FileResponse):
+    """
+    `FileResponse` of a file already open, which outlives its eviction.
+
+    Servers supporting the pathsend extension send it with `sendfile` from
+    the path of its descriptor, the others get it in chunks as from a path.
+    """
+
+    def __init__(self, file: BinaryIO, **kwargs: Any) -> None:
+        self.file = file
+        super().__init__(
+            f"/dev/fd/{file.fileno()}", stat_result=os.fstat(file.fileno()), **kwargs
+        )
+
+    @asynccontextmanager
+    async def _open_file(self) -> AsyncIterator[anyio.AsyncFile[bytes]]:
+        # Closed once sent, ranges seek it before reading
+        yield anyio.wrap_file(self.file)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.file.close()
+
+
+class CachedStorage(StorageBackend):
+    """
+    Read-through disk cache in front of another storage backend.
+
+    Object keys are immutable, so cached files never need to be refreshed,
+    only dropped when the object is deleted through this backend. The
+    least recently used files are evicted when the cache grows above
+    `max_bytes`, objects bigger than that are never cached. Concurrent
+    misses for the same key wait for a single fetch from the backend.
+
+    Worker processes sharing the directory each keep their own index, so
+    `max_bytes` is enforced per worker and a file may disappear behind the
+    back of an index, in which case it is fetched again.
+    """
+
+    def __init__(
+        self, backend: StorageBackend, directory: str | Path, max_bytes: int
+    ) -> None:
+        self.backend = backend
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._fetching: dict[str, _Fetch] = {}
+        # key -> size, least recently used first
+        self._index: OrderedDict[str, int] = OrderedDict()
+        self._total = 0
+        self._hits = 0
+        self._lookups = 0
+        self._load_index()
+
+    def _load_index(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.startswith(_TMP_PREFIX):
+                # Leftover of an interrupted fetch
+                os.unlink(entry.path)
+            elif entry.is_file():
+                stat = entry.stat()
+                files.append((stat.st_atime, entry.name, stat.st_size))
+        for _, name, size in sorted(files):
+            self._index[name] = size
+            self._total += size
+        _size.set(self._total)
+
+    def _record_lookup(self, hit: bool, size: int) -> None:
+        with self._lock:
+            self._lookups += 1
+            if hit:
+                self._hits += 1
+            _hit_ratio.set(self._hits / self._lookups)
+        if hit:
+            _hits.inc()
+            _bytes_saved.inc(size)
+        else:
+            _misses.inc()
+
+    @staticmethod
+    def _cacheable(key: str) -> bool:
+        return (
+            bool(key)
+            and not key.startswith(".")
+            and "/" not in key
+            and os.sep not in key
+        )
+
+    def _open_cached(self, key: str) -> BinaryIO | None:
+        # Opened under the lock, an eviction can only unlink it once open
+        with self._lock:
+            if key not in self._index:
+                return None
+            try:
+                file = (self.directory / key).open("rb")
+            except FileNotFoundError:
+                # Evicted or deleted by another worker
+                self._total -= self._index.pop(key)
+                return None
+            self._index.move_to_end(key)
+        return file
+
+    def _fetch(self, key: str) -> BinaryIO | None:
+        """Open the cached file of an object, fetching it if needed."""
+        if not self._cacheable(key):
+            return None
+        file = self._open_cached(key)
+        if file:
+            self._record_lookup(True, self._index.get(key, 0))
+            return file
+
+        with self._lock:
+            fetch = self._fetching.setdefault(key, _Fetch())
+            fetch.waiters += 1
+        try:
+            with fetch.lock:
+                # Another request may have fetched it while we were waiting
+                file = self._open_cached(key)
+                if file:
+                    self._record_lookup(True, self._index.get(key, 0))
+                    return file
+                return self._download(key)
+        finally:
+            with self._lock:
+                fetch.waiters -= 1
+                # Kept while requests wait on it, so they never fetch twice
+                if not fetch.waiters:
+                    del self._fetching[key]
+
+    def _download(self, key: str) -> BinaryIO | None:
+        stored = self.backend.stat(key)
+        self._record_lookup(False, stored.size)
+        if stored.size > self.max_bytes:
+            return None
+        path = self.directory / key
+        fd, tmp_name = tempfile.mkstemp(dir=self.directory, prefix=_TMP_PREFIX)
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                for chunk in self.backend.iter_chunks(key):
+                    tmp.write(chunk)
+            size = os.path.getsize(tmp_name)
+            os.replace(tmp_name, path)
+        except BaseException:
+            os.unlink(tmp_name)
+            raise
+        with self._lock:
+            file = path.open("rb")
+            self._index[key] = size
+            self._total += size
+            # The file just fetched is the most recently used, it is only
+            # evicted by later fetches
+            while self._total > self.max_bytes:
+                evicted, evicted_size = self._index.popitem(last=False)
+                self._total -= evicted_size
+                (self.directory / evicted).unlink(missing_ok=True)
+            _size.set(self._total)
+        return file
+
+    def _discard(self, key: str) -> None:
+        if not self._cacheable(key):
+            return
+        with self._lock:
+            self._total -= self._index.pop(key, 0)
+            # Unlink even if not indexed, another worker may have cached it
+            (self.directory / key).unlink(missing_ok=True)
+            _size.set(self._total)
+
+    def setup(self) -> None:
+        self.backend.setup()
+
+    def save(self, key: str, fileobj: BinaryIO) -> None:
+        self._discard(key)
+        self.backend.save(key, fileobj)
+
+    def stat(self, key: str) -> StoredObject:
+        return self.backend.stat(key)
+
+    def iter_chunks(self, key: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        file = self._open_cached(key)
+        if file is None:
+            return self.backend.iter_chunks(key, chunk_size)
+        return self._read(file, chunk_size)
+
+    @staticmethod
+    def _read(file: BinaryIO, chunk_size: int) -> Iterator[bytes]:
+        with file:
+            while chunk := file.read(chunk_size):
+                yield chunk
+
+    def file_response(
+        self,
+        key: str,
+        filename: str | None = None,
+        *,
+        media_type: str = "application/octet-stream",
+        headers: dict[str, str] | None = None,
+    ) -> Response:
+        file = self._fetch(key)
+        if file is None:
+            # Not cacheable, e.g. bigger than the whole cache
+            return self.backend.file_response(
+                key, filename, media_type=media_type, headers=headers
+            )
+        return _OpenFileResponse(
+            file, media_type=media_type, filename=filename, headers=headers
+        )
+
+    def delete(self, key: str) -> None:
+        self._discard(key)
+        self.backend.delete(key)
+
+    def delete_many(self, keys: Iterable[str]) -> list[str]:
+        keys = list(keys)
+        for key in keys:
+            self._discard(key)
+        return self.backend.delete_many(keys)
+
+    def list_objects(self) -> Iterator[StoredObject]:
+        return self.backend.list_objects()
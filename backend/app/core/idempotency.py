@@ -0,0 +1,190 @@
+"""
+Idempotency keys of the requests creating patterns and uploading files.
+
+A client that got no response to a request can't tell whether it was
+processed, it retries it with the same `Idempotency-Key` header. The keys
+are scoped to their user:
+
+* The first request with a key claims it, committing a row without a
+  response, before doing anything else.
+* Its response is stored in the row in the transaction of its writes, so
+  the key is completed exactly when the writes are.
+* A retry of a completed request gets the stored response, with an
+  `Idempotent-Replayed: true` header, without reading the patterns or the
+  storage again.
+* A retry while the request is processed is refused, as is a key sent
+  again for another request or with another content, compared by a hash
+  of the request.
+* A request that fails releases its key, so its retries are processed.
+
+Keys are kept for `_RETENTION`. A claim left incomplete for
+`_CLAIM_TIMEOUT`, by a worker that died, can be claimed again.
+"""
+
+import hashlib
+import time
+import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import BinaryIO
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session, col, delete, update
+
+from app.models import IdempotencyKey
+
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+_RETENTION = timedelta(days=1)
+_CLAIM_TIMEOUT = timedelta(minutes=10)
+_PRUNE_INTERVAL = 3600.0
+_CHUNK_SIZE = 1024 * 1024
+
+
+class IdempotencyKeyInUseError(Exception):
+    pass
+
+
+class IdempotencyKeyReusedError(Exception):
+    pass
+
+
+@dataclass
+class StoredResponse:
+    status_code: int
+    body: bytes
+
+
+def fingerprint(*parts: str | bytes | BinaryIO | None) -> str:
+    """Hash of the content of a request, files are read then rewound."""
+    digest = hashlib.sha256()
+    for part in parts:
+        if part is None:
+            digest.update(b"\x00")
+        elif isinstance(part, str):
+            digest.update(b"s%d:%s" % (len(part.encode()), part.encode()))
+        elif isinstance(part, bytes):
+            digest.update(b"b%d:%s" % (len(part), part))
+        else:
+            digest.update(b"f")
+            while chunk := part.read(_CHUNK_SIZE):
+                digest.update(chunk)
+            part.seek(0)
+    return digest.hexdigest()
+
+
+class IdempotencyKeys:
+    def __init__(self) -> None:
+        self._pruned_at = float("-inf")
+
+    def claim(
+        self,
+        session: Session,
+        owner_id: uuid.UUID,
+        key: str,
+        request: str,
+        fingerprint: str,
+    ) -> StoredResponse | None:
+        """
+        Claim a key for a request, committed at once.
+
+        Returns None once claimed, the stored response when the request was
+        already processed.
+        """
+        self._prune(session)
+        now = datetime.now(tz=timezone.utc)
+        values = {
+            "request": request,
+            "fingerprint": fingerprint,
+            "status_code": None,
+            "body": None,
+            "created_at": now,
+        }
+        claimed = session.exec(
+            insert(IdempotencyKey)
+            .values(owner_id=owner_id, key=key, **values)
+            .on_conflict_do_update(
+                index_elements=["owner_id", "key"],
+                set_=values,
+                # Expired, or claimed by a request that never completed
+                where=(col(IdempotencyKey.created_at) < now - _RETENTION)
+                | (
+                    col(IdempotencyKey.status_code).is_(None)
+                    & (col(IdempotencyKey.created_at) < now - _CLAIM_TIMEOUT)
+                ),
+            )
+            .returning(col(IdempotencyKey.key))
+        ).first()
+        session.commit()
+        if claimed is not None:
+            return None
+        stored = session.get(IdempotencyKey, (owner_id, key))
+        if stored is None:
+            # Released meanwhile by a failed request
+            raise IdempotencyKeyInUseError("The request is being processed")
+        if stored.request != request or stored.fingerprint != fingerprint:
+            raise IdempotencyKeyReusedError(
+                "The idempotency key was sent with another request"
+            )
+        if stored.status_code is None or stored.body is None:
+            raise IdempotencyKeyInUseError("The request is being processed")
+        return StoredResponse(stored.status_code, stored.body)
+
+    def complete(
+        self,
+        session: Session,
+        owner_id: uuid.UUID,
+        key: str,
+        status_code: int,
+        body: bytes,
+    ) -> None:
+        """Store the response of a claimed key, committed with the session."""
+        session.exec(
+            update(IdempotencyKey)
+            .where(
+                col(IdempotencyKey.owner_id) == owner_id,
+                col(IdempotencyKey.key) == key,
+            )
+            .values(status_code=status_code, body=body)
+        )
+
+    def release(self, session: Session, owner_id: uuid.UUID, key: str) -> None:
+        session.exec(
+            delete(IdempotencyKey).where(
+                col(IdempotencyKey.owner_id) == owner_id,
+                col(IdempotencyKey.key) == key,
+                col(IdempotencyKey.status_code).is_(None),
+            )
+        )
+        session.commit()
+
+    @contextmanager
+    def released_on_error(
+        self, session: Session, owner_id: uuid.UUID, key: str | None
+    ) -> Iterator[None]:
+        """Release the claimed key, if any, when the request fails."""
+        try:
+            yield
+        except BaseException:
+            if key is not None:
+                session.rollback()
+                self.release(session, owner_id, key)
+            raise
+
+    def _prune(self, session: Session) -> None:
+        now = time.monotonic()
+        if now - self._pruned_at < _PRUNE_INTERVAL:
+            return
+        self._pruned_at = now
+        session.exec(
+            delete(IdempotencyKey).where(
+                col(IdempotencyKey.created_at)
+                < datetime.now(tz=timezone.utc) - _RETENTION
+            )
+        )
+        session.commit()
+
+
+idempotency_keys = IdempotencyKeys()
@@ -4,7 +4,8 @@ from fastapi import FastAPI
 from sqlmodel import Session
 
 from app.core.database import create_db_and_tables, engine
-from app.core.s3_storage import create_bucket
+from app.core.events import pattern_events
+from app.core.storage import get_storage
 
 
 @asynccontextmanager
@@ -12,6 +13,8 @@ async def lifespan(app: FastAPI):  # pragma: no cover # noqa: ARG001
     # Startup events
     with Session(engine) as session:
         create_db_and_tables(session)
-    create_bucket()
+    get_storage().setup()
+    pattern_events.start()
     yield
     # Shutdown events
+    pattern_events.stop()
@@ -0,0 +1,194 @@
+"""
+Cache of the pattern listings.
+
+Listings are cached as serialized responses, keyed by their normalized
+filters and pagination. `self_patterns` listings are also keyed by their
+owner, the other listings are the same for every user and shared between
+them.
+
+Entries are invalidated with a generation counter, the `pattern_generation`
+sequence. A trigger bumps it on every statement changing the pattern
+table, whichever code does it (routes, cascaded user deletions, bulk
+loads). A sequence is not transactional, concurrent writers don't wait for
+each other, and the bump is visible before the write is. A listing read
+meanwhile could be cached with the new generation without the write, so
+the trigger also notifies the commit, and the workers bump the generation
+again once notified (see `app.core.events`). A lookup reads the current
+generation first, instead of the count and page queries, and entries of
+an older generation are never served.
+
+Two tiers:
+
+* An LRU of `LISTING_CACHE_SIZE` entries in each worker, cleared when the
+  generation changes.
+* With `LISTING_CACHE_SHARED`, an UNLOGGED table of the database shared by
+  every worker and replica, so a listing is computed once per generation
+  instead of once per worker. It needs no other service, a dedicated cache
+  server could take its place behind the same two methods.
+"""
+
+import hashlib
+import json
+import threading
+import uuid
+from collections import OrderedDict
+from collections.abc import Sequence
+from typing import Any
+
+from prometheus_client import Counter, Gauge
+from sqlalchemy import BigInteger, column, func, table
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session, col, delete, select
+
+from app.core.config import settings
+from app.models import ListingCacheEntry
+
+# Name of the sequence, and of the channel notified of its bumps
+PATTERN_GENERATION = "pattern_generation"
+
+_lookups = Counter(
+    "patternland_listing_cache_lookups_total",
+    "Pattern listing cache lookups per tier",
+    ["tier", "result"],
+)
+_hit_ratio = Gauge(
+    "patternland_listing_cache_hit_ratio",
+    "Ratio of pattern listings served from a cache tier",
+)
+_entries = Gauge(
+    "patternland_listing_cache_entries",
+    "Pattern listings cached in the worker",
+)
+
+
+def listing_key(
+    filters: dict[str, Any],
+    *,
+    skip: int,
+    limit: int,
+    owner_id: uuid.UUID | None = None,
+    fields: Sequence[str] = (),
+) -> str:
+    """Key of a listing, the same for equivalent requests."""
+    normalized = {name: value for name, value in filters.items() if value is not None}
+    if "title" in normalized:
+        # Matched case insensitively
+        normalized["title"] = normalized["title"].lower()
+    for name, value in normalized.items():
+        if isinstance(value, list):
+            # Any of the values, in any order
+            normalized[name] = sorted(set(value))
+    payload = json.dumps(
+        [normalized, skip, limit, str(owner_id) if owner_id else None, fields],
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ListingCache:
+    def __init__(self, max_entries: int, shared: bool = False) -> None:
+        self.max_entries = max_entries
+        self.shared = shared
+        self._lock = threading.Lock()
+        # key -> serialized listing, least recently used first
+        self._entries: OrderedDict[str, bytes] = OrderedDict()
+        self._generation = 0
+        # Shared entries of older generations are removed once per generation
+        self._prune = False
+        self._hits = 0
+        self._lookups = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 or self.shared
+
+    def generation(self, session: Session) -> int:
+        return session.exec(
+            select(column("last_value", BigInteger)).select_from(
+                table(PATTERN_GENERATION)
+            )
+        ).one()
+
+    def bump(self, session: Session) -> None:
+        """Make the cached listings stale, for writes committed meanwhile."""
+        session.exec(select(func.nextval(PATTERN_GENERATION))).one()
+
+    def _advance(self, generation: int) -> bool:
+        """Drop the local entries older than `generation`, if it is current."""
+        if generation > self._generation:
+            self._entries.clear()
+            self._generation = generation
+            self._prune = True
+            _entries.set(0)
+        # A request that read the generation before a later write is too late
+        # to use the local tier
+        return generation == self._generation
+
+    def get(self, session: Session, generation: int, key: str) -> bytes | None:
+        body = None
+        if self.max_entries > 0:
+            with self._lock:
+                if self._advance(generation):
+                    body = self._entries.get(key)
+                    if body is not None:
+                        self._entries.move_to_end(key)
+            _lookups.labels("local", "hit" if body is not None else "miss").inc()
+
+        if body is None and self.shared:
+            body = session.exec(
+                select(ListingCacheEntry.body).where(
+                    ListingCacheEntry.key == key,
+                    ListingCacheEntry.generation == generation,
+                )
+            ).first()
+            _lookups.labels("shared", "hit" if body is not None else "miss").inc()
+            if body is not None and self.max_entries > 0:
+                with self._lock:
+                    if self._advance(generation):
+                        self._store_local(key, body)
+
+        with self._lock:
+            self._lookups += 1
+            if body is not None:
+                self._hits += 1
+            _hit_ratio.set(self._hits / self._lookups)
+        return body
+
+    def set(self, session: Session, generation: int, key: str, body: bytes) -> None:
+        with self._lock:
+            current = self._advance(generation)
+            prune, self._prune = self._prune, False
+            if current and self.max_entries > 0:
+                self._store_local(key, body)
+        if not self.shared:
+            return
+        if prune:
+            session.exec(
+                delete(ListingCacheEntry).where(
+                    col(ListingCacheEntry.generation) < generation
+                )
+            )
+        statement = insert(ListingCacheEntry).values(
+            key=key, generation=generation, body=body
+        )
+        session.exec(
+            statement.on_conflict_do_update(
+                index_elements=[ListingCacheEntry.key],
+                set_={"generation": generation, "body": body},
+                # Never replace a listing of a later generation
+                where=col(ListingCacheEntry.generation) <= generation,
+            )
+        )
+        session.commit()
+
+    def _store_local(self, key: str, body: bytes) -> None:
+        self._entries[key] = body
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        _entries.set(len(self._entries))
+
+
+listing_cache = ListingCache(
+    settings.LISTING_CACHE_SIZE, shared=settings.LISTING_CACHE_SHARED
+)
@@ -0,0 +1,145 @@
+import heapq
+import os
+import shutil
+import tempfile
+from collections.abc import Iterable, Iterator
+from contextlib import ExitStack
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import BinaryIO
+
+from fastapi.responses import FileResponse
+
+from app.core.storage import CHUNK_SIZE, StorageBackend, StoredObject
+
+# Names sorted in memory at once when listing, larger directories are sorted
+# in runs of this size spilled to temporary files
+LIST_RUN_SIZE = 100_000
+
+
+class LocalStorage(StorageBackend):
+    """
+    Objects stored as files in a local directory.
+
+    Meant for single node installs, where going through a co-located MinIO
+    only adds HTTP overhead. Downloads are sent with `FileResponse`, which
+    lets the server use `sendfile` when it supports the pathsend extension.
+    """
+
+    def __init__(self, root: str | Path) -> None:
+        self.root = Path(root)
+
+    def _path(self, key: str) -> Path:
+        # Keys come from URLs, never let them escape the storage directory
+        if not key or key in (".", "..") or "/" in key or os.sep in key:
+            raise FileNotFoundError(key)
+        return self.root / key
+
+    def setup(self) -> None:
+        print(f"Checking storage directory {self.root}")
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def save(self, key: str, fileobj: BinaryIO) -> None:
+        path = self._path(key)
+        # Write to a temporary file first so readers never see partial files
+        fd, tmp_name = tempfile.mkstemp(dir=self.root, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                shutil.copyfileobj(fileobj, tmp, CHUNK_SIZE)
+            os.replace(tmp_name, path)
+        except BaseException:
+            os.unlink(tmp_name)
+            raise
+
+    def stat(self, key: str) -> StoredObject:
+        path = self._path(key)
+        if not path.is_file():
+            raise FileNotFoundError(key)
+        stat = path.stat()
+        return StoredObject(
+            key=key,
+            size=stat.st_size,
+            last_modified=datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc),
+        )
+
+    def iter_chunks(self, key: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        path = self._path(key)
+        if not path.is_file():
+            raise FileNotFoundError(key)
+        return self._read(path, chunk_size)
+
+    @staticmethod
+    def _read(path: Path, chunk_size: int) -> Iterator[bytes]:
+        with path.open("rb") as f:
+            while chunk := f.read(chunk_size):
+                yield chunk
+
+    def file_response(
+        self,
+        key: str,
+        filename: str | None = None,
+        *,
+        media_type: str = "application/octet-stream",
+        headers: dict[str, str] | None = None,
+    ) -> FileResponse:
+        path = self._path(key)
+        if not path.is_file():
+            raise FileNotFoundError(key)
+        return FileResponse(
+            path, media_type=media_type, filename=filename, headers=headers
+        )
+
+    def delete(self, key: str) -> None:
+        try:
+            self._path(key).unlink()
+        except FileNotFoundError:
+            print(f"File {key} not found in {self.root}, skipping deletion.")
+
+    def delete_many(self, keys: Iterable[str]) -> list[str]:
+        failed = []
+        for key in keys:
+            try:
+                self._path(key).unlink(missing_ok=True)
+            except OSError:
+                failed.append(key)
+        return failed
+
+    def list_objects(self) -> Iterator[StoredObject]:
+        for name in self._sorted_names():
+            try:
+                yield self.stat(name)
+            except FileNotFoundError:
+                # Deleted while listing
+                continue
+
+    def _sorted_names(self) -> Iterator[str]:
+        # An external merge sort, the memory used does not depend on the
+        # number of files in the directory
+        with ExitStack() as stack:
+            runs: list[Iterator[bytes]] = []
+            run: list[bytes] = []
+            with os.scandir(self.root) as entries:
+                for entry in entries:
+                    # A name with a newline is not a key, it would split a run line
+                    if (
+                        entry.name.startswith(".upload-")
+                        or "\n" in entry.name
+                        or not entry.is_file()
+                    ):
+                        continue
+                    run.append(entry.name.encode())
+                    if len(run) == LIST_RUN_SIZE:
+                        runs.append(self._spill(stack, run))
+                        run = []
+            run.sort()
+            runs.append(iter(run))
+            for name in heapq.merge(*runs):
+                yield name.decode()
+
+    @staticmethod
+    def _spill(stack: ExitStack, run: list[bytes]) -> Iterator[bytes]:
+        file = stack.enter_context(tempfile.TemporaryFile())
+        run.sort()
+        file.writelines(name + b"\n" for name in run)
+        file.seek(0)
+        return (line[:-1] for line in file)
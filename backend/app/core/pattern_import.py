@@ -0,0 +1,251 @@
+"""
+Import of pattern files, run in the background.
+
+The uploaded file is read in chunks of `CHUNK_SIZE` rows, each row
+validated as a `PatternImportRow`. The valid rows of a chunk are loaded
+with `COPY` into a temporary staging table, then merged into the pattern
+table with a single statement:
+
+* rows without an `id`, or with an unknown one, are inserted, owned by the
+  user importing the file;
+* rows with the `id` of a pattern of that user update it, so an export can
+  be edited and imported back. If an `id` is repeated in a chunk the last
+  row wins, as it would across chunks;
+* rows with the `id` of another user's pattern are rejected.
+
+Every chunk is committed with the progress of the import and the rejected
+rows, the report of the errors, so the import can be polled while it runs
+and what was imported stays imported if it fails later on.
+
+Formats:
+
+* `csv`: a header line with the field names, empty values are missing.
+* `ndjson`: a JSON object per line.
+
+Jobs run in the worker that received the file: one interrupted by a
+restart stays `running`, the rows already imported are kept.
+"""
+
+import codecs
+import csv
+import io
+import json
+import logging
+import os
+import uuid
+from collections.abc import Iterable, Iterator
+from datetime import datetime, timezone
+from typing import IO, Any, Literal, cast
+
+import sqlalchemy as sa
+from fastapi.encoders import jsonable_encoder
+from pydantic import ValidationError
+from sqlmodel import Session
+
+from app.core.database import engine
+from app.models import PatternCreate, PatternImport, PatternImportRow
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 5000
+
+ImportFormat = Literal["csv", "ndjson"]
+
+# Columns of the staging table, the values of the merged patterns
+_COLUMNS = ["id", "owner_id", *PatternCreate.model_fields, "created_at", "updated_at"]
+# Updated on the existing patterns, the others are kept
+_UPDATED_COLUMNS = [*PatternCreate.model_fields, "updated_at"]
+
+# A record of the file, its line and its fields or why it can't be read
+Record = tuple[int, dict[str, Any] | None, Any]
+
+
+def _csv_records(file: Iterable[str]) -> Iterator[Record]:
+    reader = csv.DictReader(file)
+    for row in reader:
+        # Missing values get their defaults, as in the JSON requests
+        fields = {name: value for name, value in row.items() if value not in ("", None)}
+        if None in fields:
+            yield reader.line_num, None, "More values than fields in the header"
+            continue
+        yield reader.line_num, fields, None
+
+
+def _ndjson_records(file: Iterable[str]) -> Iterator[Record]:
+    for line, text in enumerate(file, 1):
+        if not text.strip():
+            continue
+        try:
+            fields = json.loads(text)
+        except json.JSONDecodeError as error:
+            yield line, None, f"Invalid JSON: {error.msg}"
+            continue
+        if not isinstance(fields, dict):
+            yield line, None, "Expected a JSON object"
+            continue
+        yield line, fields, None
+
+
+_READERS = {"csv": _csv_records, "ndjson": _ndjson_records}
+
+
+class _CountedLines:
+    """
+    Lines of a text file, counting the bytes of those read.
+
+    The position of the binary file is ahead, the text wrapper reads it by
+    blocks. The readers take one line at a time, so once a chunk of records
+    is read the count is where its last record ends.
+    """
+
+    def __init__(self, file: IO[str], position: int) -> None:
+        self.file = file
+        self.position = position
+
+    def __iter__(self) -> Iterator[str]:
+        for line in self.file:
+            self.position += len(line.encode())
+            yield line
+
+
+def _validation_errors(error: ValidationError) -> Any:
+    # As in the 422 responses
+    return jsonable_encoder(error.errors(include_url=False, include_context=False))
+
+
+def _merge(
+    session: Session, owner_id: uuid.UUID, rows: list[tuple[Any, ...]]
+) -> tuple[int, list[int]]:
+    """
+    Merge validated rows into the patterns.
+
+    Returns the number of patterns inserted or updated and the lines of the
+    rows rejected as patterns of other users.
+    """
+    columns = ", ".join(_COLUMNS)
+    session.execute(
+        sa.text(
+            "CREATE TEMPORARY TABLE patternimport_staging "
+            "(line integer, LIKE pattern) ON COMMIT DROP"
+        )
+    )
+    connection = session.connection().connection.driver_connection
+    assert connection is not None
+    with connection.cursor() as cursor:
+        with cursor.copy(
+            f"COPY patternimport_staging (line, {columns}) FROM STDIN"
+        ) as copy:
+            for row in rows:
+                copy.write_row(row)
+    rejected = session.execute(
+        sa.text(
+            "SELECT staging.line FROM patternimport_staging AS staging "
+            "JOIN pattern ON pattern.id = staging.id "
+            "WHERE pattern.owner_id <> :owner_id"
+        ),
+        params={"owner_id": owner_id},
+    ).scalars()
+    rejected_lines = list(rejected)
+    updates = ", ".join(f"{name} = excluded.{name}" for name in _UPDATED_COLUMNS)
+    result = session.execute(
+        sa.text(
+            f"INSERT INTO pattern ({columns}) "
+            f"SELECT DISTINCT ON (id) {columns} FROM patternimport_staging "
+            "ORDER BY id, line DESC "
+            f"ON CONFLICT (id) DO UPDATE SET {updates} "
+            "WHERE pattern.owner_id = excluded.owner_id"
+        )
+    )
+    # A DML statement, its result has the row count
+    return cast(sa.CursorResult[Any], result).rowcount, rejected_lines
+
+
+def _import_chunk(session: Session, job: PatternImport, records: list[Record]) -> None:
+    # Loaded before the COPY statements, the connection can't run others then
+    import_id, owner_id = job.id, job.owner_id
+    now = datetime.now(tz=timezone.utc)
+    rows = []
+    errors: dict[int, Any] = {}
+    for line, fields, error in records:
+        if fields is None:
+            errors[line] = error
+            continue
+        try:
+            pattern = PatternImportRow.model_validate(fields)
+        except ValidationError as validation_error:
+            errors[line] = _validation_errors(validation_error)
+            continue
+        values = pattern.model_dump(include=set(PatternCreate.model_fields))
+        rows.append(
+            (
+                line,
+                pattern.id or uuid.uuid4(),
+                owner_id,
+                *values.values(),
+                now,
+                now,
+            )
+        )
+    imported = 0
+    if rows:
+        imported, rejected = _merge(session, owner_id, rows)
+        for line in rejected:
+            errors[line] = "Pattern of another user"
+    if errors:
+        connection = session.connection().connection.driver_connection
+        assert connection is not None
+        with connection.cursor() as cursor:
+            with cursor.copy(
+                "COPY patternimporterror (import_id, line, detail) FROM STDIN"
+            ) as copy:
+                for line, detail in errors.items():
+                    copy.write_row((import_id, line, json.dumps(detail)))
+    job.rows += len(records)
+    job.imported += imported
+    job.failed += len(errors)
+
+
+def _chunks(records: Iterator[Record]) -> Iterator[list[Record]]:
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= CHUNK_SIZE:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def run_import(import_id: uuid.UUID, path: str) -> None:
+    """Import the file at `path`, removed once imported."""
+    with Session(engine) as session:
+        job = session.get(PatternImport, import_id)
+        assert job is not None
+        job.status = "running"
+        session.add(job)
+        session.commit()
+        try:
+            with open(path, "rb") as raw:
+                # The BOM of the CSV files of spreadsheets is skipped
+                bom = raw.read(len(codecs.BOM_UTF8)) == codecs.BOM_UTF8
+                raw.seek(0)
+                file = io.TextIOWrapper(raw, encoding="utf-8-sig", newline="")
+                lines = _CountedLines(file, len(codecs.BOM_UTF8) if bom else 0)
+                for chunk in _chunks(_READERS[job.format](lines)):
+                    _import_chunk(session, job, chunk)
+                    job.position = lines.position
+                    session.add(job)
+                    session.commit()
+            job.status = "done"
+        except UnicodeDecodeError:
+            session.rollback()
+            job.status, job.detail = "failed", "The file is not UTF-8 text"
+        except Exception:
+            logger.exception("Import %s failed", import_id)
+            session.rollback()
+            job.status, job.detail = "failed", "The import failed"
+        finally:
+            os.unlink(path)
+        job.finished_at = datetime.now(tz=timezone.utc)
+        session.add(job)
+        session.commit()
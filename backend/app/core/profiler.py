@@ -0,0 +1,203 @@
+"""
+In-process sampling profiler producing speedscope profiles.
+
+A background thread snapshots the stack of every other thread of the
+worker with `sys._current_frames()` at a fixed interval, the profiled code
+is not instrumented and nothing runs while no profile is being taken. The
+result opens in https://www.speedscope.app, one profile per thread.
+
+Profiles are taken either for a number of seconds with
+`GET /utils/profile`, or for a single request sent by a superuser with the
+`X-Profile: true` header, whose response is then replaced by the profile.
+Both sample every thread of the worker, requests served concurrently show
+up too.
+"""
+
+import json
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any
+
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from sqlmodel import Session
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.api.deps import get_current_user
+from app.core.database import engine
+
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+DEFAULT_INTERVAL = 0.005
+# Single requests are short, sample them more often
+REQUEST_INTERVAL = 0.001
+PROFILE_HEADER = "x-profile"
+
+# Frames are identified by function, not line, to keep profiles readable
+_FrameKey = tuple[str, str, int]
+
+
+class SamplingProfiler:
+    def __init__(self, interval: float = DEFAULT_INTERVAL) -> None:
+        self.interval = interval
+        self._frames: dict[_FrameKey, int] = {}
+        # thread id -> stack (frame indexes from the root) -> samples
+        self._samples: dict[int, Counter[tuple[int, ...]]] = {}
+        self._thread_names: dict[int, str] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="sampling-profiler", daemon=True
+        )
+        self.duration = 0.0
+
+    def start(self) -> None:
+        self._start = time.perf_counter()
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self._start
+
+    def __enter__(self) -> "SamplingProfiler":
+        self.start()
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        self.stop()
+
+    def _frame_index(self, key: _FrameKey) -> int:
+        index = self._frames.get(key)
+        if index is None:
+            index = self._frames[key] = len(self._frames)
+        return index
+
+    def _sample(self) -> None:
+        own_id = threading.get_ident()
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            stack = []
+            current: Any = frame
+            while current is not None:
+                code = current.f_code
+                stack.append(
+                    self._frame_index(
+                        (code.co_name, code.co_filename, code.co_firstlineno)
+                    )
+                )
+                current = current.f_back
+            stack.reverse()
+            self._samples.setdefault(thread_id, Counter())[tuple(stack)] += 1
+
+    def _run(self) -> None:
+        # Sample right away, short requests may not last a whole interval
+        self._sample()
+        while not self._stop.wait(self.interval):
+            self._sample()
+        self._thread_names = {
+            thread.ident: thread.name
+            for thread in threading.enumerate()
+            if thread.ident is not None
+        }
+
+    def speedscope(self, name: str) -> dict[str, Any]:
+        """The samples in the speedscope file format."""
+        profiles = []
+        for thread_id, stacks in sorted(
+            self._samples.items(), key=lambda item: -item[1].total()
+        ):
+            profiles.append(
+                {
+                    "type": "sampled",
+                    "name": self._thread_names.get(thread_id, str(thread_id)),
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": self.duration,
+                    "samples": [list(stack) for stack in stacks],
+                    "weights": [count * self.interval for count in stacks.values()],
+                }
+            )
+        return {
+            "$schema": SPEEDSCOPE_SCHEMA,
+            "name": name,
+            "exporter": "patternland",
+            "activeProfileIndex": 0,
+            "shared": {
+                "frames": [
+                    {"name": func, "file": file, "line": line}
+                    for func, file, line in self._frames
+                ]
+            },
+            "profiles": profiles,
+        }
+
+
+# A single profile at a time per worker, samples would overlap anyway
+profiler_lock = threading.Lock()
+
+
+def _is_superuser(token: str) -> bool:
+    with Session(engine) as session:
+        try:
+            return get_current_user(session, token).is_superuser
+        except HTTPException:
+            return False
+
+
+class ProfilerMiddleware:
+    """Profile requests sent by a superuser with the `X-Profile` header."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self._requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        authorization = Headers(scope=scope).get("authorization", "")
+        scheme, _, token = authorization.partition(" ")
+        if (
+            scheme.lower() != "bearer"
+            or not await run_in_threadpool(_is_superuser, token)
+            or not profiler_lock.acquire(blocking=False)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def discard(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+        try:
+            with SamplingProfiler(REQUEST_INTERVAL) as profiler:
+                await self.app(scope, receive, discard)
+        finally:
+            profiler_lock.release()
+
+        name = f"{scope['method']} {scope['path']} ({status})"
+        body = json.dumps(profiler.speedscope(name)).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+    @staticmethod
+    def _requested(scope: Scope) -> bool:
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER.encode():
+                return value.lower() in (b"1", b"true")
+        return False
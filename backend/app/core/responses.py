@@ -0,0 +1,21 @@
+from typing import Any
+
+from fastapi.responses import JSONResponse
+from pydantic_core import to_json
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response encoded by pydantic-core, without validating the content.
+
+    Returning models or ORM objects from a route validates them against the
+    response model then encodes the result, for large lists most of the
+    time of the request. Rows selected as mappings can be encoded directly
+    instead, pydantic-core handles their UUIDs, datetimes and so on.
+
+    The content is trusted to match the response model of the route, which
+    is then only used for the OpenAPI schema.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return to_json(content)
@@ -1,54 +1,110 @@
-import io
-import uuid
+from collections.abc import Iterable, Iterator
+from typing import Any, BinaryIO
 
 import boto3
-from fastapi import HTTPException, UploadFile
-from PIL import Image
+from fastapi.responses import StreamingResponse
 
 from app.core.config import settings
+from app.core.storage import (
+    CHUNK_SIZE,
+    StorageBackend,
+    StoredObject,
+    content_disposition,
+)
+from app.core.timing import instrument_boto_client
 
 s3_client = boto3.client("s3", **settings.S3_CONFIG)
+instrument_boto_client(s3_client)
 
-_ICON_MAX_SIZE = (300, 300)
-
-
-def create_bucket():
-    try:
-        print(f"Checking S3 bucket {settings.S3_BUCKET} in {settings.S3_ENDPOINT}")
-        s3_client.head_bucket(Bucket=settings.S3_BUCKET)
-    except s3_client.exceptions.ClientError:
-        print("S3 Bucket not found, creating...")
-        s3_client.create_bucket(Bucket=settings.S3_BUCKET)
-
-
-def _resize_icon(data: bytes) -> tuple[bytes, str]:
-    """Resize image to fit within _ICON_MAX_SIZE and re-encode as WebP."""
-    img = Image.open(io.BytesIO(data))
-    img.thumbnail(_ICON_MAX_SIZE, Image.LANCZOS)
-    buf = io.BytesIO()
-    img.save(buf, format="WEBP", quality=85)
-    return buf.getvalue(), "webp"
-
-
-# Helper function to upload a file to MinIO and return its ID
-async def upload_to_minio(file: UploadFile | None, resize_as_icon: bool = False) -> str | None:
-    if file:
-        file_content = await file.read()
-        if resize_as_icon:
-            file_content, ext = _resize_icon(file_content)
-        else:
-            ext = (file.filename or "bin").split(".")[-1]
-        file_id = str(uuid.uuid4()) + "." + ext
-        s3_client.put_object(Bucket=settings.S3_BUCKET, Key=file_id, Body=file_content)
-        return file_id
-    return None
-
-
-# Helper function to delete old MinIO items
-async def delete_minio_item(file_id: str):
-    try:
-        s3_client.delete_object(Bucket=settings.S3_BUCKET, Key=file_id)
-    except s3_client.exceptions.NoSuchKey:
-        print(f"File {file_id} not found in MinIO, skipping deletion.")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error deleting file: {e}")
+# S3 accepts at most 1000 keys per DeleteObjects request
+_DELETE_BATCH_SIZE = 1000
+
+
+class S3Storage(StorageBackend):
+    """Objects stored in a MinIO or AWS S3 bucket."""
+
+    def __init__(self, client: Any, bucket: str) -> None:
+        self.client = client
+        self.bucket = bucket
+
+    def setup(self) -> None:
+        try:
+            print(f"Checking S3 bucket {self.bucket} in {settings.S3_ENDPOINT}")
+            self.client.head_bucket(Bucket=self.bucket)
+        except self.client.exceptions.ClientError:
+            print("S3 Bucket not found, creating...")
+            self.client.create_bucket(Bucket=self.bucket)
+
+    def save(self, key: str, fileobj: BinaryIO) -> None:
+        # upload_fileobj reads the file in parts, switching to a multipart
+        # upload for big files, so it is never loaded whole in memory
+        self.client.upload_fileobj(fileobj, self.bucket, key)
+
+    def stat(self, key: str) -> StoredObject:
+        try:
+            head = self.client.head_object(Bucket=self.bucket, Key=key)
+        except self.client.exceptions.ClientError as e:
+            if e.response["Error"]["Code"] in ("404", "NoSuchKey"):
+                raise FileNotFoundError(key)
+            raise
+        return StoredObject(
+            key=key, size=head["ContentLength"], last_modified=head["LastModified"]
+        )
+
+    def _get_body(self, key: str) -> Any:
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=key)["Body"]
+        except self.client.exceptions.NoSuchKey:
+            raise FileNotFoundError(key)
+
+    def iter_chunks(self, key: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        return self._read(self._get_body(key), chunk_size)
+
+    @staticmethod
+    def _read(body: Any, chunk_size: int) -> Iterator[bytes]:
+        try:
+            yield from body.iter_chunks(chunk_size)
+        finally:
+            body.close()
+
+    def file_response(
+        self,
+        key: str,
+        filename: str | None = None,
+        *,
+        media_type: str = "application/octet-stream",
+        headers: dict[str, str] | None = None,
+    ) -> StreamingResponse:
+        # The file is returned as a stream, no disk storage needed
+        return StreamingResponse(
+            self._get_body(key),
+            media_type=media_type,
+            headers={**content_disposition(filename), **(headers or {})},
+        )
+
+    def delete(self, key: str) -> None:
+        try:
+            self.client.delete_object(Bucket=self.bucket, Key=key)
+        except self.client.exceptions.NoSuchKey:
+            print(f"File {key} not found in S3, skipping deletion.")
+
+    def delete_many(self, keys: Iterable[str]) -> list[str]:
+        keys = list(keys)
+        failed: list[str] = []
+        for start in range(0, len(keys), _DELETE_BATCH_SIZE):
+            batch = keys[start : start + _DELETE_BATCH_SIZE]
+            response = self.client.delete_objects(
+                Bucket=self.bucket,
+                Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True},
+            )
+            failed.extend(error["Key"] for error in response.get("Errors", []))
+        return failed
+
+    def list_objects(self) -> Iterator[StoredObject]:
+        # list_objects_v2 already returns keys in UTF-8 binary order
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket):
+            for obj in page.get("Contents", []):
+                yield StoredObject(
+                    key=obj["Key"], size=obj["Size"], last_modified=obj["LastModified"]
+                )
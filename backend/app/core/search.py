@@ -0,0 +1,44 @@
+"""
+Full-text search of the patterns.
+
+Patterns are searched in `pattern.search_vector`, a generated column with a
+GIN index holding the lexemes of their title, brand, category, fabric and
+description, weighted in that order of importance. Postgres computes it on
+every write, whichever code does it.
+
+The searched text is split in words, each matched as the prefix of a
+lexeme after stemming, and all must match: "linen wrap dres" finds a
+"Wrap Linen Dresses" pattern while it is typed. Results are ranked with
+`ts_rank`, matches in the title first.
+"""
+
+import re
+from typing import Any
+
+from sqlalchemy import ColumnElement, cast, func
+from sqlalchemy.dialects.postgresql import REGCONFIG
+
+from app.models import PATTERN_SEARCH_VECTOR
+
+# Text search configuration of the generated column
+SEARCH_CONFIG = "english"
+
+_WORD = re.compile(r"\w+")
+
+
+def search_query(q: str) -> ColumnElement[Any] | None:
+    """The tsquery of a searched text, None if it has no words."""
+    words = _WORD.findall(q)
+    if not words:
+        return None
+    # Only words are kept, the operators of the tsquery syntax can't be given
+    terms = " & ".join(f"{word}:*" for word in words)
+    return func.to_tsquery(cast(SEARCH_CONFIG, REGCONFIG), terms)
+
+
+def search_match(query: ColumnElement[Any]) -> ColumnElement[bool]:
+    return PATTERN_SEARCH_VECTOR.bool_op("@@")(query)
+
+
+def search_rank(query: ColumnElement[Any]) -> ColumnElement[float]:
+    return func.ts_rank(PATTERN_SEARCH_VECTOR, query)
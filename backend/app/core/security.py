@@ -1,3 +1,7 @@
+import base64
+import hashlib
+import hmac
+import time
 from datetime import datetime, timedelta, timezone
 from typing import Any
 
@@ -21,6 +25,23 @@ def create_access_token(subject: str | Any, expires_delta: timedelta) -> str:
     return encoded_jwt
 
 
+def create_file_signature(filename: str, expires: int) -> str:
+    """This method signs the URL of a stored file, so it can be downloaded without the access token until the `expires` unix time."""
+    digest = hmac.new(
+        settings.SECRET_KEY.encode(),
+        f"{filename}:{expires}".encode(),
+        hashlib.sha256,
+    ).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+
+def verify_file_signature(filename: str, expires: int, signature: str) -> bool:
+    """This method checks that a signed file URL is genuine and has not expired yet."""
+    if expires < time.time():
+        return False
+    return hmac.compare_digest(create_file_signature(filename, expires), signature)
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """This method verifies the hashed password stored in the database. This way if someone with malicious intentions access the database, they won't be able to see the actual password."""
     try:
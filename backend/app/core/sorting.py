@@ -0,0 +1,107 @@
+"""
+Sort orders of the pattern listings.
+
+A sort is the name of a column, with a leading `-` for the descending
+order. Ties are broken by the id, in the same direction, so every order is
+total and a `(column, id)` index serves it, read forward or backward.
+
+A listing sorted this way can be paged with a cursor instead of `skip`:
+the sort values of the last pattern of a page. The next page starts right
+after it in the index, however deep it is, and is not shifted by the
+patterns written meanwhile.
+
+`fabric_amount` can be null, it is sorted as if the patterns without one
+had an infinite amount: last in the ascending order, first in the
+descending one, as Postgres sorts nulls. The cursors never need to compare
+with a null, the next page is always a single index range.
+"""
+
+import base64
+import uuid
+from datetime import datetime
+from typing import Any, Literal
+
+from pydantic import TypeAdapter
+from pydantic_core import to_json
+from sqlalchemy import ColumnElement, tuple_
+from sqlmodel import col
+
+from app.models import PATTERN_FABRIC_AMOUNT_SORT, Pattern
+
+PatternSort = Literal[
+    "title",
+    "-title",
+    "difficulty",
+    "-difficulty",
+    "fabric_amount",
+    "-fabric_amount",
+    "created_at",
+    "-created_at",
+    "updated_at",
+    "-updated_at",
+]
+
+# A cursor is the sort, the value of the sorted column and the id
+_CURSOR: TypeAdapter[Any] = TypeAdapter(tuple[PatternSort, Any, uuid.UUID])
+_SORTED_VALUES: dict[str, TypeAdapter[Any]] = {
+    "title": TypeAdapter(str),
+    "difficulty": TypeAdapter(int),
+    "fabric_amount": TypeAdapter(float | None),
+    "created_at": TypeAdapter(datetime),
+    "updated_at": TypeAdapter(datetime),
+}
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def sorted_column(sort: PatternSort) -> str:
+    return sort.lstrip("-")
+
+
+def _sorted_key(name: str) -> Any:
+    if name == "fabric_amount":
+        return PATTERN_FABRIC_AMOUNT_SORT
+    return col(getattr(Pattern, name))
+
+
+def sort_order(sort: PatternSort) -> list[Any]:
+    column = _sorted_key(sorted_column(sort))
+    if sort.startswith("-"):
+        return [column.desc(), col(Pattern.id).desc()]
+    return [column.asc(), col(Pattern.id).asc()]
+
+
+def encode_cursor(sort: PatternSort, row: Any) -> str:
+    """The cursor of the page following `row`, a mapping of its columns."""
+    payload = to_json([sort, row[sorted_column(sort)], row["id"]])
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(sort: PatternSort, cursor: str) -> tuple[Any, uuid.UUID]:
+    """The sorted value and id of a cursor given for `sort`."""
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, value, id = _CURSOR.validate_json(payload)
+    except ValueError as error:  # Raised by the decoding and the validation
+        raise InvalidCursorError("Invalid cursor") from error
+    if cursor_sort != sort:
+        raise InvalidCursorError("The cursor is of another sort")
+    try:
+        value = _SORTED_VALUES[sorted_column(sort)].validate_python(value)
+    except ValueError as error:
+        raise InvalidCursorError("Invalid cursor") from error
+    return value, id
+
+
+def after_cursor(sort: PatternSort, cursor: str) -> ColumnElement[bool]:
+    """The condition of the patterns after the cursor in the `sort` order."""
+    value, id = decode_cursor(sort, cursor)
+    if value is None:
+        # Of a pattern without a fabric amount
+        value = float("inf")
+    key = tuple_(_sorted_key(sorted_column(sort)), col(Pattern.id))
+    if sort.startswith("-"):
+        return key < tuple_(value, id)
+    return key > tuple_(value, id)
@@ -0,0 +1,134 @@
+import io
+import uuid
+from abc import ABC, abstractmethod
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+from typing import BinaryIO
+
+from fastapi import HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response
+from PIL import Image
+
+from app.core.config import settings
+
+_ICON_MAX_SIZE = (300, 300)
+CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass
+class StoredObject:
+    key: str
+    size: int
+    last_modified: datetime
+
+
+class StorageBackend(ABC):
+    """
+    Object storage for pattern files and icons.
+
+    Keys are flat, immutable names (`<uuid>.<ext>`). Reading a missing key
+    raises `FileNotFoundError`, deleting one is a no-op.
+    """
+
+    @abstractmethod
+    def setup(self) -> None:
+        """Create the bucket or directory holding the objects if needed."""
+
+    @abstractmethod
+    def save(self, key: str, fileobj: BinaryIO) -> None:
+        """Store the content of `fileobj`, reading it in chunks."""
+
+    @abstractmethod
+    def stat(self, key: str) -> StoredObject: ...
+
+    @abstractmethod
+    def iter_chunks(self, key: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        """Stream the content of an object."""
+
+    @abstractmethod
+    def file_response(
+        self,
+        key: str,
+        filename: str | None = None,
+        *,
+        media_type: str = "application/octet-stream",
+        headers: dict[str, str] | None = None,
+    ) -> Response:
+        """
+        Build the response sending the object, as a downloadable attachment
+        when `filename` is given or inline otherwise.
+        """
+
+    @abstractmethod
+    def delete(self, key: str) -> None: ...
+
+    @abstractmethod
+    def delete_many(self, keys: Iterable[str]) -> list[str]:
+        """Delete several objects at once and return the keys that failed."""
+
+    @abstractmethod
+    def list_objects(self) -> Iterator[StoredObject]:
+        """Yield every stored object, ordered by the UTF-8 bytes of its key."""
+
+
+@lru_cache
+def get_storage() -> StorageBackend:
+    if settings.STORAGE_BACKEND == "local":
+        from app.core.local_storage import LocalStorage
+
+        return LocalStorage(settings.STORAGE_LOCAL_PATH)
+
+    from app.core.s3_storage import S3Storage, s3_client
+
+    storage: StorageBackend = S3Storage(s3_client, settings.S3_BUCKET)
+    if settings.FILE_CACHE_DIR:
+        from app.core.file_cache import CachedStorage
+
+        storage = CachedStorage(
+            storage, settings.FILE_CACHE_DIR, settings.FILE_CACHE_MAX_BYTES
+        )
+    return storage
+
+
+def content_disposition(filename: str | None) -> dict[str, str]:
+    if filename is None:
+        return {}
+    return {"Content-Disposition": f"attachment; filename={filename}"}
+
+
+def _resize_icon(data: bytes) -> tuple[bytes, str]:
+    """Resize image to fit within _ICON_MAX_SIZE and re-encode as WebP."""
+    img = Image.open(io.BytesIO(data))
+    img.thumbnail(_ICON_MAX_SIZE, Image.LANCZOS)
+    buf = io.BytesIO()
+    img.save(buf, format="WEBP", quality=85)
+    return buf.getvalue(), "webp"
+
+
+# Helper function to store an uploaded file and return its ID
+async def upload_file(
+    file: UploadFile | None, resize_as_icon: bool = False
+) -> str | None:
+    if file:
+        if resize_as_icon:
+            file_content, ext = _resize_icon(await file.read())
+            fileobj: BinaryIO = io.BytesIO(file_content)
+        else:
+            ext = (file.filename or "bin").split(".")[-1]
+            await file.seek(0)
+            fileobj = file.file
+        file_id = str(uuid.uuid4()) + "." + ext
+        await run_in_threadpool(get_storage().save, file_id, fileobj)
+        return file_id
+    return None
+
+
+# Helper function to delete old stored files
+async def delete_file(file_id: str) -> None:
+    try:
+        get_storage().delete(file_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error deleting file: {e}")
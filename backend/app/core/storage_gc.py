@@ -0,0 +1,198 @@
+"""
+Garbage collector for stored objects that no pattern references.
+
+Both sides are streamed in key order, so the diff is a merge of two sorted
+iterators and memory stays constant regardless of the bucket size:
+
+* Storage backends list objects in UTF-8 binary order of their keys (the
+  order of S3 `list_objects_v2`).
+* Postgres returns every `*_file_id`/`icon` value ordered with the "C"
+  collation, which is the same byte order.
+
+Run it with `python -m app.core.storage_gc --help`.
+"""
+
+import argparse
+import logging
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+
+from prometheus_client import CollectorRegistry, Gauge, write_to_textfile
+from sqlmodel import Session, col, select, union_all
+
+from app.core.config import settings
+from app.core.database import engine
+from app.core.storage import StoredObject, get_storage
+from app.models import PATTERN_FILE_FIELDS, Pattern
+
+logger = logging.getLogger(__name__)
+
+_DELETE_BATCH_SIZE = 1000
+_DB_FETCH_SIZE = 1000
+
+registry = CollectorRegistry()
+_objects_scanned = Gauge(
+    "patternland_storage_gc_objects_scanned",
+    "Objects listed in the storage during the last run",
+    registry=registry,
+)
+_orphans_found = Gauge(
+    "patternland_storage_gc_orphans_found",
+    "Unreferenced objects older than the grace period found in the last run",
+    registry=registry,
+)
+_orphans_deleted = Gauge(
+    "patternland_storage_gc_orphans_deleted",
+    "Unreferenced objects deleted in the last run",
+    registry=registry,
+)
+_bytes_reclaimed = Gauge(
+    "patternland_storage_gc_bytes_reclaimed",
+    "Bytes freed by the last run",
+    registry=registry,
+)
+_delete_errors = Gauge(
+    "patternland_storage_gc_delete_errors",
+    "Objects that could not be deleted in the last run",
+    registry=registry,
+)
+_last_run = Gauge(
+    "patternland_storage_gc_last_run_timestamp_seconds",
+    "Unix time at which the last run finished",
+    registry=registry,
+)
+
+
+@dataclass
+class GCStats:
+    scanned: int = 0
+    referenced: int = 0
+    orphans: int = 0
+    too_recent: int = 0
+    deleted: int = 0
+    bytes_reclaimed: int = 0
+    errors: list[str] = field(default_factory=list)
+
+
+def referenced_keys(session: Session) -> Iterator[str]:
+    """Yield every object key referenced by a pattern, in byte order."""
+    columns = [col(getattr(Pattern, name)) for name in PATTERN_FILE_FIELDS]
+    keys = union_all(
+        *(select(column.label("key")).where(column.is_not(None)) for column in columns)
+    ).subquery()
+    statement = (
+        select(keys.c.key)
+        .order_by(keys.c.key.collate("C"))
+        .execution_options(yield_per=_DB_FETCH_SIZE)
+    )
+    yield from session.exec(statement)
+
+
+def find_orphans(
+    objects: Iterable[StoredObject],
+    keys: Iterable[str],
+    *,
+    older_than: datetime,
+    stats: GCStats,
+) -> Iterator[StoredObject]:
+    """Merge two key-ordered streams and yield the objects nobody references."""
+    keys_iter = iter(keys)
+    current = next(keys_iter, None)
+    for obj in objects:
+        stats.scanned += 1
+        while current is not None and current < obj.key:
+            current = next(keys_iter, None)
+        if current == obj.key:
+            stats.referenced += 1
+            continue
+        if obj.last_modified > older_than:
+            stats.too_recent += 1
+            continue
+        stats.orphans += 1
+        yield obj
+
+
+def _delete_batch(batch: list[StoredObject], stats: GCStats) -> None:
+    failed = set(get_storage().delete_many(obj.key for obj in batch))
+    for obj in batch:
+        if obj.key in failed:
+            stats.errors.append(obj.key)
+        else:
+            stats.deleted += 1
+            stats.bytes_reclaimed += obj.size
+
+
+def collect_garbage(
+    *, grace: timedelta | None = None, dry_run: bool = False
+) -> GCStats:
+    """Delete bucket objects not referenced by any pattern and older than `grace`."""
+    if grace is None:
+        grace = timedelta(hours=settings.STORAGE_GC_GRACE_HOURS)
+    older_than = datetime.now(timezone.utc) - grace
+    stats = GCStats()
+    batch: list[StoredObject] = []
+    with Session(engine) as session:
+        orphans = find_orphans(
+            get_storage().list_objects(),
+            referenced_keys(session),
+            older_than=older_than,
+            stats=stats,
+        )
+        for obj in orphans:
+            logger.info(f"Orphaned object: {obj.key} ({obj.size} bytes)")
+            if dry_run:
+                continue
+            batch.append(obj)
+            if len(batch) == _DELETE_BATCH_SIZE:
+                _delete_batch(batch, stats)
+                batch = []
+    if batch:
+        _delete_batch(batch, stats)
+
+    _objects_scanned.set(stats.scanned)
+    _orphans_found.set(stats.orphans)
+    _orphans_deleted.set(stats.deleted)
+    _bytes_reclaimed.set(stats.bytes_reclaimed)
+    _delete_errors.set(len(stats.errors))
+    _last_run.set_to_current_time()
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--grace-hours",
+        type=float,
+        default=settings.STORAGE_GC_GRACE_HOURS,
+        help="Keep unreferenced objects younger than this (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Only report orphaned objects, do not delete them",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        help="Write the run metrics to this file in Prometheus text format",
+    )
+    args = parser.parse_args()
+
+    stats = collect_garbage(
+        grace=timedelta(hours=args.grace_hours), dry_run=args.dry_run
+    )
+    logger.info(
+        f"Scanned {stats.scanned} objects: {stats.referenced} referenced, "
+        f"{stats.too_recent} within grace period, {stats.orphans} orphaned, "
+        f"{stats.deleted} deleted ({stats.bytes_reclaimed} bytes), "
+        f"{len(stats.errors)} errors"
+    )
+    if args.metrics_file:
+        write_to_textfile(args.metrics_file, registry)
+    if stats.errors:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,174 @@
+"""
+Suggestions of pattern titles and fabrics while a search is typed.
+
+The suggestions of a prefix are the values starting with it, the most
+frequent first, the titles and fabrics shared by the most patterns, then in
+alphabetical order. They are scoped as the listings are: the patterns of
+every user, or only those of the user with `self_patterns`.
+
+Each worker keeps, per scope, the distinct values with their number of
+patterns in lists sorted case insensitively. A prefix is looked up with
+`bisect`, then the values starting with it are ranked, without querying
+the database.
+
+The lists follow the generation of the patterns, bumped by every statement
+changing them and again once it is committed (see `app.core.listing_cache`),
+so imports, bulk writes and cascaded deletions are seen as any other write:
+
+* At most every `_CHECK_INTERVAL` seconds, a lookup reads the generation.
+* The lists of a scope built for an older generation are rebuilt with a
+  grouped query, at most every `_REBUILD_INTERVAL` seconds. A single
+  request rebuilds them, the others get the previous lists meanwhile
+  instead of waiting. Only the first build of a scope is waited for.
+
+The lists of the patterns of a user are kept for the `_MAX_OWNERS` users
+who asked for them last.
+"""
+
+import heapq
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from collections import OrderedDict
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+
+from sqlmodel import Session, col, func, select
+
+from app.core.listing_cache import listing_cache
+from app.models import Pattern
+
+_CHECK_INTERVAL = 1.0
+_REBUILD_INTERVAL = 5.0
+_MAX_OWNERS = 1024
+
+
+class RankedValues:
+    """
+    Distinct strings sorted case insensitively, with their number of
+    patterns. The casing of the most patterns is kept.
+    """
+
+    def __init__(self, counts: Iterable[tuple[str, int]] = ()) -> None:
+        # By casefolded value, its casing of the most patterns and its total
+        casings: dict[str, tuple[str, int]] = {}
+        totals: dict[str, int] = {}
+        for value, count in counts:
+            key = value.casefold()
+            if count > casings.get(key, ("", 0))[1]:
+                casings[key] = value, count
+            totals[key] = totals.get(key, 0) + count
+        keys = sorted(totals)
+        self.values = [casings[key][0] for key in keys]
+        self.counts = [totals[key] for key in keys]
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def starting_with(self, prefix: str, limit: int) -> list[str]:
+        """The values starting with `prefix`, the most frequent first."""
+        key = prefix.casefold()
+        start = bisect_left(self.values, key, key=str.casefold)
+        end = bisect_left(self.values, key + "\U0010ffff", start, key=str.casefold)
+        # Stable, values as frequent stay in alphabetical order
+        found = heapq.nsmallest(limit, range(start, end), key=lambda i: -self.counts[i])
+        return [self.values[index] for index in found]
+
+
+@dataclass
+class _Scope:
+    """Suggestions of the patterns of every user, or of a single one."""
+
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    titles: RankedValues = field(default_factory=RankedValues)
+    fabrics: RankedValues = field(default_factory=RankedValues)
+    generation: int | None = None
+    built_at: float = float("-inf")
+
+
+class SuggestionIndex:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._shared = _Scope()
+        # Least recently used first
+        self._owners: OrderedDict[uuid.UUID, _Scope] = OrderedDict()
+        self._generation: int | None = None
+        self._checked_at = float("-inf")
+
+    def _scope(self, owner_id: uuid.UUID | None) -> _Scope:
+        if owner_id is None:
+            return self._shared
+        with self._lock:
+            scope = self._owners.get(owner_id)
+            if scope is None:
+                scope = self._owners[owner_id] = _Scope()
+                if len(self._owners) > _MAX_OWNERS:
+                    self._owners.popitem(last=False)
+            self._owners.move_to_end(owner_id)
+        return scope
+
+    def _current_generation(self, session: Session) -> int:
+        now = time.monotonic()
+        with self._lock:
+            if self._generation is None or now - self._checked_at >= _CHECK_INTERVAL:
+                self._generation = listing_cache.generation(session)
+                self._checked_at = now
+            return self._generation
+
+    def refresh(self, session: Session, owner_id: uuid.UUID | None = None) -> None:
+        scope = self._scope(owner_id)
+        generation = self._current_generation(session)
+        if scope.generation == generation:
+            return
+        if scope.generation is None:
+            # Nothing to suggest yet, the first build is waited for
+            scope.lock.acquire()
+        elif time.monotonic() - scope.built_at < _REBUILD_INTERVAL:
+            return
+        elif not scope.lock.acquire(blocking=False):
+            # Rebuilt by another request, the previous lists are used meanwhile
+            return
+        try:
+            if scope.generation != generation:
+                self._rebuild(session, scope, generation, owner_id)
+        finally:
+            scope.lock.release()
+
+    @staticmethod
+    def _rebuild(
+        session: Session,
+        scope: _Scope,
+        generation: int,
+        owner_id: uuid.UUID | None,
+    ) -> None:
+        titles = select(Pattern.title, func.count()).group_by(Pattern.title)
+        fabrics = (
+            select(col(Pattern.fabric), func.count())
+            .where(col(Pattern.fabric).is_not(None))
+            .group_by(col(Pattern.fabric))
+        )
+        if owner_id is not None:
+            titles = titles.where(col(Pattern.owner_id) == owner_id)
+            fabrics = fabrics.where(col(Pattern.owner_id) == owner_id)
+        # Read after the generation, the lists are at least as recent
+        scope.titles = RankedValues(session.exec(titles))
+        scope.fabrics = RankedValues(
+            (fabric, count) for fabric, count in session.exec(fabrics) if fabric
+        )
+        scope.generation = generation
+        scope.built_at = time.monotonic()
+
+    def suggest(
+        self, prefix: str, limit: int, owner_id: uuid.UUID | None = None
+    ) -> tuple[list[str], list[str]]:
+        """Titles and fabrics starting with `prefix`, `limit` of each at most."""
+        # Not locked, the lists are replaced as a whole when rebuilt
+        scope = self._scope(owner_id)
+        return (
+            scope.titles.starting_with(prefix, limit),
+            scope.fabrics.starting_with(prefix, limit),
+        )
+
+
+suggestion_index = SuggestionIndex()
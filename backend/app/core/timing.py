@@ -0,0 +1,270 @@
+"""
+Per request breakdown of where the time goes.
+
+`ServerTimingMiddleware` starts a `RequestTimings` for each request, the
+phases are then timed where they happen:
+
+* `auth`: `get_current_user`, token decoding and user lookup.
+* `db`: execution of every SQL statement, through SQLAlchemy cursor
+  events. Fetching the rows and building the ORM objects is not included.
+* `s3`: every S3 API call, through botocore events. Streaming the body of
+  a download is not included.
+* `serialize`: from the endpoint returning to the response being built,
+  i.e. response model validation and JSON encoding. Needs the routes to
+  use `TimedRoute`.
+* Any other block wrapped in `timed()`, e.g. the count and page queries of
+  the pattern listing. Phases may overlap, the execution of the page
+  query is also counted in `db`.
+
+The phases are sent in a `Server-Timing` header, observed in Prometheus
+histograms and logged for requests slower than
+`SLOW_REQUEST_THRESHOLD_MS`.
+
+The SQL statements are also counted per route, and a statement executed
+`REPEATED_QUERY_THRESHOLD` times or more in a single request is logged as
+a likely N+1 query (e.g. a relationship lazy-loaded in a loop).
+"""
+
+import functools
+import inspect
+import logging
+import time
+from collections import Counter
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+from prometheus_client import Counter as MetricCounter
+from prometheus_client import Histogram
+from sqlalchemy import Engine, event
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_phase_seconds = Histogram(
+    "patternland_request_phase_seconds",
+    "Time spent in each phase of a request",
+    ["route", "phase"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+_queries = Histogram(
+    "patternland_request_queries",
+    "SQL statements executed per request",
+    ["route"],
+    buckets=(0, 1, 2, 3, 4, 5, 7, 10, 15, 20, 50, 100),
+)
+_repeated_queries = MetricCounter(
+    "patternland_repeated_queries_total",
+    "Requests executing a statement at least REPEATED_QUERY_THRESHOLD times",
+    ["route"],
+)
+
+
+class RequestTimings:
+    def __init__(self) -> None:
+        self.start = time.perf_counter()
+        # phase -> (total seconds, number of timed blocks)
+        self.phases: dict[str, tuple[float, int]] = {}
+        self.endpoint_end: float | None = None
+        # SQL statement -> number of executions
+        self.statements: Counter[str] = Counter()
+        # Event streams stay open by design, they are never slow
+        self.event_stream = False
+
+    def add(self, phase: str, duration: float) -> None:
+        total, count = self.phases.get(phase, (0.0, 0))
+        self.phases[phase] = (total + duration, count + 1)
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def server_timing(self) -> str:
+        entries = [
+            f"{phase};dur={total * 1000:.1f}"
+            for phase, (total, _) in self.phases.items()
+        ]
+        entries.append(f"total;dur={self.elapsed() * 1000:.1f}")
+        return ", ".join(entries)
+
+
+_timings: ContextVar[RequestTimings | None] = ContextVar("timings", default=None)
+
+
+@contextmanager
+def timed(phase: str) -> Iterator[None]:
+    """Add the time spent in the block to a phase of the current request."""
+    timings = _timings.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(phase, time.perf_counter() - start)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Time every statement executed by the engine in the `db` phase."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn: Any, *_: Any) -> None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn: Any, _cursor: Any, statement: str, *_: Any) -> None:
+        start = conn.info["query_start"].pop()
+        timings = _timings.get()
+        if timings is not None:
+            timings.add("db", time.perf_counter() - start)
+            timings.statements[statement] += 1
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(context: Any) -> None:
+        starts = (
+            context.connection.info.get("query_start") if context.connection else None
+        )
+        if starts:
+            starts.pop()
+
+
+def instrument_boto_client(client: Any) -> None:
+    """Time every API call of a boto3 client in the `s3` phase."""
+
+    def before_call(context: dict[str, Any], **_: Any) -> None:
+        context["timing_start"] = time.perf_counter()
+
+    def after_call(context: dict[str, Any], **_: Any) -> None:
+        start = context.pop("timing_start", None)
+        timings = _timings.get()
+        if start is not None and timings is not None:
+            timings.add("s3", time.perf_counter() - start)
+
+    client.meta.events.register("before-call.s3", before_call)
+    client.meta.events.register("after-call.s3", after_call)
+    client.meta.events.register("after-call-error.s3", after_call)
+
+
+def _timed_endpoint(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+    # Same signature and kind (sync or async) as the endpoint, FastAPI
+    # inspects both
+    if inspect.iscoroutinefunction(endpoint):
+
+        @functools.wraps(endpoint)
+        async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                _mark_endpoint_end()
+
+        return async_wrapper
+
+    @functools.wraps(endpoint)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            _mark_endpoint_end()
+
+    return wrapper
+
+
+def _mark_endpoint_end() -> None:
+    timings = _timings.get()
+    if timings is not None:
+        timings.endpoint_end = time.perf_counter()
+
+
+class TimedRoute(APIRoute):
+    """Route recording the time spent serializing the endpoint result."""
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any) -> None:
+        super().__init__(path, _timed_endpoint(endpoint), **kwargs)
+
+    def get_route_handler(self) -> Callable[[Request], Any]:
+        handler = super().get_route_handler()
+
+        async def timed_handler(request: Request) -> Response:
+            response: Response = await handler(request)
+            timings = _timings.get()
+            if timings is not None and timings.endpoint_end is not None:
+                timings.add("serialize", time.perf_counter() - timings.endpoint_end)
+            return response
+
+        return timed_handler
+
+
+class ServerTimingMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _timings.set(timings)
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                timings.event_stream = headers.get("content-type", "").startswith(
+                    "text/event-stream"
+                )
+                if settings.SERVER_TIMING:
+                    headers.append("Server-Timing", timings.server_timing())
+                if settings.SERVER_TIMING and settings.all_cors_origins:
+                    # Let the frontend read the header from another origin
+                    headers.append(
+                        "Timing-Allow-Origin", ", ".join(settings.all_cors_origins)
+                    )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _timings.reset(token)
+            _record(scope, timings)
+
+
+def _record(scope: Scope, timings: RequestTimings) -> None:
+    total = timings.elapsed()
+    route = scope.get("route")
+    # Unmatched paths are not labelled, they would be unbounded
+    if isinstance(route, APIRoute):
+        for phase, (duration, _) in timings.phases.items():
+            _phase_seconds.labels(route.path, phase).observe(duration)
+        _phase_seconds.labels(route.path, "total").observe(total)
+        _queries.labels(route.path).observe(timings.statements.total())
+
+    repeated = [
+        (statement, count)
+        for statement, count in timings.statements.items()
+        if count >= settings.REPEATED_QUERY_THRESHOLD
+    ]
+    if repeated:
+        if isinstance(route, APIRoute):
+            _repeated_queries.labels(route.path).inc()
+        for statement, count in repeated:
+            logger.warning(
+                f"Possible N+1 query in {scope['method']} {scope['path']}, "
+                f"executed {count} times: {' '.join(statement.split())}"
+            )
+
+    threshold = settings.SLOW_REQUEST_THRESHOLD_MS
+    if threshold is not None and total * 1000 >= threshold and not timings.event_stream:
+        breakdown = ", ".join(
+            f"{phase}={duration * 1000:.1f}ms ({count}x)"
+            for phase, (duration, count) in timings.phases.items()
+        )
+        logger.warning(
+            f"Slow request {scope['method']} {scope['path']} took "
+            f"{total * 1000:.1f}ms: {breakdown or 'no timed phase'}"
+        )
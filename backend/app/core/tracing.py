@@ -0,0 +1,97 @@
+"""
+OpenTelemetry tracing of requests, SQL statements, S3 calls and emails.
+
+Enabled by setting `OTEL_EXPORTER_OTLP_ENDPOINT`, spans are then exported
+over OTLP/HTTP to `<endpoint>/v1/traces`. Only `OTEL_TRACES_SAMPLE_RATE`
+of the traces are recorded, child spans follow the decision of their
+parent, so sampled traces are always complete.
+
+Work started from a request in another thread keeps the request trace
+when it goes through `run_in_threadpool` (the context is copied), other
+threads or executors must wrap their callable with `in_current_context`.
+"""
+
+from collections.abc import Callable
+from typing import ParamSpec, TypeVar
+
+from fastapi import FastAPI
+from opentelemetry import context, trace
+from opentelemetry.instrumentation.botocore import BotocoreInstrumentor
+from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+from opentelemetry.instrumentation.sqlalchemy import SQLAlchemyInstrumentor
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, SpanExporter
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+from app.core.config import settings
+from app.core.database import engine
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+# Probes would fill the traces without telling anything
+_EXCLUDED_URLS = "utils/health-check"
+
+
+def create_tracer_provider(
+    exporter: SpanExporter, sample_rate: float
+) -> TracerProvider:
+    provider = TracerProvider(
+        resource=Resource.create(
+            {
+                "service.name": settings.PROJECT_NAME,
+                "deployment.environment": settings.ENVIRONMENT,
+            }
+        ),
+        sampler=ParentBased(TraceIdRatioBased(sample_rate)),
+    )
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+    return provider
+
+
+def setup_tracing(
+    app: FastAPI,
+    exporter: SpanExporter | None = None,
+    sample_rate: float | None = None,
+) -> TracerProvider:
+    """Install the tracer provider and instrument the app and its clients."""
+    if exporter is None:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
+            OTLPSpanExporter,
+        )
+
+        endpoint = str(settings.OTEL_EXPORTER_OTLP_ENDPOINT).rstrip("/")
+        exporter = OTLPSpanExporter(endpoint=f"{endpoint}/v1/traces")
+    if sample_rate is None:
+        sample_rate = settings.OTEL_TRACES_SAMPLE_RATE
+
+    provider = create_tracer_provider(exporter, sample_rate)
+    # Global, for the spans created through `trace.get_tracer()`
+    trace.set_tracer_provider(provider)
+    FastAPIInstrumentor.instrument_app(
+        app, tracer_provider=provider, excluded_urls=_EXCLUDED_URLS
+    )
+    SQLAlchemyInstrumentor().instrument(engine=engine, tracer_provider=provider)
+    BotocoreInstrumentor().instrument(tracer_provider=provider)  # type: ignore[no-untyped-call]
+    return provider
+
+
+def teardown_tracing(app: FastAPI) -> None:
+    FastAPIInstrumentor.uninstrument_app(app)
+    SQLAlchemyInstrumentor().uninstrument()
+    BotocoreInstrumentor().uninstrument()  # type: ignore[no-untyped-call]
+
+
+def in_current_context(func: Callable[P, R]) -> Callable[P, R]:
+    """Bind `func` to the current trace context, to run it in another thread."""
+    ctx = context.get_current()
+
+    def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+        token = context.attach(ctx)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            context.detach(token)
+
+    return wrapper
@@ -0,0 +1,154 @@
+"""
+Streaming writer for uncompressed (stored) ZIP archives.
+
+Entries are not recompressed, PDFs are already compressed, so the archive
+size is known before reading any content and the archive can be generated
+on the fly with constant memory. The CRC of each entry is only known once
+its content has been read, so it is written in a data descriptor after the
+content, as allowed by the format for non seekable outputs.
+
+ZIP64 is not supported, every entry and the whole archive must stay below
+4 GiB.
+"""
+
+import struct
+import zlib
+from collections.abc import Callable, Iterator, Sequence
+from dataclasses import dataclass
+from datetime import datetime
+
+_LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+_DATA_DESCRIPTOR = struct.Struct("<IIII")
+_CENTRAL_HEADER = struct.Struct("<IHHHHHHIIIHHHHHII")
+_END_OF_CENTRAL_DIR = struct.Struct("<IHHHHIIH")
+
+_VERSION = 20
+# Bit 3: CRC in data descriptor, bit 11: UTF-8 names
+_FLAGS = 0x0808
+_STORED = 0
+_MAX_SIZE = 0xFFFFFFFF
+
+
+@dataclass
+class ZipEntry:
+    name: str
+    size: int
+    modified: datetime
+    # Called when the entry content is needed, returns its chunks
+    open: Callable[[], Iterator[bytes]]
+
+
+def _dos_datetime(value: datetime) -> tuple[int, int]:
+    year = max(value.year, 1980)
+    date = (year - 1980) << 9 | value.month << 5 | value.day
+    time = value.hour << 11 | value.minute << 5 | value.second // 2
+    return time, date
+
+
+class ZipStream:
+    def __init__(self, entries: Sequence[ZipEntry]) -> None:
+        self.entries = entries
+        if self.size > _MAX_SIZE or any(e.size > _MAX_SIZE for e in entries):
+            raise ValueError("Archive too big, ZIP64 is not supported")
+
+    @property
+    def size(self) -> int:
+        """Exact size in bytes of the generated archive."""
+        total = _END_OF_CENTRAL_DIR.size
+        for entry in self.entries:
+            name_size = len(entry.name.encode())
+            total += _LOCAL_HEADER.size + name_size + entry.size
+            total += _DATA_DESCRIPTOR.size
+            total += _CENTRAL_HEADER.size + name_size
+        return total
+
+    def _generate(self) -> Iterator[bytes]:
+        offset = 0
+        central_dir = []
+        for entry in self.entries:
+            name = entry.name.encode()
+            time, date = _dos_datetime(entry.modified)
+            local_header = _LOCAL_HEADER.pack(
+                0x04034B50,
+                _VERSION,
+                _FLAGS,
+                _STORED,
+                time,
+                date,
+                0,
+                entry.size,
+                entry.size,
+                len(name),
+                0,
+            )
+            yield local_header + name
+
+            crc = 0
+            size = 0
+            for chunk in entry.open():
+                crc = zlib.crc32(chunk, crc)
+                size += len(chunk)
+                yield chunk
+            if size != entry.size:
+                raise RuntimeError(
+                    f"{entry.name} is {size} bytes long, expected {entry.size}"
+                )
+            yield _DATA_DESCRIPTOR.pack(0x08074B50, crc, size, size)
+
+            central_dir.append(
+                _CENTRAL_HEADER.pack(
+                    0x02014B50,
+                    _VERSION,
+                    _VERSION,
+                    _FLAGS,
+                    _STORED,
+                    time,
+                    date,
+                    crc,
+                    size,
+                    size,
+                    len(name),
+                    0,
+                    0,
+                    0,
+                    0,
+                    0,
+                    offset,
+                )
+                + name
+            )
+            offset += len(local_header) + len(name) + size + _DATA_DESCRIPTOR.size
+
+        central_dir_size = sum(len(header) for header in central_dir)
+        yield from central_dir
+        yield _END_OF_CENTRAL_DIR.pack(
+            0x06054B50,
+            0,
+            0,
+            len(self.entries),
+            len(self.entries),
+            central_dir_size,
+            offset,
+            0,
+        )
+
+    def iter_range(self, start: int = 0, end: int | None = None) -> Iterator[bytes]:
+        """
+        Yield the bytes of the archive from `start` to `end` (both included).
+
+        Entries before `start` are still read, their CRC is needed for the
+        data descriptors and the central directory, but they are not sent.
+        """
+        if end is None:
+            end = self.size - 1
+        position = 0
+        for chunk in self._generate():
+            chunk_end = position + len(chunk)
+            if chunk_end > start:
+                yield chunk[max(start - position, 0) : end + 1 - position]
+            position = chunk_end
+            if position > end:
+                return
+
+    def __iter__(self) -> Iterator[bytes]:
+        return self.iter_range()
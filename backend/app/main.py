@@ -8,6 +8,8 @@ from app.api.deps import get_current_active_superuser
 from app.api.main import api_router
 from app.core.config import settings
 from app.core.lifespan import lifespan
+from app.core.profiler import ProfilerMiddleware
+from app.core.timing import ServerTimingMiddleware
 
 
 def custom_generate_unique_id(route: APIRoute) -> str:
@@ -35,9 +37,20 @@ if settings.all_cors_origins:
         allow_headers=["*"],
     )
 
+app.add_middleware(ServerTimingMiddleware)
+# Only does anything for superuser requests with the X-Profile header
+app.add_middleware(ProfilerMiddleware)
+
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
 
+# Export OpenTelemetry traces
+if settings.OTEL_EXPORTER_OTLP_ENDPOINT:
+    from app.core.tracing import setup_tracing
+
+    setup_tracing(app)
+
+
 # Enable /metrics endpoint for Prometheus
 if settings.PROMETHEUS_METRICS:
     if settings.ENVIRONMENT == "local":
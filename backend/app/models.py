@@ -1,9 +1,24 @@
 import uuid
 from datetime import datetime, timezone
-from typing import Literal
+from typing import Any, Literal, get_args
 
 from pydantic import EmailStr
-from sqlmodel import DateTime, Field, Relationship, SQLModel, String
+from sqlalchemy import Computed, func, literal_column, text
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlmodel import (
+    JSON,
+    BigInteger,
+    Column,
+    DateTime,
+    Enum,
+    Field,
+    Index,
+    LargeBinary,
+    Relationship,
+    SQLModel,
+    String,
+    col,
+)
 
 
 # Shared properties
@@ -98,52 +113,64 @@ class ItemsPublic(SQLModel):
 
 
 # Patterns
+# Values of the categorical fields, also the labels of their Postgres enums
+PatternBrand = Literal[
+    "Fibre Mood",
+    "Other",
+    "Seamwork",
+    "Katia",
+    "Burda",
+    "Patrones",
+]
+PatternVersion = Literal["Paper", "Digital"]
+PatternForWho = Literal["Baby", "Kids", "Men", "Women", "Pets", "Unisex"]
+PatternCategory = Literal[
+    "Accessories",
+    "Bags",
+    "Blazers",
+    "Bodywarmer",
+    "Cardigans",
+    "Coats",
+    "DIY",
+    "Dresses",
+    "Hoodie",
+    "Jackets",
+    "Jumpers",
+    "Jumpsuits",
+    "Overalls",
+    "Overshirt",
+    "Pullovers",
+    "Shirts",
+    "Shorts",
+    "Skirts",
+    "Sweaters",
+    "Swimwear",
+    "T-shirts",
+    "Tops",
+    "Trousers",
+]
+
+# Stored as 4 bytes, compared as integers and read back as the strings. A
+# value added to a Literal needs a migration adding it to the enum
+PATTERN_ENUMS = {
+    "brand": Enum(*get_args(PatternBrand), name="patternbrand"),
+    "version": Enum(*get_args(PatternVersion), name="patternversion"),
+    "for_who": Enum(*get_args(PatternForWho), name="patternforwho"),
+    "category": Enum(*get_args(PatternCategory), name="patterncategory"),
+}
+
+
 # Shared properties
 class PatternBase(SQLModel):
     title: str = Field(min_length=1, max_length=255)
     description: str | None = Field(default=None, max_length=1023)
-    brand: Literal[
-        "Fibre Mood",
-        "Other",
-        "Seamwork",
-        "Katia",
-        "Burda",
-        "Patrones",
-    ] = Field(sa_type=String, max_length=255)
-    version: Literal["Paper", "Digital"] = Field(sa_type=String, max_length=255)
+    brand: PatternBrand = Field(sa_type=PATTERN_ENUMS["brand"], max_length=255)
+    version: PatternVersion = Field(sa_type=PATTERN_ENUMS["version"], max_length=255)
     pattern_url: str | None = Field(default=None, max_length=255)
-    for_who: Literal["Baby", "Kids", "Men", "Women", "Pets", "Unisex"] = Field(
-        max_length=255,
-        sa_type=String,
+    for_who: PatternForWho = Field(sa_type=PATTERN_ENUMS["for_who"], max_length=255)
+    category: PatternCategory | None = Field(
+        default=None, sa_type=PATTERN_ENUMS["category"], max_length=255
     )
-    category: (
-        Literal[
-            "Accessories",
-            "Bags",
-            "Blazers",
-            "Bodywarmer",
-            "Cardigans",
-            "Coats",
-            "DIY",
-            "Dresses",
-            "Hoodie",
-            "Jackets",
-            "Jumpers",
-            "Jumpsuits",
-            "Overalls",
-            "Overshirt",
-            "Pullovers",
-            "Shirts",
-            "Shorts",
-            "Skirts",
-            "Sweaters",
-            "Swimwear",
-            "T-shirts",
-            "Tops",
-            "Trousers",
-        ]
-        | None
-    ) = Field(default=None, sa_type=String, max_length=255)
     difficulty: int = Field(ge=1, le=5)
     fabric: str | None = Field(default=None, max_length=255)
     fabric_amount: float | None = Field(default=None)  # in cm
@@ -158,50 +185,11 @@ class PatternCreate(PatternBase):
 class PatternUpdate(PatternBase):
     title: str | None = Field(default=None, min_length=1, max_length=255)  # type: ignore
     description: str | None = Field(default=None, max_length=255)
-    brand: (
-        Literal[
-            "Fibre Mood",
-            "Other",
-            "Seamwork",
-            "Katia",
-            "Burda",
-            "Patrones",
-        ]
-        | None
-    ) = Field(default=None, max_length=255)
-    version: Literal["Paper", "Digital"] | None = Field(default=None, max_length=255)
+    brand: PatternBrand | None = Field(default=None, max_length=255)
+    version: PatternVersion | None = Field(default=None, max_length=255)
     pattern_url: str | None = Field(default=None, max_length=255)
-    for_who: Literal["Baby", "Kids", "Men", "Women", "Pets", "Unisex"] | None = Field(
-        default=None, max_length=255
-    )
-    category: (
-        Literal[
-            "Accessories",
-            "Bags",
-            "Blazers",
-            "Bodywarmer",
-            "Cardigans",
-            "Coats",
-            "DIY",
-            "Dresses",
-            "Hoodie",
-            "Jackets",
-            "Jumpers",
-            "Jumpsuits",
-            "Overalls",
-            "Overshirt",
-            "Pullovers",
-            "Shirts",
-            "Shorts",
-            "Skirts",
-            "Sweaters",
-            "Swimwear",
-            "T-shirts",
-            "Tops",
-            "Trousers",
-        ]
-        | None
-    ) = Field(default=None, sa_type=String, max_length=255)
+    for_who: PatternForWho | None = Field(default=None, max_length=255)
+    category: PatternCategory | None = Field(default=None, max_length=255)
     difficulty: int | None = Field(default=None, ge=1, le=5)
     fabric: str | None = Field(default=None, max_length=255)
     fabric_amount: float | None = Field(default=None)
@@ -210,18 +198,21 @@ class PatternUpdate(PatternBase):
 # Database model, database table inferred from class name
 class Pattern(PatternBase, table=True):
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    # Indexed, the patterns of a user are listed and suggested
     owner_id: uuid.UUID = Field(
-        foreign_key="user.id", nullable=False, ondelete="CASCADE"
+        foreign_key="user.id", nullable=False, ondelete="CASCADE", index=True
     )
     owner: User | None = Relationship(back_populates="patterns")
-    pattern_a0_file_id: str | None = Field(default=None)
-    pattern_a0_sa_file_id: str | None = Field(default=None)
-    pattern_a0_sa_projector_file_id: str | None = Field(default=None)
-    pattern_a0_projector_file_id: str | None = Field(default=None)
-    pattern_a4_file_id: str | None = Field(default=None)
-    pattern_a4_sa_file_id: str | None = Field(default=None)
-    pattern_instructables_file_id: str | None = Field(default=None)
-    icon: str | None = Field(default=None)
+    # Indexed, file requests are checked against the pattern referencing them
+    pattern_a0_file_id: str | None = Field(default=None, index=True)
+    pattern_a0_sa_file_id: str | None = Field(default=None, index=True)
+    pattern_a0_sa_projector_file_id: str | None = Field(default=None, index=True)
+    pattern_a0_projector_file_id: str | None = Field(default=None, index=True)
+    pattern_a4_file_id: str | None = Field(default=None, index=True)
+    pattern_a4_sa_file_id: str | None = Field(default=None, index=True)
+    pattern_instructables_file_id: str | None = Field(default=None, index=True)
+    # Indexed, public icon requests are checked against it
+    icon: str | None = Field(default=None, index=True)
     created_at: datetime = Field(
         default_factory=lambda: datetime.now(tz=timezone.utc),
         sa_type=DateTime(timezone=True),
@@ -232,6 +223,77 @@ class Pattern(PatternBase, table=True):
     )
 
 
+def _enum_text(name: str) -> str:
+    """SQL of the label of an enum column, '' for null."""
+    # A cast to text is not immutable, labels can be renamed, so it can't be
+    # used in a generated column. Comparisons with the labels can
+    cases = " ".join(
+        f"WHEN '{label}' THEN '{label}'" for label in PATTERN_ENUMS[name].enums
+    )
+    return f"CASE {name} {cases} ELSE '' END"
+
+
+# Full-text search document of the patterns, computed by Postgres on every
+# write. Added to the table but not mapped, so it is never loaded with them
+PATTERN_SEARCH_VECTOR = Column(
+    "search_vector",
+    TSVECTOR,
+    Computed(
+        "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('english', "
+        f"{_enum_text('brand')} || ' ' || {_enum_text('category')}), 'B') || "
+        "setweight(to_tsvector('english', coalesce(fabric, '')), 'C') || "
+        "setweight(to_tsvector('english', coalesce(description, '')), 'D')",
+        persisted=True,
+    ),
+)
+Pattern.__table__.append_column(PATTERN_SEARCH_VECTOR)  # type: ignore[attr-defined]
+Index("ix_pattern_search_vector", PATTERN_SEARCH_VECTOR, postgresql_using="gin")
+# The fabric amount as sorted, the patterns without one as the largest. A
+# literal, an index on the expression is only used by the same expression
+PATTERN_FABRIC_AMOUNT_SORT = func.coalesce(
+    Pattern.fabric_amount, literal_column("'Infinity'::double precision")
+)
+# Filters of the listings, a category or brand (or several with IN) first,
+# then the difficulty and fabric amount ranges
+Index(
+    "ix_pattern_category_difficulty_fabric_amount",
+    col(Pattern.category),
+    col(Pattern.difficulty),
+    col(Pattern.fabric_amount),
+)
+Index("ix_pattern_brand_difficulty", col(Pattern.brand), col(Pattern.difficulty))
+# Sort orders of the listings, ties broken by the id (see `app.core.sorting`)
+Index("ix_pattern_title_id", col(Pattern.title), col(Pattern.id))
+Index("ix_pattern_difficulty_id", col(Pattern.difficulty), col(Pattern.id))
+Index("ix_pattern_fabric_amount_id", PATTERN_FABRIC_AMOUNT_SORT, col(Pattern.id))
+Index("ix_pattern_created_at_id", col(Pattern.created_at), col(Pattern.id))
+Index("ix_pattern_updated_at_id", col(Pattern.updated_at), col(Pattern.id))
+
+
+# Pattern columns holding keys of objects stored in the S3 bucket
+PATTERN_FILE_FIELDS = (
+    "pattern_a0_file_id",
+    "pattern_a0_sa_file_id",
+    "pattern_a0_sa_projector_file_id",
+    "pattern_a0_projector_file_id",
+    "pattern_a4_file_id",
+    "pattern_a4_sa_file_id",
+    "pattern_instructables_file_id",
+    "icon",
+)
+
+
+# Pattern listings shared by every worker, UNLOGGED as they can be lost
+class ListingCacheEntry(SQLModel, table=True):
+    __tablename__ = "listingcache"
+    __table_args__ = {"prefixes": ["UNLOGGED"]}
+
+    key: str = Field(primary_key=True, max_length=64)
+    generation: int = Field(sa_type=BigInteger)
+    body: bytes = Field(sa_type=LargeBinary)
+
+
 # Properties to return via API, id is always required
 class PatternPublic(PatternBase):
     id: uuid.UUID
@@ -249,6 +311,169 @@ class PatternPublic(PatternBase):
 class PatternsPublic(SQLModel):
     data: list[PatternPublic]
     count: int
+    # The cursor of the next page, when the page is full and sorted
+    next: str | None = None
+
+
+# Pattern listed with `fields=`, only the requested fields are sent
+class PatternPartialPublic(PatternUpdate):
+    id: uuid.UUID
+    owner_id: uuid.UUID | None = None
+    pattern_a0_file_id: str | None = None
+    pattern_a0_sa_file_id: str | None = None
+    pattern_a0_sa_projector_file_id: str | None = None
+    pattern_a0_projector_file_id: str | None = None
+    pattern_a4_file_id: str | None = None
+    pattern_a4_sa_file_id: str | None = None
+    pattern_instructables_file_id: str | None = None
+    icon: str | None = None
+
+
+class PatternsPartialPublic(SQLModel):
+    data: list[PatternPartialPublic]
+    count: int
+    # The cursor of the next page, when the page is full and sorted
+    next: str | None = None
+
+
+# Titles and fabrics completing a search being typed
+class PatternSuggestions(SQLModel):
+    titles: list[str]
+    fabrics: list[str]
+
+
+# Item of a bulk update, the fields to update of an existing pattern
+class PatternBulkUpdate(PatternUpdate):
+    id: uuid.UUID
+
+
+# Outcome of an item of a bulk request, with the HTTP status it would have
+# had as a single request
+class BulkItemResult(SQLModel):
+    index: int
+    status: int
+    id: uuid.UUID | None = None
+    detail: Any = None
+
+
+class BulkResults(SQLModel):
+    data: list[BulkItemResult]
+
+
+# Row of an imported file, with the id of an existing pattern to update
+class PatternImportRow(PatternCreate):
+    id: uuid.UUID | None = None
+
+
+# Import of a file of patterns, run in the background
+class PatternImportBase(SQLModel):
+    format: Literal["csv", "ndjson"] = Field(sa_type=String, max_length=16)
+    status: Literal["pending", "running", "done", "failed"] = Field(
+        default="pending", sa_type=String, max_length=16
+    )
+    # Bytes of the file, and read so far
+    size: int = Field(default=0, sa_type=BigInteger)
+    position: int = Field(default=0, sa_type=BigInteger)
+    rows: int = 0
+    imported: int = 0
+    failed: int = 0
+    # Why the import failed, the rejected rows are reported apart
+    detail: str | None = Field(default=None, max_length=1023)
+    created_at: datetime = Field(
+        default_factory=lambda: datetime.now(tz=timezone.utc),
+        sa_type=DateTime(timezone=True),
+    )
+    finished_at: datetime | None = Field(default=None, sa_type=DateTime(timezone=True))
+
+
+class PatternImport(PatternImportBase, table=True):
+    __tablename__ = "patternimport"
+
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    owner_id: uuid.UUID = Field(
+        foreign_key="user.id", nullable=False, ondelete="CASCADE", index=True
+    )
+
+
+# Row of an import that was not imported, by its line in the file
+class PatternImportError(SQLModel, table=True):
+    __tablename__ = "patternimporterror"
+
+    import_id: uuid.UUID = Field(
+        foreign_key="patternimport.id", primary_key=True, ondelete="CASCADE"
+    )
+    line: int = Field(primary_key=True)
+    detail: Any = Field(sa_type=JSON)
+
+
+class PatternImportPublic(PatternImportBase):
+    id: uuid.UUID
+
+
+# Change of a pattern, recorded by triggers on every write to the pattern
+# table and sent to the clients of the change feed (see `app.core.events`).
+# Kept for a day, the id is the resume token of the feed
+PatternEventKind = Literal["created", "updated", "uploaded", "deleted"]
+
+
+class PatternEvent(SQLModel, table=True):
+    __tablename__ = "patternevent"
+
+    id: int | None = Field(default=None, primary_key=True, sa_type=BigInteger)
+    # Not foreign keys, the events of deleted patterns are kept
+    pattern_id: uuid.UUID
+    owner_id: uuid.UUID
+    kind: PatternEventKind = Field(sa_type=String)
+    created_at: datetime = Field(
+        sa_type=DateTime(timezone=True),
+        sa_column_kwargs={"server_default": func.now()},
+    )
+    # Transaction recording the event, and oldest transaction still running
+    # when it did, see `app.core.events`
+    xid: int | None = Field(
+        default=None,
+        nullable=False,
+        index=True,
+        sa_type=BigInteger,
+        sa_column_kwargs={
+            "server_default": text("(pg_current_xact_id()::text)::bigint")
+        },
+    )
+    horizon: int | None = Field(
+        default=None,
+        nullable=False,
+        sa_type=BigInteger,
+        sa_column_kwargs={
+            "server_default": text(
+                "(pg_snapshot_xmin(pg_current_snapshot())::text)::bigint"
+            )
+        },
+    )
+
+
+# Response to a request sent with an `Idempotency-Key`, returned again to
+# the retries of the request (see `app.core.idempotency`). Kept for a day
+class IdempotencyKey(SQLModel, table=True):
+    __tablename__ = "idempotencykey"
+
+    owner_id: uuid.UUID = Field(
+        foreign_key="user.id", primary_key=True, ondelete="CASCADE"
+    )
+    key: str = Field(primary_key=True, max_length=255)
+    # Method and path of the request, a key is for a single request
+    request: str = Field(max_length=255)
+    # Hash of the content of the request
+    fingerprint: str = Field(max_length=64)
+    # None while the request is processed
+    status_code: int | None = None
+    body: bytes | None = Field(default=None, sa_type=LargeBinary)
+    created_at: datetime = Field(sa_type=DateTime(timezone=True), index=True)
+
+
+# Signed URL to download a stored file without the access token
+class FileUrl(SQLModel):
+    url: str
+    expires_at: datetime
 
 
 # Generic message
@@ -0,0 +1,1366 @@
+import csv
+import io
+import json
+import os
+import threading
+import time
+import uuid
+import zipfile
+from typing import Any
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, col, delete, select, text
+
+from app.api.routes import patterns as patterns_routes
+from app.core import events, idempotency, pattern_import, suggest
+from app.core.config import settings
+from app.core.database import engine
+from app.core.security import create_file_signature
+from app.core.storage import get_storage
+from app.models import PATTERN_ENUMS, Pattern, PatternEvent, PatternPublic
+from app.tests.utils.pattern import create_random_pattern
+from app.tests.utils.queries import assert_max_queries
+from app.tests.utils.utils import random_lower_string
+
+
+def _store(content: bytes, ext: str = "pdf") -> str:
+    key = f"{uuid.uuid4()}.{ext}"
+    get_storage().save(key, io.BytesIO(content))
+    return key
+
+
+def test_download_bundle(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    a0 = b"%PDF-1.4 a0" * 1000
+    instructions = b"%PDF-1.4 instructions"
+    pattern = create_random_pattern(
+        db,
+        pattern_a0_file_id=_store(a0),
+        pattern_instructables_file_id=_store(instructions),
+        icon=_store(b"icon", "webp"),
+    )
+    response = client.get(
+        f"{settings.API_V1_STR}/patterns/{pattern.id}/bundle.zip",
+        headers=superuser_token_headers,
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/zip"
+    assert int(response.headers["content-length"]) == len(response.content)
+    with zipfile.ZipFile(io.BytesIO(response.content)) as bundle:
+        assert bundle.testzip() is None
+        assert sorted(bundle.namelist()) == [
+            "pattern_a0.pdf",
+            "pattern_instructables.pdf",
+        ]
+        assert bundle.read("pattern_a0.pdf") == a0
+        assert bundle.read("pattern_instructables.pdf") == instructions
+        assert all(
+            info.compress_type == zipfile.ZIP_STORED for info in bundle.infolist()
+        )
+
+
+def test_download_bundle_range(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    pattern = create_random_pattern(
+        db,
+        pattern_a0_file_id=_store(b"a" * 5000),
+        pattern_a4_file_id=_store(b"b" * 3000),
+    )
+    url = f"{settings.API_V1_STR}/patterns/{pattern.id}/bundle.zip"
+    full = client.get(url, headers=superuser_token_headers)
+    etag = full.headers["etag"]
+
+    response = client.get(
+        url,
+        headers={**superuser_token_headers, "Range": "bytes=4000-", "If-Range": etag},
+    )
+    assert response.status_code == 206
+    assert (
+        response.headers["content-range"]
+        == f"bytes 4000-{len(full.content) - 1}/{len(full.content)}"
+    )
+    assert response.content == full.content[4000:]
+
+    response = client.get(
+        url, headers={**superuser_token_headers, "Range": "bytes=10-19"}
+    )
+    assert response.status_code == 206
+    assert response.content == full.content[10:20]
+
+    # A stale If-Range sends the whole archive
+    response = client.get(
+        url,
+        headers={**superuser_token_headers, "Range": "bytes=10-", "If-Range": '"old"'},
+    )
+    assert response.status_code == 200
+    assert response.content == full.content
+
+    response = client.get(
+        url, headers={**superuser_token_headers, "Range": "bytes=100000-"}
+    )
+    assert response.status_code == 416
+
+
+def test_download_bundle_without_files(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    pattern = create_random_pattern(db)
+    response = client.get(
+        f"{settings.API_V1_STR}/patterns/{pattern.id}/bundle.zip",
+        headers=superuser_token_headers,
+    )
+    assert response.status_code == 404
+
+
+def test_download_bundle_not_enough_permissions(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    pattern = create_random_pattern(db, pattern_a0_file_id=_store(b"a"))
+    response = client.get(
+        f"{settings.API_V1_STR}/patterns/{pattern.id}/bundle.zip",
+        headers=normal_user_token_headers,
+    )
+    assert response.status_code == 403
+
+
+def test_read_icon_is_public_and_cacheable(client: TestClient, db: Session) -> None:
+    icon = _store(b"RIFF....WEBP", "webp")
+    create_random_pattern(db, icon=icon)
+    response = client.get(f"{settings.API_V1_STR}/patterns/icons/{icon}")
+    assert response.status_code == 200
+    assert response.content == b"RIFF....WEBP"
+    assert response.headers["content-type"] == "image/webp"
+    assert "immutable" in response.headers["cache-control"]
+    assert "public" in response.headers["cache-control"]
+    assert "content-disposition" not in response.headers
+    etag = response.headers["etag"]
+
+    response = client.get(
+        f"{settings.API_V1_STR}/patterns/icons/{icon}",
+        headers={"If-None-Match": etag},
+    )
+    assert response.status_code == 304
+    assert response.content == b""
+
+
+def test_read_icon_only_serves_icons(client: TestClient, db: Session) -> None:
+    pdf = _store(b"%PDF-1.4")
+    create_random_pattern(db, pattern_a0_file_id=pdf)
+    response = client.get(f"{settings.API_V1_STR}/patterns/icons/{pdf}")
+    assert response.status_code == 404
+
+
+def test_download_signed_url(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    me = client.get(
+        f"{settings.API_V1_STR}/users/me", headers=normal_user_token_headers
+    ).json()
+    pdf = _store(b"%PDF-1.4 signed")
+    create_random_pattern(db, owner_id=me["id"], pattern_a4_file_id=pdf)
+    response = client.get(
+        f"{settings.API_V1_STR}/patterns/download-url/{pdf}",
+        headers=normal_user_token_headers,
+    )
+    assert response.status_code == 200
+    url = response.json()["url"]
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.content == b"%PDF-1.4 signed"
+    assert "private" in response.headers["cache-control"]
+    assert "attachment" in response.headers["content-disposition"]
+
+    # Same URL while it is valid, so browsers can reuse their cached copy
+    response = client.get(
+        f"{settings.API_V1_STR}/patterns/download-url/{pdf}",
+        headers=normal_user_token_headers,
+    )
+    assert response.json()["url"] == url
+
+
+def test_download_signed_url_not_enough_permissions(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    pdf = _store(b"%PDF-1.4")
+    create_random_pattern(db, pattern_a0_file_id=pdf)
+    response = client.get(
+        f"{settings.API_V1_STR}/patterns/download-url/{pdf}",
+        headers=normal_user_token_headers,
+    )
+    assert response.status_code == 403
+
+
+def test_download_unreferenced_file(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    pdf = _store(b"%PDF-1.4")
+    response = client.get(
+        f"{settings.API_V1_STR}/patterns/download-url/{pdf}",
+        headers=superuser_token_headers,
+    )
+    assert response.status_code == 404
+    response = client.get(
+        f"{settings.API_V1_STR}/patterns/download/{pdf}",
+        headers=superuser_token_headers,
+    )
+    assert response.status_code == 404
+    expires = int(time.time()) + 3600
+    response = client.get(
+        f"{settings.API_V1_STR}/patterns/files/{pdf}",
+        params={"expires": expires, "signature": create_file_signature(pdf, expires)},
+    )
+    assert response.status_code == 404
+
+
+def test_download_signed_url_rejects_tampering(client: TestClient) -> None:
+    pdf = _store(b"%PDF-1.4")
+    expires = int(time.time()) + 3600
+    signature = create_file_signature(pdf, expires)
+    url = f"{settings.API_V1_STR}/patterns/files/{pdf}"
+
+    response = client.get(url, params={"expires": expires + 1, "signature": signature})
+    assert response.status_code == 403
+    response = client.get(
+        f"{settings.API_V1_STR}/patterns/files/other.pdf",
+        params={"expires": expires, "signature": signature},
+    )
+    assert response.status_code == 403
+
+    expired = int(time.time()) - 1
+    response = client.get(
+        url,
+        params={"expires": expired, "signature": create_file_signature(pdf, expired)},
+    )
+    assert response.status_code == 403
+
+
+def test_read_patterns_query_count(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    for _ in range(5):
+        create_random_pattern(db)
+    # User lookup, cache generation, count and page, whatever the number of
+    # patterns
+    with assert_max_queries(4):
+        response = client.get(
+            f"{settings.API_V1_STR}/patterns/", headers=superuser_token_headers
+        )
+    assert response.status_code == 200
+    assert len(response.json()["data"]) >= 5
+
+    # Cached, only the user lookup and the cache generation
+    with assert_max_queries(2):
+        cached = client.get(
+            f"{settings.API_V1_STR}/patterns/", headers=superuser_token_headers
+        )
+    assert cached.status_code == 200
+    assert cached.json() == response.json()
+
+
+def test_read_patterns_cache_invalidation(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    url = f"{settings.API_V1_STR}/patterns/?category=Dresses&limit=1000"
+    before = client.get(url, headers=superuser_token_headers).json()
+
+    response = client.post(
+        f"{settings.API_V1_STR}/patterns/",
+        headers=superuser_token_headers,
+        json={
+            "title": "Cached dress",
+            "brand": "Other",
+            "version": "Digital",
+            "for_who": "Women",
+            "category": "Dresses",
+            "difficulty": 1,
+        },
+    )
+    id = response.json()["id"]
+    created = client.get(url, headers=superuser_token_headers).json()
+    assert created["count"] == before["count"] + 1
+    assert id in [pattern["id"] for pattern in created["data"]]
+
+    client.put(
+        f"{settings.API_V1_STR}/patterns/{id}",
+        headers=superuser_token_headers,
+        json={"category": "Tops"},
+    )
+    updated = client.get(url, headers=superuser_token_headers).json()
+    assert id not in [pattern["id"] for pattern in updated["data"]]
+
+    # Writes outside of the routes invalidate the listings too
+    create_random_pattern(db)
+    assert client.get(url, headers=superuser_token_headers).json()["count"] == (
+        updated["count"] + 1
+    )
+
+    client.delete(
+        f"{settings.API_V1_STR}/patterns/{id}", headers=superuser_token_headers
+    )
+    url = f"{settings.API_V1_STR}/patterns/?limit=1000"
+    deleted = client.get(url, headers=superuser_token_headers).json()
+    assert id not in [pattern["id"] for pattern in deleted["data"]]
+
+
+def test_read_self_patterns_cached_per_user(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    normal_user_token_headers: dict[str, str],
+) -> None:
+    url = f"{settings.API_V1_STR}/patterns/?self_patterns=true&limit=1000"
+    for headers in (superuser_token_headers, normal_user_token_headers) * 2:
+        me = client.get(f"{settings.API_V1_STR}/users/me", headers=headers).json()
+        response = client.get(url, headers=headers)
+        assert response.status_code == 200
+        assert all(
+            pattern["owner_id"] == me["id"] for pattern in response.json()["data"]
+        )
+
+
+def test_read_patterns_not_modified(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    url = f"{settings.API_V1_STR}/patterns/"
+    response = client.get(url, headers=superuser_token_headers)
+    etag = response.headers["etag"]
+    assert response.headers["cache-control"] == "private, no-cache"
+
+    headers = {**superuser_token_headers, "If-None-Match": etag}
+    # Only the user lookup and the cache generation
+    with assert_max_queries(2):
+        response = client.get(url, headers=headers)
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    # Other filters, other listing
+    response = client.get(url, headers=headers, params={"brand": "Burda"})
+    assert response.status_code == 200
+
+    create_random_pattern(db)
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+def test_read_pattern_not_modified(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    pattern = create_random_pattern(db)
+    url = f"{settings.API_V1_STR}/patterns/{pattern.id}"
+    response = client.get(url, headers=superuser_token_headers)
+    etag = response.headers["etag"]
+
+    headers = {**superuser_token_headers, "If-None-Match": f'"other", {etag}'}
+    # The user lookup and the version check, not the whole row
+    with assert_max_queries(2):
+        response = client.get(url, headers=headers)
+    assert response.status_code == 304
+
+    client.post(
+        f"{settings.API_V1_STR}/patterns/upload/",
+        headers=superuser_token_headers,
+        data={"id": str(pattern.id)},
+        files={"pattern_a4_file": ("a4.pdf", b"%PDF-1.4", "application/pdf")},
+    )
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+def test_read_pattern_not_modified_forbidden(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    pattern = create_random_pattern(db)
+    response = client.get(
+        f"{settings.API_V1_STR}/patterns/{pattern.id}",
+        headers={**normal_user_token_headers, "If-None-Match": "*"},
+    )
+    assert response.status_code == 403
+
+
+def test_read_patterns_fields(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    pattern = create_random_pattern(db)
+    with assert_max_queries(4) as statements:
+        response = client.get(
+            f"{settings.API_V1_STR}/patterns/",
+            headers=superuser_token_headers,
+            params={"fields": "title, brand,icon", "title": pattern.title},
+        )
+    assert response.status_code == 200
+    assert response.json()["data"] == [
+        {"id": str(pattern.id), "title": pattern.title, "brand": "Other", "icon": None}
+    ]
+    # Only the requested columns are read
+    page = statements[-1]
+    assert "pattern.title" in page
+    assert "pattern.description" not in page
+
+    response = client.get(
+        f"{settings.API_V1_STR}/patterns/",
+        headers=superuser_token_headers,
+        params={"fields": "id", "title": pattern.title},
+    )
+    assert response.json()["data"] == [{"id": str(pattern.id)}]
+
+
+def test_read_patterns_unknown_fields(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/patterns/",
+        headers=superuser_token_headers,
+        params={"fields": "title,hashed_password"},
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Unknown fields: hashed_password"
+
+
+def test_read_patterns_range_and_any_of_filters(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    title = random_lower_string()
+    dress = create_random_pattern(
+        db, title=f"{title} a", category="Dresses", difficulty=2, fabric_amount=150
+    )
+    skirt = create_random_pattern(
+        db, title=f"{title} b", category="Skirts", difficulty=1, fabric_amount=80
+    )
+    # Too hard, too much fabric, another category
+    create_random_pattern(db, title=f"{title} c", category="Skirts", difficulty=3)
+    create_random_pattern(
+        db, title=f"{title} d", category="Dresses", difficulty=1, fabric_amount=250
+    )
+    create_random_pattern(db, title=f"{title} e", category="Tops", difficulty=1)
+    response = client.get(
+        f"{settings.API_V1_STR}/patterns/",
+        headers=superuser_token_headers,
+        params={
+            "title": title,
+            "category": ["Dresses", "Skirts"],
+            "difficulty_max": 2,
+            "fabric_amount_max": 200,
+        },
+    )
+    assert response.status_code == 200
+    assert [row["id"] for row in response.json()["data"]] == [
+        str(skirt.id),
+        str(dress.id),
+    ]
+
+    response = client.get(
+        f"{settings.API_V1_STR}/patterns/",
+        headers=superuser_token_headers,
+        params={"title": title, "difficulty_min": 2, "fabric_amount_min": 100},
+    )
+    assert [row["id"] for row in response.json()["data"]] == [str(dress.id)]
+
+
+def test_read_patterns_invalid_range(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/patterns/",
+        headers=superuser_token_headers,
+        params={"difficulty_max": 6},
+    )
+    assert response.status_code == 422
+
+
+def test_read_patterns_unknown_filter_value(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/patterns/",
+        headers=superuser_token_headers,
+        params={"brand": ["Burda", "Unknown"]},
+    )
+    assert response.status_code == 422
+
+
+def test_pattern_enums_match_literals(db: Session) -> None:
+    # A value added to a Literal needs a migration adding it to the enum
+    for enum in PATTERN_ENUMS.values():
+        labels = db.execute(
+            text(
+                "SELECT enumlabel FROM pg_enum "
+                "JOIN pg_type ON pg_type.oid = enumtypid "
+                "WHERE typname = :name ORDER BY enumsortorder"
+            ),
+            params={"name": enum.name},
+        ).scalars()
+        assert list(labels) == enum.enums
+
+
+def _pages(
+    client: TestClient, headers: dict[str, str], params: dict[str, Any]
+) -> list[list[str]]:
+    """The ids of every page of a listing, followed with the cursors."""
+    pages = []
+    after = None
+    while True:
+        response = client.get(
+            f"{settings.API_V1_STR}/patterns/",
+            headers=headers,
+            params={**params, "after": after} if after else params,
+        )
+        assert response.status_code == 200
+        content = response.json()
+        pages.append([row["id"] for row in content["data"]])
+        after = content["next"]
+        if after is None:
+            return pages
+
+
+def test_read_patterns_sorted(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    title = random_lower_string()
+    patterns = [
+        create_random_pattern(db, title=f"{title} {letter}", difficulty=difficulty)
+        for letter, difficulty in zip("abcde", [3, 1, 3, 2, 1], strict=True)
+    ]
+    # Ties broken by the id
+    expected = sorted(patterns, key=lambda pattern: (pattern.difficulty, pattern.id))
+    pages = _pages(
+        client,
+        superuser_token_headers,
+        {"title": title, "sort": "difficulty", "limit": 2, "fields": "title"},
+    )
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert sum(pages, []) == [str(pattern.id) for pattern in expected]
+
+    response = client.get(
+        f"{settings.API_V1_STR}/patterns/",
+        headers=superuser_token_headers,
+        params={"title": title, "sort": "-title", "fields": "title"},
+    )
+    assert [row["title"] for row in response.json()["data"]] == [
+        pattern.title for pattern in reversed(patterns)
+    ]
+
+
+def test_read_patterns_sorted_with_nulls(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    title = random_lower_string()
+    amounts = [120, None, 80, None, 120]
+    patterns = [
+        create_random_pattern(db, title=f"{title} {index}", fabric_amount=amount)
+        for index, amount in enumerate(amounts)
+    ]
+    with_amount = sorted(
+        (pattern for pattern in patterns if pattern.fabric_amount is not None),
+        key=lambda pattern: (pattern.fabric_amount, pattern.id),
+    )
+    without_amount = sorted(
+        (pattern for pattern in patterns if pattern.fabric_amount is None),
+        key=lambda pattern: pattern.id,
+    )
+    # The nulls last, and first in the descending order
+    expected = [str(pattern.id) for pattern in with_amount + without_amount]
+    for sort, order in (
+        ("fabric_amount", expected),
+        ("-fabric_amount", expected[::-1]),
+    ):
+        pages = _pages(
+            client,
+            superuser_token_headers,
+            {"title": title, "sort": sort, "limit": 2},
+        )
+        assert sum(pages, []) == order
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"after": "not a cursor"},
+        {"after": "WyJ0aXRsZSIsMSwyXQ"},
+        {"q": "gown", "after": "WyJ0aXRsZSIsMSwyXQ"},
+        {"sort": "owner_id"},
+    ],
+)
+def test_read_patterns_invalid_sort(
+    client: TestClient, superuser_token_headers: dict[str, str], params: Any
+) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/patterns/",
+        headers=superuser_token_headers,
+        params=params,
+    )
+    assert response.status_code in (400, 422)
+
+
+def test_read_patterns_cursor_of_another_sort(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    title = random_lower_string()
+    create_random_pattern(db, title=f"{title} a")
+    create_random_pattern(db, title=f"{title} b")
+    response = client.get(
+        f"{settings.API_V1_STR}/patterns/",
+        headers=superuser_token_headers,
+        params={"title": title, "sort": "title", "limit": 1},
+    )
+    after = response.json()["next"]
+    response = client.get(
+        f"{settings.API_V1_STR}/patterns/",
+        headers=superuser_token_headers,
+        params={"title": title, "sort": "created_at", "after": after},
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "The cursor is of another sort"
+
+
+def test_export_patterns_ndjson(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    title = random_lower_string()
+    first = create_random_pattern(db, title=f"{title} a")
+    second = create_random_pattern(db, title=f"{title} b")
+    create_random_pattern(db)
+    response = client.get(
+        f"{settings.API_V1_STR}/patterns/export",
+        headers=superuser_token_headers,
+        params={"title": title},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert "patterns.ndjson" in response.headers["content-disposition"]
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    # The most recently updated first, as in the listing
+    assert [row["id"] for row in rows] == [str(second.id), str(first.id)]
+    assert rows[0]["title"] == second.title
+    assert rows[0].keys() == PatternPublic.model_fields.keys()
+
+
+def test_export_patterns_csv(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/users/me", headers=normal_user_token_headers
+    )
+    owner_id = response.json()["id"]
+    pattern = create_random_pattern(db, owner_id=owner_id)
+    response = client.get(
+        f"{settings.API_V1_STR}/patterns/export",
+        headers=normal_user_token_headers,
+        params={"format": "csv", "self_patterns": True, "fields": "title"},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "text/csv; charset=utf-8"
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[0] == ["title", "id"]
+    assert [pattern.title, str(pattern.id)] in rows[1:]
+    assert all(len(row) == 2 for row in rows)
+
+
+def test_export_patterns_parquet(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    pq = pytest.importorskip("pyarrow.parquet")
+    pattern = create_random_pattern(db)
+    response = client.get(
+        f"{settings.API_V1_STR}/patterns/export",
+        headers=superuser_token_headers,
+        params={"format": "parquet", "title": pattern.title},
+    )
+    assert response.status_code == 200
+    table = pq.read_table(io.BytesIO(response.content))
+    assert table.column_names == list(PatternPublic.model_fields)
+    assert table.to_pylist()[0]["id"] == str(pattern.id)
+    assert table.to_pylist()[0]["difficulty"] == 2
+
+
+def test_read_pattern_query_count(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    pattern = create_random_pattern(db)
+    with assert_max_queries(2):
+        response = client.get(
+            f"{settings.API_V1_STR}/patterns/{pattern.id}",
+            headers=superuser_token_headers,
+        )
+    assert response.status_code == 200
+
+
+def test_update_pattern_query_count(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    pattern = create_random_pattern(db)
+    # User lookup, pattern lookup, update and refresh
+    with assert_max_queries(4):
+        response = client.put(
+            f"{settings.API_V1_STR}/patterns/{pattern.id}",
+            headers=superuser_token_headers,
+            json={"title": "Updated"},
+        )
+    assert response.status_code == 200
+
+
+def _pattern_in(**extra: Any) -> dict[str, Any]:
+    return {
+        "title": random_lower_string(),
+        "brand": "Other",
+        "version": "Digital",
+        "for_who": "Women",
+        "difficulty": 2,
+        **extra,
+    }
+
+
+def test_create_patterns_bulk(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    items = [_pattern_in(), _pattern_in(brand="Unknown"), _pattern_in()]
+    with assert_max_queries(2):
+        response = client.post(
+            f"{settings.API_V1_STR}/patterns/bulk",
+            headers=normal_user_token_headers,
+            json=items,
+        )
+    assert response.status_code == 200
+    results = response.json()["data"]
+    assert [result["status"] for result in results] == [200, 422, 200]
+    assert results[1]["detail"][0]["loc"] == ["brand"]
+    for item, result in zip(
+        [items[0], items[2]], [results[0], results[2]], strict=True
+    ):
+        pattern = db.get(Pattern, uuid.UUID(result["id"]))
+        assert pattern
+        assert pattern.title == item["title"]
+
+
+def test_update_patterns_bulk(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    me = client.get(
+        f"{settings.API_V1_STR}/users/me", headers=normal_user_token_headers
+    ).json()
+    own = [create_random_pattern(db, owner_id=me["id"]) for _ in range(3)]
+    other = create_random_pattern(db)
+    items = [
+        {"id": str(own[0].id), "title": "First", "difficulty": 5},
+        {"id": str(own[1].id), "title": "Second", "difficulty": 4},
+        {"id": str(own[2].id), "category": "Tops"},
+        {"id": str(other.id), "title": "Not mine"},
+        {"id": str(uuid.uuid4()), "title": "Missing"},
+        {"id": str(own[2].id), "difficulty": 9},
+        {"id": str(own[2].id), "title": "Twice"},
+    ]
+    # User lookup, owners, one update per set of fields
+    with assert_max_queries(4):
+        response = client.patch(
+            f"{settings.API_V1_STR}/patterns/bulk",
+            headers=normal_user_token_headers,
+            json=items,
+        )
+    assert response.status_code == 200
+    statuses = [result["status"] for result in response.json()["data"]]
+    assert statuses == [200, 200, 200, 403, 404, 422, 400]
+
+    for pattern in [*own, other]:
+        db.refresh(pattern)
+    assert (own[0].title, own[0].difficulty) == ("First", 5)
+    assert (own[1].title, own[1].difficulty) == ("Second", 4)
+    assert own[2].category == "Tops"
+    assert own[2].updated_at > own[2].created_at
+    assert other.title != "Not mine"
+
+
+def test_delete_patterns_bulk(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    patterns = [create_random_pattern(db) for _ in range(2)]
+    ids = [pattern.id for pattern in patterns]
+    storage = get_storage()
+    file_id = f"{uuid.uuid4()}.pdf"
+    storage.save(file_id, io.BytesIO(b"%PDF-1.4"))
+    patterns[0].pattern_a4_file_id = file_id
+    db.add(patterns[0])
+    db.commit()
+
+    missing = uuid.uuid4()
+    response = client.request(
+        "DELETE",
+        f"{settings.API_V1_STR}/patterns/bulk",
+        headers=superuser_token_headers,
+        json=[str(ids[0]), str(missing), str(ids[1])],
+    )
+    assert response.status_code == 200
+    statuses = [result["status"] for result in response.json()["data"]]
+    assert statuses == [200, 404, 200]
+    db.expunge_all()
+    assert db.get(Pattern, ids[0]) is None
+    assert db.get(Pattern, ids[1]) is None
+    with pytest.raises(FileNotFoundError):
+        storage.stat(file_id)
+
+
+def test_bulk_too_many_items(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    response = client.post(
+        f"{settings.API_V1_STR}/patterns/bulk",
+        headers=superuser_token_headers,
+        json=[_pattern_in()] * 1001,
+    )
+    assert response.status_code == 422
+
+
+def test_import_patterns_csv(
+    client: TestClient,
+    normal_user_token_headers: dict[str, str],
+    db: Session,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    # Several chunks
+    monkeypatch.setattr(pattern_import, "CHUNK_SIZE", 2)
+    me = client.get(
+        f"{settings.API_V1_STR}/users/me", headers=normal_user_token_headers
+    ).json()
+    own = create_random_pattern(db, owner_id=me["id"])
+    other = create_random_pattern(db)
+    title = random_lower_string()
+    content = "\n".join(
+        [
+            "id,title,brand,version,for_who,difficulty,fabric",
+            f",{title},Other,Digital,Women,2,",
+            f"{own.id},{title} updated,Other,Paper,Men,3,Jersey",
+            f",{title},Other,Digital,Women,9,",
+            f"{other.id},{title},Other,Digital,Women,2,",
+            f",{title},Other,Digital,Women,2,,extra",
+            f",{title},Burda,Paper,Kids,1,",
+        ]
+    )
+    response = client.post(
+        f"{settings.API_V1_STR}/patterns/import",
+        headers=normal_user_token_headers,
+        files={"file": ("patterns.csv", content.encode())},
+    )
+    assert response.status_code == 202
+    import_id = response.json()["id"]
+
+    response = client.get(
+        f"{settings.API_V1_STR}/patterns/import/{import_id}",
+        headers=normal_user_token_headers,
+    )
+    job = response.json()
+    assert job["status"] == "done"
+    assert (job["rows"], job["imported"], job["failed"]) == (6, 3, 3)
+    assert job["position"] == job["size"] == len(content)
+
+    db.refresh(own)
+    db.refresh(other)
+    assert (own.title, own.version, own.fabric) == (
+        f"{title} updated",
+        "Paper",
+        "Jersey",
+    )
+    assert other.title != title
+    imported = db.exec(select(Pattern).where(Pattern.title == title)).all()
+    assert sorted(pattern.brand for pattern in imported) == ["Burda", "Other"]
+    assert all(str(pattern.owner_id) == me["id"] for pattern in imported)
+
+    response = client.get(
+        f"{settings.API_V1_STR}/patterns/import/{import_id}/errors",
+        headers=normal_user_token_headers,
+    )
+    errors = [json.loads(line) for line in response.text.splitlines()]
+    assert [error["line"] for error in errors] == [4, 5, 6]
+    assert errors[0]["detail"][0]["loc"] == ["difficulty"]
+    assert errors[1]["detail"] == "Pattern of another user"
+
+
+def test_import_patterns_position(
+    client: TestClient,
+    normal_user_token_headers: dict[str, str],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(pattern_import, "CHUNK_SIZE", 2)
+    positions = []
+    import_chunk = pattern_import._import_chunk
+
+    def recorded(session: Session, job: Any, records: Any) -> None:
+        positions.append(job.position)
+        import_chunk(session, job, records)
+
+    monkeypatch.setattr(pattern_import, "_import_chunk", recorded)
+    header = "\ufefftitle,brand,version,for_who,difficulty\r\n".encode()
+    rows = [
+        f"Robe {index} à pois,Other,Digital,Women,2\r\n".encode() for index in range(5)
+    ]
+    content = header + b"".join(rows)
+    response = client.post(
+        f"{settings.API_V1_STR}/patterns/import",
+        headers=normal_user_token_headers,
+        files={"file": ("patterns.csv", content)},
+    )
+    job = client.get(
+        f"{settings.API_V1_STR}/patterns/import/{response.json()['id']}",
+        headers=normal_user_token_headers,
+    ).json()
+    assert (job["status"], job["imported"]) == ("done", 5)
+    # Where each chunk starts, then where the file ends
+    ends = [len(header) + sum(map(len, rows[:count])) for count in (2, 4)]
+    assert positions == [0, *ends]
+    assert job["position"] == job["size"] == len(content)
+
+
+def test_import_patterns_job_not_created(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    spooled = []
+    spool = patterns_routes._spool
+
+    def recorded(source: Any, suffix: str) -> tuple[str, int]:
+        path, size = spool(source, suffix)
+        spooled.append(path)
+        return path, size
+
+    def add_task(*_args: Any, **_kwargs: Any) -> None:
+        raise RuntimeError("Task not added")
+
+    monkeypatch.setattr(patterns_routes, "_spool", recorded)
+    monkeypatch.setattr("fastapi.BackgroundTasks.add_task", add_task)
+    with pytest.raises(RuntimeError):
+        client.post(
+            f"{settings.API_V1_STR}/patterns/import",
+            headers=superuser_token_headers,
+            files={"file": ("patterns.csv", b"title\n")},
+        )
+    assert len(spooled) == 1
+    assert not os.path.exists(spooled[0])
+
+
+def test_import_patterns_ndjson(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    title = random_lower_string()
+    content = "\n".join([json.dumps(_pattern_in(title=title)), "{not json", "", "[]"])
+    response = client.post(
+        f"{settings.API_V1_STR}/patterns/import",
+        headers=superuser_token_headers,
+        files={"file": ("patterns.jsonl", content.encode())},
+    )
+    import_id = response.json()["id"]
+    job = client.get(
+        f"{settings.API_V1_STR}/patterns/import/{import_id}",
+        headers=superuser_token_headers,
+    ).json()
+    assert (job["format"], job["status"]) == ("ndjson", "done")
+    assert (job["rows"], job["imported"], job["failed"]) == (3, 1, 2)
+    assert db.exec(select(Pattern).where(Pattern.title == title)).one()
+
+    response = client.get(
+        f"{settings.API_V1_STR}/patterns/import/{import_id}/errors",
+        headers=superuser_token_headers,
+    )
+    errors = [json.loads(line) for line in response.text.splitlines()]
+    assert errors == [
+        {
+            "line": 2,
+            "detail": "Invalid JSON: Expecting property name enclosed in double quotes",
+        },
+        {"line": 4, "detail": "Expected a JSON object"},
+    ]
+
+
+def test_import_patterns_unknown_format(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    response = client.post(
+        f"{settings.API_V1_STR}/patterns/import",
+        headers=superuser_token_headers,
+        files={"file": ("patterns.xlsx", b"")},
+    )
+    assert response.status_code == 400
+
+
+def test_read_pattern_import_not_enough_permissions(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    normal_user_token_headers: dict[str, str],
+) -> None:
+    response = client.post(
+        f"{settings.API_V1_STR}/patterns/import",
+        headers=superuser_token_headers,
+        files={"file": ("patterns.csv", b"title\n")},
+    )
+    import_id = response.json()["id"]
+    response = client.get(
+        f"{settings.API_V1_STR}/patterns/import/{import_id}",
+        headers=normal_user_token_headers,
+    )
+    assert response.status_code == 403
+
+
+def test_search_patterns(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    # Its prefix searched ends with a letter the stemmer keeps, "xy" is "xi"
+    word = f"{random_lower_string()[:5]}q{random_lower_string()[:6]}"
+    in_title = create_random_pattern(db, title=f"Wrap gown {word}")
+    in_description = create_random_pattern(
+        db, description=f"A wrap gown in {word}, easy to sew"
+    )
+    in_fabric = create_random_pattern(db, fabric=f"Linen {word}")
+    create_random_pattern(db, title=f"Wrap top {word}")
+
+    def search(q: str) -> list[str]:
+        response = client.get(
+            f"{settings.API_V1_STR}/patterns/",
+            headers=superuser_token_headers,
+            params={"q": q, "fields": "id"},
+        )
+        assert response.status_code == 200
+        return [pattern["id"] for pattern in response.json()["data"]]
+
+    # Matches in the title rank first, words are stemmed and may be prefixes
+    assert search(f"{word} gowns") == [str(in_title.id), str(in_description.id)]
+    assert search(f"{word[:6]} wrap gow") == [
+        str(in_title.id),
+        str(in_description.id),
+    ]
+    assert search(f"linen {word}") == [str(in_fabric.id)]
+    # The tsquery operators are not interpreted
+    assert len(search(word)) == 4
+    assert search(f"{word} & ! | (:*") == search(word)
+
+
+def test_suggest_patterns(
+    client: TestClient,
+    normal_user_token_headers: dict[str, str],
+    db: Session,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(suggest, "_CHECK_INTERVAL", 0)
+    monkeypatch.setattr(suggest, "_REBUILD_INTERVAL", 0)
+    prefix = random_lower_string()[:12]
+    pattern = create_random_pattern(db, title=f"{prefix} Wrap", fabric=f"{prefix}")
+    response = client.get(
+        f"{settings.API_V1_STR}/patterns/suggest",
+        headers=normal_user_token_headers,
+        params={"prefix": prefix.upper()},
+    )
+    assert response.status_code == 200
+    assert response.json() == {"titles": [pattern.title], "fabrics": [prefix]}
+    assert "suggest;dur=" in response.headers["server-timing"]
+
+    # Only the patterns of the user
+    response = client.get(
+        f"{settings.API_V1_STR}/patterns/suggest",
+        headers=normal_user_token_headers,
+        params={"prefix": prefix, "self_patterns": True},
+    )
+    assert response.json() == {"titles": [], "fabrics": []}
+
+    response = client.get(
+        f"{settings.API_V1_STR}/patterns/suggest",
+        headers=normal_user_token_headers,
+        params={"prefix": ""},
+    )
+    assert response.status_code == 422
+
+
+def _events(body: str) -> list[dict[str, str]]:
+    messages = []
+    for block in body.split("\n\n"):
+        message = {}
+        for line in block.splitlines():
+            name, _, value = line.partition(": ")
+            message[name] = value
+        if message:
+            messages.append(message)
+    return messages
+
+
+def _last_event_id(db: Session, pattern_id: uuid.UUID) -> int:
+    event = db.exec(
+        select(PatternEvent)
+        .where(PatternEvent.pattern_id == pattern_id)
+        .order_by(col(PatternEvent.id).desc())
+    ).first()
+    assert event is not None and event.id is not None
+    return event.id
+
+
+def test_stream_pattern_events(
+    client: TestClient,
+    normal_user_token_headers: dict[str, str],
+    db: Session,
+    monkeypatch: pytest.MonkeyPatch,
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    monkeypatch.setattr(events, "_STREAM_DURATION", 1.5)
+    monkeypatch.setattr(events, "_HEARTBEAT_INTERVAL", 0.2)
+    missed = create_random_pattern(db)
+    token = _last_event_id(db, missed.id) - 1
+    live_id = uuid.uuid4()
+
+    def write_during_the_stream() -> None:
+        time.sleep(0.5)
+        with Session(engine) as session:
+            live = create_random_pattern(session, id=live_id)
+            session.delete(live)
+            session.commit()
+
+    writer = threading.Thread(target=write_during_the_stream)
+    writer.start()
+    response = client.get(
+        f"{settings.API_V1_STR}/patterns/events",
+        headers={**normal_user_token_headers, "Last-Event-ID": str(token)},
+    )
+    writer.join()
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    messages = _events(response.text)
+    assert messages[0] == {"retry": str(events._RETRY_MILLISECONDS)}
+    assert {"": "heartbeat"} in messages
+    assert "Slow request" not in caplog.text
+    received = [
+        (message["event"], json.loads(message["data"]))
+        for message in messages
+        if "id" in message
+    ]
+    ids = [events.parse_token(m["id"])[0] for m in messages if "id" in m]
+    assert ids == sorted(ids)
+    replayed = [data for kind, data in received if data["id"] == str(missed.id)]
+    assert replayed[0]["pattern"]["title"] == missed.title
+    live = [(kind, data) for kind, data in received if data["id"] == str(live_id)]
+    assert [kind for kind, _ in live] == ["created", "deleted"]
+    assert live[1][1]["pattern"] is None
+
+
+def test_stream_pattern_events_self_patterns(
+    client: TestClient,
+    normal_user_token_headers: dict[str, str],
+    db: Session,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(events, "_STREAM_DURATION", 0.2)
+    me = client.get(
+        f"{settings.API_V1_STR}/users/me", headers=normal_user_token_headers
+    ).json()
+    own = create_random_pattern(db, owner_id=me["id"])
+    other = create_random_pattern(db)
+    response = client.get(
+        f"{settings.API_V1_STR}/patterns/events",
+        headers=normal_user_token_headers,
+        params={"self_patterns": True, "after": _last_event_id(db, own.id) - 1},
+    )
+    assert response.status_code == 200
+    data = [json.loads(m["data"]) for m in _events(response.text) if "id" in m]
+    assert str(own.id) in {item["id"] for item in data}
+    assert str(other.id) not in {item["id"] for item in data}
+    assert {item["owner_id"] for item in data} == {me["id"]}
+
+
+def test_stream_pattern_events_reset(
+    client: TestClient,
+    normal_user_token_headers: dict[str, str],
+    db: Session,
+) -> None:
+    pattern = create_random_pattern(db)
+    pruned = _last_event_id(db, pattern.id)
+    db.exec(delete(PatternEvent).where(col(PatternEvent.id) <= pruned))
+    db.commit()
+    response = client.get(
+        f"{settings.API_V1_STR}/patterns/events",
+        headers={**normal_user_token_headers, "Last-Event-ID": str(pruned - 1)},
+    )
+    assert response.status_code == 200
+    assert _events(response.text)[1] == {"event": "reset", "data": "{}"}
+
+    response = client.get(
+        f"{settings.API_V1_STR}/patterns/events",
+        headers={**normal_user_token_headers, "Last-Event-ID": "1:x"},
+    )
+    assert response.status_code == 422
+
+
+def test_replay_long_transaction(db: Session) -> None:
+    with Session(engine) as long_session:
+        long = create_random_pattern(long_session)
+        long.title = random_lower_string()
+        long_session.add(long)
+        # Its event gets an id before the one of a shorter transaction
+        long_session.flush()
+        short = create_random_pattern(db)
+        long_session.commit()
+        long_event = _last_event_id(db, long.id)
+    short_event = _last_event_id(db, short.id)
+    assert long_event < short_event
+    [sent] = events.read_events(db, col(PatternEvent.id) == short_event)
+    token = sent.message.split(b"\n")[0].removeprefix(b"id: ").decode()
+
+    replayed = events.replay(db, *events.parse_token(token))
+    assert replayed is not None
+    assert long_event in {event.id for event in replayed}
+    # A token without horizon only resumes by id
+    replayed = events.replay(db, short_event)
+    assert replayed is not None
+    assert long_event not in {event.id for event in replayed}
+
+
+def test_stream_pattern_events_too_many_to_replay(
+    client: TestClient,
+    normal_user_token_headers: dict[str, str],
+    db: Session,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(events, "_QUEUE_SIZE", 1)
+    first = create_random_pattern(db)
+    create_random_pattern(db)
+    response = client.get(
+        f"{settings.API_V1_STR}/patterns/events",
+        headers=normal_user_token_headers,
+        params={"after": _last_event_id(db, first.id) - 1},
+    )
+    assert response.status_code == 200
+    assert _events(response.text)[1] == {"event": "reset", "data": "{}"}
+
+
+def test_read_event_batches(db: Session, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(events, "_BATCH_SIZE", 2)
+    patterns = [create_random_pattern(db) for _ in range(3)]
+    first = _last_event_id(db, patterns[0].id)
+    last = _last_event_id(db, patterns[-1].id)
+    batches = list(
+        events.read_event_batches(db, col(PatternEvent.id).between(first, last))
+    )
+    assert [len(batch) for batch in batches] == [2, 1]
+    assert [event.id for batch in batches for event in batch] == list(
+        range(first, last + 1)
+    )
+
+
+def test_create_pattern_idempotency_key(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    url = f"{settings.API_V1_STR}/patterns/"
+    headers = {**normal_user_token_headers, "Idempotency-Key": str(uuid.uuid4())}
+    data = {
+        "title": random_lower_string(),
+        "brand": "Other",
+        "version": "Digital",
+        "for_who": "Women",
+        "category": "Dresses",
+        "difficulty": 2,
+    }
+    response = client.post(url, headers=headers, json=data)
+    assert response.status_code == 200
+    assert "idempotent-replayed" not in response.headers
+
+    # The user lookup and the key, the patterns are not read or written
+    with assert_max_queries(3) as statements:
+        retry = client.post(url, headers=headers, json=data)
+    assert retry.status_code == 200
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert retry.json() == response.json()
+    assert not any(" pattern" in statement for statement in statements)
+    patterns = db.exec(select(Pattern).where(Pattern.title == data["title"])).all()
+    assert len(patterns) == 1
+
+    response = client.post(url, headers=headers, json={**data, "difficulty": 3})
+    assert response.status_code == 422
+    assert response.json() == {
+        "detail": "The idempotency key was sent with another request"
+    }
+
+
+def test_upload_files_idempotency_key(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    db: Session,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    pattern = create_random_pattern(db)
+    url = f"{settings.API_V1_STR}/patterns/upload/"
+    headers = {**superuser_token_headers, "Idempotency-Key": str(uuid.uuid4())}
+    files = {"pattern_a4_file": ("a4.pdf", b"%PDF-1.4 a4" * 1000, "application/pdf")}
+    response = client.post(
+        url, headers=headers, data={"id": str(pattern.id)}, files=files
+    )
+    assert response.status_code == 200
+    file_id = response.json()["pattern_a4_file_id"]
+    assert file_id
+
+    async def fail(*_: Any, **__: Any) -> None:
+        raise AssertionError("The storage is not written again")
+
+    monkeypatch.setattr(patterns_routes, "upload_file", fail)
+    monkeypatch.setattr(get_storage(), "delete_many", fail)
+    retry = client.post(url, headers=headers, data={"id": str(pattern.id)}, files=files)
+    assert retry.status_code == 200
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert retry.json()["pattern_a4_file_id"] == file_id
+
+    other = {"pattern_a4_file": ("a4.pdf", b"%PDF-1.4 other", "application/pdf")}
+    response = client.post(
+        url, headers=headers, data={"id": str(pattern.id)}, files=other
+    )
+    assert response.status_code == 422
+
+
+def test_upload_files_old_file_not_deleted(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    db: Session,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    pattern = create_random_pattern(db)
+    url = f"{settings.API_V1_STR}/patterns/upload/"
+    files = {"pattern_a4_file": ("a4.pdf", b"%PDF-1.4 old", "application/pdf")}
+    response = client.post(
+        url, headers=superuser_token_headers, data={"id": str(pattern.id)}, files=files
+    )
+    old_file_id = response.json()["pattern_a4_file_id"]
+
+    def fail(*_: Any) -> list[str]:
+        raise ConnectionError("The storage is unavailable")
+
+    monkeypatch.setattr(get_storage(), "delete_many", fail)
+    files = {"pattern_a4_file": ("a4.pdf", b"%PDF-1.4 new", "application/pdf")}
+    response = client.post(
+        url, headers=superuser_token_headers, data={"id": str(pattern.id)}, files=files
+    )
+    # The pattern refers to the new file, the old one is left to the storage GC
+    assert response.status_code == 200
+    assert response.json()["pattern_a4_file_id"] != old_file_id
+    assert get_storage().stat(old_file_id)
+
+
+def test_idempotency_key_released_on_error(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    url = f"{settings.API_V1_STR}/patterns/upload/"
+    headers = {**superuser_token_headers, "Idempotency-Key": str(uuid.uuid4())}
+    data = {"id": str(uuid.uuid4())}
+    files = {"icon": ("icon.webp", b"icon", "image/webp")}
+    response = client.post(url, headers=headers, data=data, files=files)
+    assert response.status_code == 404
+    # Processed again, not refused as in progress
+    response = client.post(url, headers=headers, data=data, files=files)
+    assert response.status_code == 404
+
+    me = client.get(f"{settings.API_V1_STR}/users/me", headers=headers).json()
+    key = str(uuid.uuid4())
+    # Claimed by the same request, still processed by another worker
+    digest = idempotency.fingerprint(
+        data["id"], "icon", "icon.webp", io.BytesIO(b"icon")
+    )
+    claimed = idempotency.idempotency_keys.claim(
+        db, uuid.UUID(me["id"]), key, "POST /patterns/upload/", digest
+    )
+    assert claimed is None
+    response = client.post(
+        url, headers={**headers, "Idempotency-Key": key}, data=data, files=files
+    )
+    assert response.status_code == 409
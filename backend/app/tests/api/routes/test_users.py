@@ -191,6 +191,26 @@ def test_update_user_me(
     assert user_db.full_name == full_name
 
 
+def test_read_user_me_not_modified(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    url = f"{settings.API_V1_STR}/users/me"
+    r = client.get(url, headers=normal_user_token_headers)
+    etag = r.headers["etag"]
+    assert etag.startswith('W/"')
+
+    r = client.get(url, headers={**normal_user_token_headers, "If-None-Match": etag})
+    assert r.status_code == 304
+    assert r.content == b""
+
+    client.patch(
+        url, headers=normal_user_token_headers, json={"full_name": random_email()}
+    )
+    r = client.get(url, headers={**normal_user_token_headers, "If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.headers["etag"] != etag
+
+
 def test_update_password_me(
     client: TestClient, superuser_token_headers: dict[str, str], db: Session
 ) -> None:
@@ -0,0 +1,64 @@
+from typing import Any
+
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+
+
+def _assert_speedscope(profile: dict[str, Any]) -> None:
+    assert profile["$schema"] == "https://www.speedscope.app/file-format-schema.json"
+    frames = profile["shared"]["frames"]
+    assert frames
+    for thread_profile in profile["profiles"]:
+        assert thread_profile["type"] == "sampled"
+        assert len(thread_profile["samples"]) == len(thread_profile["weights"])
+        for stack in thread_profile["samples"]:
+            assert all(0 <= index < len(frames) for index in stack)
+
+
+def test_profile_worker(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/utils/profile",
+        headers=superuser_token_headers,
+        params={"seconds": 0.2, "interval_ms": 2},
+    )
+    assert r.status_code == 200
+    assert "profile.speedscope.json" in r.headers["content-disposition"]
+    _assert_speedscope(r.json())
+
+
+def test_profile_worker_normal_user(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/utils/profile",
+        headers=normal_user_token_headers,
+        params={"seconds": 0.1},
+    )
+    assert r.status_code == 403
+
+
+def test_profile_request(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/patterns/",
+        headers={**superuser_token_headers, "X-Profile": "true"},
+    )
+    assert r.status_code == 200
+    profile = r.json()
+    assert profile["name"] == "GET /api/v1/patterns/ (200)"
+    _assert_speedscope(profile)
+
+
+def test_profile_request_normal_user(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/users/me",
+        headers={**normal_user_token_headers, "X-Profile": "true"},
+    )
+    assert r.status_code == 200
+    assert r.json()["email"] == settings.EMAIL_TEST_USER
@@ -0,0 +1,63 @@
+from collections import Counter
+
+import pytest
+from sqlmodel import Session, col, func, select
+
+from app.benchmarks.catalog import (
+    EMAIL_DOMAIN,
+    PATTERN_COLUMNS,
+    CatalogGenerator,
+    generate_catalog,
+    remove_catalog,
+)
+from app.core.storage import get_storage
+from app.models import Pattern, PatternCreate, User
+
+pytestmark = pytest.mark.usefixtures("client")
+
+
+def test_generator_is_deterministic() -> None:
+    first = list(CatalogGenerator(seed=1, owners=10).patterns(100))
+    second = list(CatalogGenerator(seed=1, owners=10).patterns(100))
+    other = list(CatalogGenerator(seed=2, owners=10).patterns(100))
+    assert first == second
+    assert first != other
+
+
+def test_generated_rows_are_valid() -> None:
+    for row in CatalogGenerator(seed=0, owners=10).patterns(200):
+        values = dict(zip(PATTERN_COLUMNS, row, strict=True))
+        PatternCreate.model_validate(values)
+        assert values["created_at"] <= values["updated_at"]
+
+
+def test_owners_are_skewed() -> None:
+    generator = CatalogGenerator(seed=0, owners=100, zipf_exponent=1.2)
+    owners = Counter(row[1] for row in generator.patterns(5000))
+    counts = [owners[owner_id] for owner_id in generator.owner_ids]
+    assert counts[0] > 10 * counts[50]
+
+
+def test_generate_and_remove_catalog(db: Session) -> None:
+    generate_catalog(patterns=50, owners=5, seed=3, files_ratio=0.2, file_size=64)
+    owners = select(User.id).where(col(User.email).endswith(f"@{EMAIL_DOMAIN}"))
+    patterns = db.exec(select(Pattern).where(col(Pattern.owner_id).in_(owners))).all()
+    assert len(patterns) == 50
+    icons = [pattern.icon for pattern in patterns if pattern.icon]
+    assert icons
+    storage = get_storage()
+    assert storage.stat(icons[0]).size > 0
+
+    # Generating again replaces the catalog
+    generate_catalog(patterns=20, owners=5, seed=3)
+    count = (
+        select(func.count())
+        .select_from(Pattern)
+        .where(col(Pattern.owner_id).in_(owners))
+    )
+    assert db.exec(count).one() == 20
+    with pytest.raises(FileNotFoundError):
+        storage.stat(icons[0])
+
+    assert remove_catalog() == 5
+    assert db.exec(count).one() == 0
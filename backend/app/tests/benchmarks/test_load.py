@@ -0,0 +1,53 @@
+from app.benchmarks.load import (
+    CATEGORIES,
+    Sample,
+    compare,
+    parse_mix,
+    percentile,
+    summarize,
+)
+
+
+def test_choices_from_literal() -> None:
+    assert "Dresses" in CATEGORIES
+    assert None not in CATEGORIES
+
+
+def test_percentile() -> None:
+    values = [float(i) for i in range(1, 101)]
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile([3.0], 99) == 3
+    assert percentile([], 50) == 0
+
+
+def test_summarize() -> None:
+    samples = [Sample("GET /patterns/", i / 1000, True) for i in range(1, 101)]
+    samples.append(Sample("POST /login/access-token", 0.3, False))
+    result = summarize(samples, duration=10)
+
+    browse = result["routes"]["GET /patterns/"]
+    assert browse["requests"] == 100
+    assert browse["errors"] == 0
+    assert browse["throughput"] == 10
+    assert browse["latency_ms"]["p50"] == 50
+    assert browse["latency_ms"]["p99"] == 99
+    assert result["routes"]["POST /login/access-token"]["errors"] == 1
+    assert result["total"]["requests"] == 101
+
+
+def test_compare() -> None:
+    baseline = summarize([Sample("GET /patterns/", 0.010, True)] * 10, duration=1)
+    current = summarize([Sample("GET /patterns/", 0.015, True)] * 5, duration=1)
+    current["routes"]["GET /new/"] = current["routes"]["GET /patterns/"]
+
+    rows = {row["route"]: row for row in compare(current, baseline)}
+    assert rows["GET /patterns/"]["p95"] == 50
+    assert rows["GET /patterns/"]["throughput"] == -50
+    assert "GET /new/" not in rows
+    assert "total" in rows
+
+
+def test_parse_mix() -> None:
+    assert parse_mix("browse=80,detail=20") == {"browse": 80, "detail": 20}
@@ -0,0 +1,21 @@
+import pytest
+from sqlmodel import Session
+
+from app.benchmarks.search import STRATEGIES, run
+from app.tests.utils.pattern import create_random_pattern
+from app.tests.utils.utils import random_lower_string
+
+
+@pytest.mark.usefixtures("client")
+def test_run(db: Session) -> None:
+    word = random_lower_string()[:12]
+    create_random_pattern(db, title=f"Wrap {word}", fabric="Linen")
+    create_random_pattern(db, title=f"Linen wrap {word}")
+
+    results = run([f"{word} linen wrap", word], repeat=1)
+    strategies = results[f"{word} linen wrap"]
+    assert set(strategies) == set(STRATEGIES)
+    # Only found in the title as typed by `title`
+    assert strategies["title"]["matches"] == 0
+    assert strategies["ilike"]["matches"] == strategies["fts"]["matches"] == 2
+    assert results[word]["title"]["matches"] == 2
@@ -0,0 +1,18 @@
+from app.benchmarks.serialization import PATHS, listing_rows, run
+from app.models import PatternPublic
+
+
+def test_listing_rows() -> None:
+    rows = listing_rows(20)
+    assert len(rows) == 20
+    for row in rows:
+        assert list(row) == list(PatternPublic.model_fields)
+        PatternPublic.model_validate(row)
+
+
+def test_run() -> None:
+    # Fails if both paths do not send the same listing
+    results = run([10], repeat=2)
+    assert set(results[10]) == set(PATHS)
+    for timing in results[10].values():
+        assert 0 < timing["min"] <= timing["median"]
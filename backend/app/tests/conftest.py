@@ -6,6 +6,7 @@ from sqlmodel import Session, delete
 
 from app.core.config import settings
 from app.core.database import create_db_and_tables, engine
+from app.core.events import pattern_events
 from app.main import app
 from app.models import Item, User
 from app.tests.utils.user import authentication_token_from_email
@@ -24,6 +25,15 @@ def db() -> Generator[Session, None, None]:
         session.commit()
 
 
+@pytest.fixture(autouse=True)
+def stop_pattern_events() -> Generator[None, None, None]:
+    # Started by the lifespan and the event streams, its bumps of the listing
+    # cache generation would come at any time in the following tests
+    pattern_events.stop()
+    yield
+    pattern_events.stop()
+
+
 @pytest.fixture(scope="module")
 def client() -> Generator[TestClient, None, None]:
     with TestClient(app) as c:
@@ -0,0 +1,198 @@
+import io
+import threading
+import time
+from collections.abc import Iterator
+from pathlib import Path
+
+import anyio
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.types import Message, Scope
+
+from app.core.file_cache import CachedStorage
+from app.core.local_storage import LocalStorage
+from app.core.storage import CHUNK_SIZE
+
+
+class CountingStorage(LocalStorage):
+    """Local storage counting the objects read from it."""
+
+    def __init__(self, root: Path, delay: float = 0) -> None:
+        super().__init__(root)
+        self.delay = delay
+        self.reads: list[str] = []
+
+    def iter_chunks(self, key: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        self.reads.append(key)
+        time.sleep(self.delay)
+        return super().iter_chunks(key, chunk_size)
+
+
+@pytest.fixture
+def backend(tmp_path: Path) -> CountingStorage:
+    backend = CountingStorage(tmp_path / "files")
+    backend.setup()
+    return backend
+
+
+def _download(storage: CachedStorage, key: str) -> bytes:
+    app = FastAPI()
+
+    @app.get("/{key}")
+    def download(key: str):  # type: ignore[no-untyped-def]
+        return storage.file_response(key, key)
+
+    response = TestClient(app).get(f"/{key}")
+    assert response.status_code == 200
+    content: bytes = response.content
+    return content
+
+
+def test_cache_hit(backend: CountingStorage, tmp_path: Path) -> None:
+    backend.save("a.pdf", io.BytesIO(b"a" * 100))
+    cache = CachedStorage(backend, tmp_path / "cache", max_bytes=1000)
+
+    assert _download(cache, "a.pdf") == b"a" * 100
+    assert _download(cache, "a.pdf") == b"a" * 100
+    assert backend.reads == ["a.pdf"]
+    assert (tmp_path / "cache" / "a.pdf").is_file()
+
+
+def test_cache_evicts_least_recently_used(
+    backend: CountingStorage, tmp_path: Path
+) -> None:
+    for key in ["a.pdf", "b.pdf", "c.pdf"]:
+        backend.save(key, io.BytesIO(b"x" * 400))
+    cache = CachedStorage(backend, tmp_path / "cache", max_bytes=1000)
+
+    _download(cache, "a.pdf")
+    _download(cache, "b.pdf")
+    _download(cache, "a.pdf")
+    _download(cache, "c.pdf")
+
+    cached = sorted(path.name for path in (tmp_path / "cache").iterdir())
+    assert cached == ["a.pdf", "c.pdf"]
+    _download(cache, "b.pdf")
+    assert backend.reads == ["a.pdf", "b.pdf", "c.pdf", "b.pdf"]
+
+
+def test_cache_serves_file_evicted_meanwhile(
+    backend: CountingStorage, tmp_path: Path
+) -> None:
+    for key in ["a.pdf", "b.pdf", "c.pdf"]:
+        backend.save(key, io.BytesIO(key.encode() * 100))
+    cache = CachedStorage(backend, tmp_path / "cache", max_bytes=1000)
+    app = FastAPI()
+
+    @app.get("/a.pdf")
+    def download():  # type: ignore[no-untyped-def]
+        response = cache.file_response("a.pdf", "a.pdf")
+        # Evicted by other downloads before the response is sent
+        cache.file_response("b.pdf", "b.pdf")
+        cache.file_response("c.pdf", "c.pdf")
+        assert not (tmp_path / "cache" / "a.pdf").exists()
+        return response
+
+    response = TestClient(app).get("/a.pdf")
+    assert response.status_code == 200
+    assert response.content == b"a.pdf" * 100
+    assert response.headers["content-length"] == "500"
+
+
+def test_cache_skips_big_objects(backend: CountingStorage, tmp_path: Path) -> None:
+    backend.save("big.pdf", io.BytesIO(b"x" * 2000))
+    cache = CachedStorage(backend, tmp_path / "cache", max_bytes=1000)
+
+    assert _download(cache, "big.pdf") == b"x" * 2000
+    assert list((tmp_path / "cache").iterdir()) == []
+
+
+def test_cache_coalesces_concurrent_misses(tmp_path: Path) -> None:
+    backend = CountingStorage(tmp_path / "files", delay=0.2)
+    backend.setup()
+    backend.save("a.pdf", io.BytesIO(b"a" * 100))
+    cache = CachedStorage(backend, tmp_path / "cache", max_bytes=1000)
+
+    threads = [
+        threading.Thread(target=cache.file_response, args=("a.pdf", "a.pdf"))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+        # Some arrive while others already wait on the fetch
+        time.sleep(0.02)
+    for thread in threads:
+        thread.join()
+    assert backend.reads == ["a.pdf"]
+    # The fetch lock is dropped with its last waiter
+    assert cache._fetching == {}
+
+
+def test_cache_dropped_on_delete(backend: CountingStorage, tmp_path: Path) -> None:
+    backend.save("a.pdf", io.BytesIO(b"a"))
+    cache = CachedStorage(backend, tmp_path / "cache", max_bytes=1000)
+    _download(cache, "a.pdf")
+
+    cache.delete("a.pdf")
+
+    assert not (tmp_path / "cache" / "a.pdf").exists()
+    with pytest.raises(FileNotFoundError):
+        cache.file_response("a.pdf", "a.pdf")
+
+
+def test_cache_index_survives_restart(backend: CountingStorage, tmp_path: Path) -> None:
+    backend.save("a.pdf", io.BytesIO(b"a"))
+    _download(CachedStorage(backend, tmp_path / "cache", max_bytes=1000), "a.pdf")
+
+    cache = CachedStorage(backend, tmp_path / "cache", max_bytes=1000)
+    _download(cache, "a.pdf")
+    assert backend.reads == ["a.pdf"]
+
+
+def test_cache_hit_sent_with_pathsend(backend: CountingStorage, tmp_path: Path) -> None:
+    for key in ["a.pdf", "b.pdf", "c.pdf"]:
+        backend.save(key, io.BytesIO(key.encode() * 100))
+    cache = CachedStorage(backend, tmp_path / "cache", max_bytes=1000)
+    response = cache.file_response("a.pdf", "a.pdf")
+    cache.file_response("b.pdf", "b.pdf")
+    cache.file_response("c.pdf", "c.pdf")
+    assert not (tmp_path / "cache" / "a.pdf").exists()
+    sent: list[Message] = []
+
+    async def receive() -> Message:
+        return {"type": "http.disconnect"}
+
+    async def send(message: Message) -> None:
+        if message["type"] == "http.response.pathsend":
+            # As a server would, while the response is sent
+            message["content"] = Path(message["path"]).read_bytes()
+        sent.append(message)
+
+    scope: Scope = {
+        "type": "http",
+        "method": "GET",
+        "headers": [],
+        "asgi": {"spec_version": "2.4"},
+        "extensions": {"http.response.pathsend": {}},
+    }
+    anyio.run(response, scope, receive, send)
+    assert sent[0]["status"] == 200
+    assert sent[1]["content"] == b"a.pdf" * 100
+
+
+def test_cache_hit_range(backend: CountingStorage, tmp_path: Path) -> None:
+    backend.save("a.pdf", io.BytesIO(b"0123456789"))
+    cache = CachedStorage(backend, tmp_path / "cache", max_bytes=1000)
+    app = FastAPI()
+
+    @app.get("/{key}")
+    def download(key: str):  # type: ignore[no-untyped-def]
+        return cache.file_response(key, key)
+
+    client = TestClient(app)
+    for _ in range(2):
+        response = client.get("/a.pdf", headers={"Range": "bytes=2-5"})
+        assert response.status_code == 206
+        assert response.content == b"2345"
+    assert backend.reads == ["a.pdf"]
@@ -0,0 +1,99 @@
+import time
+import uuid
+
+from sqlmodel import Session, col, delete, update
+
+from app.core.database import engine
+from app.core.events import pattern_events
+from app.core.listing_cache import ListingCache, listing_key
+from app.models import ListingCacheEntry, Pattern
+from app.tests.utils.pattern import create_random_pattern
+from app.tests.utils.utils import random_lower_string
+
+
+def test_listing_key_normalization() -> None:
+    key = listing_key({"title": "Dress", "brand": None}, skip=0, limit=100)
+    assert key == listing_key({"title": "dress"}, skip=0, limit=100)
+    assert key != listing_key({"title": "dress"}, skip=100, limit=100)
+    owner_id = uuid.uuid4()
+    assert key != listing_key({"title": "dress"}, skip=0, limit=100, owner_id=owner_id)
+    key = listing_key({"category": ["Skirts", "Dresses"]}, skip=0, limit=100)
+    assert key == listing_key(
+        {"category": ["Dresses", "Skirts", "Dresses"]}, skip=0, limit=100
+    )
+
+
+def test_generation_bumped_by_writes(db: Session) -> None:
+    cache = ListingCache(10)
+    generation = cache.generation(db)
+    pattern = create_random_pattern(db)
+    assert cache.generation(db) > generation
+
+    generation = cache.generation(db)
+    db.delete(pattern)
+    db.commit()
+    assert cache.generation(db) > generation
+
+    # Not by statements changing no row
+    generation = cache.generation(db)
+    db.exec(update(Pattern).where(col(Pattern.id) == pattern.id).values(title=""))
+    db.commit()
+    assert cache.generation(db) == generation
+
+
+def test_generation_bumped_once_committed(db: Session) -> None:
+    cache = ListingCache(10)
+    pattern_events.start()
+    with Session(engine) as writer:
+        pattern = create_random_pattern(writer)
+        generation = cache.generation(db)
+        pattern.title = random_lower_string()
+        writer.add(pattern)
+        writer.flush()
+        # Bumped before the commit, without waiting for it
+        assert cache.generation(db) > generation
+        # A listing read meanwhile misses the write, bumped again once notified
+        generation = cache.generation(db)
+        writer.commit()
+    deadline = time.monotonic() + 5
+    while cache.generation(db) == generation and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert cache.generation(db) > generation
+
+
+def test_local_tier(db: Session) -> None:
+    cache = ListingCache(2)
+    generation = cache.generation(db)
+    for key in ("a", "b", "c"):
+        cache.set(db, generation, key, key.encode())
+    # Least recently used evicted
+    assert cache.get(db, generation, "a") is None
+    assert cache.get(db, generation, "c") == b"c"
+
+    # Stale once the generation changed
+    assert cache.get(db, generation + 1, "c") is None
+    # A request that read the generation before the change does not cache
+    cache.set(db, generation, "c", b"stale")
+    assert cache.get(db, generation + 1, "c") is None
+
+
+def test_shared_tier(db: Session) -> None:
+    db.exec(delete(ListingCacheEntry))
+    db.commit()
+    # Two workers
+    first = ListingCache(0, shared=True)
+    second = ListingCache(10, shared=True)
+    generation = first.generation(db)
+
+    assert second.get(db, generation, "key") is None
+    first.set(db, generation, "key", b"listing")
+    assert second.get(db, generation, "key") == b"listing"
+    assert first.get(db, generation + 1, "key") is None
+
+    # Entries of older generations are removed by the first store of a newer
+    # generation
+    first.set(db, generation + 1, "other", b"listing")
+    assert db.get(ListingCacheEntry, "key") is None
+    # And never replace an entry of a later generation
+    first.set(db, generation, "other", b"stale")
+    assert first.get(db, generation + 1, "other") == b"listing"
@@ -0,0 +1,124 @@
+import io
+import uuid
+from collections.abc import Generator
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.file_cache import CachedStorage
+from app.core.local_storage import LocalStorage
+from app.core.s3_storage import S3Storage, s3_client
+from app.core.storage import StorageBackend
+
+
+@pytest.fixture(params=["s3", "local", "cached"])
+def storage(
+    request: pytest.FixtureRequest, tmp_path: Path
+) -> Generator[StorageBackend, None, None]:
+    backend: StorageBackend
+    if request.param == "s3":
+        # Dedicated bucket, so listing is not affected by other tests
+        backend = S3Storage(s3_client, f"{settings.S3_BUCKET}-{uuid.uuid4().hex[:8]}")
+    elif request.param == "local":
+        backend = LocalStorage(tmp_path / "files")
+    else:
+        backend = CachedStorage(
+            LocalStorage(tmp_path / "files"), tmp_path / "cache", max_bytes=10_000
+        )
+    backend.setup()
+    yield backend
+    backend.delete_many(obj.key for obj in backend.list_objects())
+    if isinstance(backend, S3Storage):
+        s3_client.delete_bucket(Bucket=backend.bucket)
+
+
+def _read(storage: StorageBackend, key: str) -> bytes:
+    return b"".join(storage.iter_chunks(key, chunk_size=4))
+
+
+def test_save_and_read(storage: StorageBackend) -> None:
+    content = b"%PDF-1.4 some pattern"
+    storage.save("a.pdf", io.BytesIO(content))
+    assert _read(storage, "a.pdf") == content
+    stat = storage.stat("a.pdf")
+    assert stat.key == "a.pdf"
+    assert stat.size == len(content)
+
+
+def test_save_overwrites(storage: StorageBackend) -> None:
+    storage.save("a.pdf", io.BytesIO(b"old"))
+    storage.save("a.pdf", io.BytesIO(b"new content"))
+    assert _read(storage, "a.pdf") == b"new content"
+
+
+def test_missing_object(storage: StorageBackend) -> None:
+    with pytest.raises(FileNotFoundError):
+        storage.stat("missing.pdf")
+    with pytest.raises(FileNotFoundError):
+        storage.iter_chunks("missing.pdf")
+    with pytest.raises(FileNotFoundError):
+        storage.file_response("missing.pdf", "missing.pdf")
+    # Deleting a missing object is not an error
+    storage.delete("missing.pdf")
+
+
+def test_delete(storage: StorageBackend) -> None:
+    storage.save("a.pdf", io.BytesIO(b"a"))
+    storage.save("b.pdf", io.BytesIO(b"b"))
+    storage.save("c.pdf", io.BytesIO(b"c"))
+    storage.delete("a.pdf")
+    assert storage.delete_many(["b.pdf", "missing.pdf"]) == []
+    assert [obj.key for obj in storage.list_objects()] == ["c.pdf"]
+
+
+def test_list_objects_sorted(storage: StorageBackend) -> None:
+    keys = ["b.pdf", "B.pdf", "a.webp", "é.pdf", "a.pdf"]
+    for key in keys:
+        storage.save(key, io.BytesIO(key.encode()))
+    listed = list(storage.list_objects())
+    assert [obj.key for obj in listed] == sorted(keys, key=str.encode)
+    assert all(obj.size == len(obj.key.encode()) for obj in listed)
+
+
+def test_file_response(storage: StorageBackend) -> None:
+    content = b"x" * 3000
+    storage.save("a.pdf", io.BytesIO(content))
+    app = FastAPI()
+
+    @app.get("/{key}")
+    def download(key: str):  # type: ignore[no-untyped-def]
+        return storage.file_response(key, "pattern.pdf")
+
+    response = TestClient(app).get("/a.pdf")
+    assert response.status_code == 200
+    assert response.content == content
+    assert "attachment" in response.headers["content-disposition"]
+    assert "pattern.pdf" in response.headers["content-disposition"]
+
+
+def test_local_storage_rejects_path_traversal(tmp_path: Path) -> None:
+    storage = LocalStorage(tmp_path / "files")
+    storage.setup()
+    (tmp_path / "secret").write_bytes(b"secret")
+    for key in ["../secret", "..", "", "sub/file"]:
+        with pytest.raises(FileNotFoundError):
+            storage.stat(key)
+        with pytest.raises(FileNotFoundError):
+            storage.save(key, io.BytesIO(b"x"))
+
+
+def test_local_storage_lists_in_runs(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr("app.core.local_storage.LIST_RUN_SIZE", 2)
+    storage = LocalStorage(tmp_path / "files")
+    storage.setup()
+    keys = ["e.pdf", "b.pdf", "é.pdf", "a.pdf", "D.pdf", "c.pdf", "f.pdf"]
+    for key in keys:
+        storage.save(key, io.BytesIO(b"x"))
+    (tmp_path / "files" / ".upload-partial").write_bytes(b"x")
+    listed = [obj.key for obj in storage.list_objects()]
+    assert listed == sorted(keys, key=str.encode)
@@ -0,0 +1,63 @@
+import io
+import uuid
+from datetime import timedelta
+
+import pytest
+from sqlmodel import Session
+
+from app.core.storage import get_storage
+from app.core.storage_gc import collect_garbage
+from app.tests.utils.pattern import create_random_pattern
+
+pytestmark = pytest.mark.usefixtures("client")
+
+
+def _put_object() -> str:
+    key = f"{uuid.uuid4()}.pdf"
+    get_storage().save(key, io.BytesIO(b"%PDF-1.4"))
+    return key
+
+
+def _exists(key: str) -> bool:
+    try:
+        get_storage().stat(key)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def test_collect_garbage_deletes_orphans(db: Session) -> None:
+    referenced = _put_object()
+    icon = _put_object()
+    orphan = _put_object()
+    create_random_pattern(db, pattern_a0_file_id=referenced, icon=icon)
+
+    stats = collect_garbage(grace=timedelta(0))
+
+    assert not _exists(orphan)
+    assert _exists(referenced)
+    assert _exists(icon)
+    assert stats.deleted >= 1
+    assert stats.referenced >= 2
+    assert not stats.errors
+
+
+def test_collect_garbage_keeps_recent_objects() -> None:
+    orphan = _put_object()
+
+    stats = collect_garbage(grace=timedelta(hours=1))
+
+    assert _exists(orphan)
+    assert stats.too_recent >= 1
+    get_storage().delete(orphan)
+
+
+def test_collect_garbage_dry_run() -> None:
+    orphan = _put_object()
+
+    stats = collect_garbage(grace=timedelta(0), dry_run=True)
+
+    assert _exists(orphan)
+    assert stats.orphans >= 1
+    assert stats.deleted == 0
+    get_storage().delete(orphan)
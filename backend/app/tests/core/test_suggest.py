@@ -0,0 +1,73 @@
+import pytest
+from sqlmodel import Session
+
+from app.core import suggest
+from app.core.suggest import RankedValues, SuggestionIndex
+from app.tests.utils.pattern import create_random_pattern
+from app.tests.utils.user import create_random_user
+from app.tests.utils.utils import random_lower_string
+
+
+def test_ranked_values() -> None:
+    values = RankedValues(
+        [("Linen", 1), ("linen", 2), ("Jersey", 5), ("Linen blend", 2), ("Lace", 1)]
+    )
+    # The casing of the most patterns is kept, with the count of every casing
+    assert values.values == ["Jersey", "Lace", "linen", "Linen blend"]
+    assert values.counts == [5, 1, 3, 2]
+    assert values.starting_with("LIN", 10) == ["linen", "Linen blend"]
+    # The most frequent first, then alphabetically
+    assert values.starting_with("l", 10) == ["linen", "Linen blend", "Lace"]
+    assert values.starting_with("l", 2) == ["linen", "Linen blend"]
+    assert values.starting_with("wool", 10) == []
+
+
+def test_index_follows_writes(db: Session, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(suggest, "_CHECK_INTERVAL", 0)
+    monkeypatch.setattr(suggest, "_REBUILD_INTERVAL", 0)
+    index = SuggestionIndex()
+    prefix = random_lower_string()[:12]
+    first = create_random_pattern(db, title=f"{prefix} Dress", fabric=f"{prefix} Silk")
+    index.refresh(db)
+    assert index.suggest(prefix, 10) == ([first.title], [first.fabric])
+
+    # Rebuilt after the write, the most frequent title first
+    second = create_random_pattern(db, title=f"{prefix} Coat")
+    third = create_random_pattern(db, title=f"{prefix} Coat")
+    index.refresh(db)
+    assert index.suggest(prefix, 10) == ([second.title, first.title], [first.fabric])
+
+    db.delete(first)
+    db.delete(third)
+    db.commit()
+    index.refresh(db)
+    assert index.suggest(prefix, 10) == ([second.title], [])
+
+
+def test_index_rebuilt_at_most_every_interval(
+    db: Session, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(suggest, "_CHECK_INTERVAL", 0)
+    index = SuggestionIndex()
+    prefix = random_lower_string()[:12]
+    first = create_random_pattern(db, title=f"{prefix} Dress")
+    index.refresh(db)
+    create_random_pattern(db, title=f"{prefix} Coat")
+    index.refresh(db)
+    assert index.suggest(prefix, 10) == ([first.title], [])
+    monkeypatch.setattr(suggest, "_REBUILD_INTERVAL", 0)
+    index.refresh(db)
+    assert len(index.suggest(prefix, 10)[0]) == 2
+
+
+def test_index_scoped_by_owner(db: Session, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(suggest, "_CHECK_INTERVAL", 0)
+    index = SuggestionIndex()
+    user = create_random_user(db)
+    prefix = random_lower_string()[:12]
+    own = create_random_pattern(db, owner_id=user.id, title=f"{prefix} Dress")
+    other = create_random_pattern(db, title=f"{prefix} Coat")
+    index.refresh(db)
+    index.refresh(db, user.id)
+    assert index.suggest(prefix, 10) == ([other.title, own.title], [])
+    assert index.suggest(prefix, 10, user.id) == ([own.title], [])
@@ -0,0 +1,111 @@
+import io
+import logging
+import uuid
+from typing import Any
+
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from sqlmodel import Session
+
+from app.core.config import Settings, settings
+from app.core.storage import get_storage
+from app.tests.utils.pattern import create_random_pattern
+from app.tests.utils.utils import random_lower_string
+
+
+def _server_timing(header: str) -> dict[str, float]:
+    phases = {}
+    for entry in header.split(", "):
+        name, _, duration = entry.partition(";dur=")
+        phases[name] = float(duration)
+    return phases
+
+
+def test_server_timing_header(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    # A filter never used before, not to get a cached listing
+    response = client.get(
+        f"{settings.API_V1_STR}/patterns/",
+        headers=normal_user_token_headers,
+        params={"title": random_lower_string()},
+    )
+    assert response.status_code == 200
+    phases = _server_timing(response.headers["server-timing"])
+    assert {"auth", "cache", "db", "count", "page", "total"} <= phases.keys()
+    assert phases["total"] >= max(phases.values())
+    assert (
+        REGISTRY.get_sample_value(
+            "patternland_request_phase_seconds_count",
+            {"route": "/patterns/", "phase": "count"},
+        )
+        or 0
+    ) >= 1
+
+
+def test_server_timing_s3_phase(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    key = f"{uuid.uuid4()}.pdf"
+    get_storage().save(key, io.BytesIO(b"%PDF-1.4"))
+    create_random_pattern(db, pattern_a0_file_id=key)
+    response = client.get(
+        f"{settings.API_V1_STR}/patterns/download/{key}",
+        headers=normal_user_token_headers,
+    )
+    assert response.status_code == 200
+    if settings.STORAGE_BACKEND == "s3":
+        assert "s3" in _server_timing(response.headers["server-timing"])
+
+
+def test_slow_request_logged(
+    client: TestClient,
+    normal_user_token_headers: dict[str, str],
+    monkeypatch: pytest.MonkeyPatch,
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    monkeypatch.setattr(settings, "SLOW_REQUEST_THRESHOLD_MS", 0)
+    with caplog.at_level(logging.WARNING, logger="app.core.timing"):
+        client.get(f"{settings.API_V1_STR}/users/me", headers=normal_user_token_headers)
+    assert "Slow request GET /api/v1/users/me" in caplog.text
+    assert "auth=" in caplog.text
+
+
+def test_server_timing_disabled(
+    client: TestClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "SERVER_TIMING", False)
+    response = client.get(f"{settings.API_V1_STR}/utils/health-check/")
+    assert "server-timing" not in response.headers
+
+
+def test_server_timing_default_local_only() -> None:
+    def configured(**values: Any) -> Settings:
+        secrets = ("SECRET_KEY", "POSTGRES_PASSWORD", "FIRST_SUPERUSER_PASSWORD")
+        return Settings.model_validate(
+            dict.fromkeys(secrets, random_lower_string()) | values
+        )
+
+    assert configured(ENVIRONMENT="local").SERVER_TIMING
+    assert not configured(ENVIRONMENT="staging").SERVER_TIMING
+    assert configured(ENVIRONMENT="staging", SERVER_TIMING=True).SERVER_TIMING
+
+
+def test_repeated_query_logged(
+    client: TestClient,
+    normal_user_token_headers: dict[str, str],
+    monkeypatch: pytest.MonkeyPatch,
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    monkeypatch.setattr(settings, "REPEATED_QUERY_THRESHOLD", 1)
+    with caplog.at_level(logging.WARNING, logger="app.core.timing"):
+        client.get(f"{settings.API_V1_STR}/users/me", headers=normal_user_token_headers)
+    assert "Possible N+1 query in GET /api/v1/users/me" in caplog.text
+    assert 'FROM "user"' in caplog.text
+    assert (
+        REGISTRY.get_sample_value(
+            "patternland_request_queries_count", {"route": "/users/me"}
+        )
+        or 0
+    ) >= 1
@@ -0,0 +1,129 @@
+import io
+import uuid
+from collections.abc import Generator
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi.testclient import TestClient
+from opentelemetry import trace
+from opentelemetry.instrumentation.sqlalchemy import SQLAlchemyInstrumentor
+from opentelemetry.sdk.trace import ReadableSpan, TracerProvider
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+    InMemorySpanExporter,
+)
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.storage import get_storage
+from app.core.tracing import (
+    create_tracer_provider,
+    in_current_context,
+    setup_tracing,
+    teardown_tracing,
+)
+from app.main import app
+from app.tests.utils.pattern import create_random_pattern
+
+
+class Spans:
+    def __init__(self, provider: TracerProvider, exporter: InMemorySpanExporter):
+        self.provider = provider
+        self.exporter = exporter
+
+    def finished(self) -> list[ReadableSpan]:
+        # Spans are exported in batches
+        self.provider.force_flush()
+        return list(self.exporter.get_finished_spans())
+
+    def clear(self) -> None:
+        self.provider.force_flush()
+        self.exporter.clear()
+
+
+@pytest.fixture(scope="module")
+def tracing(client: TestClient) -> Generator[Spans, None, None]:  # noqa: ARG001
+    exporter = InMemorySpanExporter()
+    provider = setup_tracing(app, exporter=exporter, sample_rate=1.0)
+    # Rebuild the middleware stack of the already started app
+    app.middleware_stack = None
+    yield Spans(provider, exporter)
+    teardown_tracing(app)
+
+
+@pytest.fixture
+def spans(tracing: Spans) -> Spans:
+    tracing.clear()
+    return tracing
+
+
+def test_request_and_sql_spans(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    spans: Spans,
+) -> None:
+    if not SQLAlchemyInstrumentor().is_instrumented_by_opentelemetry:
+        # The instrumentation refuses SQLAlchemy versions it does not support
+        pytest.skip("SQLAlchemy instrumentation not available")
+    response = client.get(
+        f"{settings.API_V1_STR}/patterns/", headers=superuser_token_headers
+    )
+    assert response.status_code == 200
+
+    finished = spans.finished()
+    server = next(s for s in finished if s.kind == trace.SpanKind.SERVER)
+    assert server.attributes is not None
+    route = server.attributes["http.route"]
+    assert isinstance(route, str)
+    assert route.endswith("/patterns/")
+    queries = [s for s in finished if "db.statement" in (s.attributes or {})]
+    assert len(queries) == 3
+    assert all(s.context.trace_id == server.context.trace_id for s in queries)
+
+
+def test_s3_spans(
+    client: TestClient,
+    normal_user_token_headers: dict[str, str],
+    db: Session,
+    spans: Spans,
+) -> None:
+    if settings.STORAGE_BACKEND != "s3":
+        pytest.skip("S3 storage not in use")
+    key = f"{uuid.uuid4()}.pdf"
+    get_storage().save(key, io.BytesIO(b"%PDF-1.4"))
+    create_random_pattern(db, pattern_a0_file_id=key)
+    spans.clear()
+    response = client.get(
+        f"{settings.API_V1_STR}/patterns/download/{key}",
+        headers=normal_user_token_headers,
+    )
+    assert response.status_code == 200
+    finished = spans.finished()
+    server = next(s for s in finished if s.kind == trace.SpanKind.SERVER)
+    s3 = [s for s in finished if s.name == "S3.GetObject"]
+    assert s3
+    assert s3[0].context.trace_id == server.context.trace_id
+
+
+def test_context_propagated_to_executor(spans: Spans) -> None:
+    tracer = trace.get_tracer(__name__)
+
+    def work() -> None:
+        with tracer.start_as_current_span("background"):
+            pass
+
+    with tracer.start_as_current_span("parent") as parent:
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            executor.submit(in_current_context(work)).result()
+
+    background = next(s for s in spans.finished() if s.name == "background")
+    assert background.parent is not None
+    assert background.parent.span_id == parent.get_span_context().span_id
+
+
+def test_sample_rate() -> None:
+    exporter = InMemorySpanExporter()
+    provider = create_tracer_provider(exporter, sample_rate=0)
+    with provider.get_tracer(__name__).start_as_current_span("dropped"):
+        pass
+    provider.force_flush()
+    assert exporter.get_finished_spans() == ()
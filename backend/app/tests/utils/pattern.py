@@ -0,0 +1,26 @@
+from typing import Any
+
+from sqlmodel import Session
+
+from app.models import Pattern, PatternCreate
+from app.tests.utils.user import create_random_user
+from app.tests.utils.utils import random_lower_string
+
+
+def create_random_pattern(db: Session, **extra: Any) -> Pattern:
+    if "owner_id" not in extra:
+        extra["owner_id"] = create_random_user(db).id
+    pattern_in = PatternCreate(
+        title=random_lower_string(),
+        description=random_lower_string(),
+        brand="Other",
+        version="Digital",
+        for_who="Women",
+        category="Dresses",
+        difficulty=2,
+    )
+    pattern = Pattern.model_validate(pattern_in, update=extra)
+    db.add(pattern)
+    db.commit()
+    db.refresh(pattern)
+    return pattern
@@ -0,0 +1,26 @@
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any
+
+from sqlalchemy import event
+
+from app.core.database import engine
+
+
+@contextmanager
+def assert_max_queries(max_queries: int) -> Iterator[list[str]]:
+    """Fail when the block executes more than `max_queries` SQL statements."""
+    statements: list[str] = []
+
+    def after_cursor_execute(_conn: Any, _cursor: Any, statement: str, *_: Any) -> None:
+        statements.append(" ".join(statement.split()))
+
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "after_cursor_execute", after_cursor_execute)
+    assert len(statements) <= max_queries, (
+        f"{len(statements)} queries executed, expected at most {max_queries}:\n"
+        + "\n".join(statements)
+    )
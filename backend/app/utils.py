@@ -8,12 +8,14 @@ import emails  # type: ignore
 import jwt
 from jinja2 import Template
 from jwt.exceptions import InvalidTokenError
+from opentelemetry import trace
 
 from app.core import security
 from app.core.config import settings
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
+tracer = trace.get_tracer(__name__)
 
 
 @dataclass
@@ -51,7 +53,15 @@ def send_email(
         smtp_options["user"] = settings.SMTP_USER
     if settings.SMTP_PASSWORD:
         smtp_options["password"] = settings.SMTP_PASSWORD
-    response = message.send(to=email_to, smtp=smtp_options)
+    with tracer.start_as_current_span(
+        "send_email",
+        kind=trace.SpanKind.CLIENT,
+        attributes={
+            "server.address": settings.SMTP_HOST or "",
+            "email.subject": subject,
+        },
+    ):
+        response = message.send(to=email_to, smtp=smtp_options)
     logger.info(f"send email result: {response}")
 
 
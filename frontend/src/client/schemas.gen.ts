@@ -55,6 +55,23 @@ export const Body_login_login_access_tokenSchema = {
   title: "Body_login-login_access_token",
 } as const
 
+export const FileUrlSchema = {
+  properties: {
+    url: {
+      type: "string",
+      title: "Url",
+    },
+    expires_at: {
+      type: "string",
+      format: "date-time",
+      title: "Expires At",
+    },
+  },
+  type: "object",
+  required: ["url", "expires_at"],
+  title: "FileUrl",
+} as const
+
 export const HTTPValidationErrorSchema = {
   properties: {
     detail: {
@@ -27,10 +27,36 @@ import type {
   PatternsUploadFilesResponse,
   PatternsDownloadFileData,
   PatternsDownloadFileResponse,
+  PatternsReadIconData,
+  PatternsReadIconResponse,
+  PatternsCreateDownloadUrlData,
+  PatternsCreateDownloadUrlResponse,
+  PatternsDownloadSignedFileData,
+  PatternsDownloadSignedFileResponse,
+  PatternsDownloadBundleData,
+  PatternsDownloadBundleResponse,
   PatternsReadPatternsData,
   PatternsReadPatternsResponse,
   PatternsCreatePatternData,
   PatternsCreatePatternResponse,
+  PatternsExportPatternsData,
+  PatternsExportPatternsResponse,
+  PatternsSuggestPatternsData,
+  PatternsSuggestPatternsResponse,
+  PatternsStreamPatternEventsData,
+  PatternsStreamPatternEventsResponse,
+  PatternsImportPatternsData,
+  PatternsImportPatternsResponse,
+  PatternsReadPatternImportData,
+  PatternsReadPatternImportResponse,
+  PatternsReadPatternImportErrorsData,
+  PatternsReadPatternImportErrorsResponse,
+  PatternsCreatePatternsBulkData,
+  PatternsCreatePatternsBulkResponse,
+  PatternsUpdatePatternsBulkData,
+  PatternsUpdatePatternsBulkResponse,
+  PatternsDeletePatternsBulkData,
+  PatternsDeletePatternsBulkResponse,
   PatternsReadPatternData,
   PatternsReadPatternResponse,
   PatternsUpdatePatternData,
@@ -60,6 +86,8 @@ import type {
   UtilsTestEmailData,
   UtilsTestEmailResponse,
   UtilsHealthCheckResponse,
+  UtilsProfileData,
+  UtilsProfileResponse,
 } from "./types.gen"
 
 export class ItemsService {
@@ -294,6 +322,7 @@ export class PatternsService {
    * Upload files to a pattern.
    * @param data The data for the request.
    * @param data.formData
+   * @param data.idempotencyKey Unique per request, a retry with the same key gets the response of the first request instead of processing it again
    * @returns unknown Successful Response
    * @throws ApiError
    */
@@ -303,6 +332,9 @@ export class PatternsService {
     return __request(OpenAPI, {
       method: "POST",
       url: "/api/v1/patterns/upload/",
+      headers: {
+        "idempotency-key": data.idempotencyKey,
+      },
       formData: data.formData,
       mediaType: "multipart/form-data",
       errors: {
@@ -313,9 +345,10 @@ export class PatternsService {
 
   /**
    * Download File
-   * Download a file from MinIO.
+   * Download a stored file.
    * @param data The data for the request.
    * @param data.filename
+   * @param data.ifNoneMatch
    * @returns unknown Successful Response
    * @throws ApiError
    */
@@ -328,6 +361,121 @@ export class PatternsService {
       path: {
         filename: data.filename,
       },
+      headers: {
+        "if-none-match": data.ifNoneMatch,
+      },
+      errors: {
+        422: "Validation Error",
+      },
+    })
+  }
+
+  /**
+   * Read Icon
+   * Get a pattern icon, public and cacheable by browsers and proxies.
+   * @param data The data for the request.
+   * @param data.filename
+   * @param data.ifNoneMatch
+   * @returns unknown Successful Response
+   * @throws ApiError
+   */
+  public static readIcon(
+    data: PatternsReadIconData,
+  ): CancelablePromise<PatternsReadIconResponse> {
+    return __request(OpenAPI, {
+      method: "GET",
+      url: "/api/v1/patterns/icons/{filename}",
+      path: {
+        filename: data.filename,
+      },
+      headers: {
+        "if-none-match": data.ifNoneMatch,
+      },
+      errors: {
+        422: "Validation Error",
+      },
+    })
+  }
+
+  /**
+   * Create Download Url
+   * Get a signed URL to download a stored file without the access token.
+   * @param data The data for the request.
+   * @param data.filename
+   * @returns FileUrl Successful Response
+   * @throws ApiError
+   */
+  public static createDownloadUrl(
+    data: PatternsCreateDownloadUrlData,
+  ): CancelablePromise<PatternsCreateDownloadUrlResponse> {
+    return __request(OpenAPI, {
+      method: "GET",
+      url: "/api/v1/patterns/download-url/{filename}",
+      path: {
+        filename: data.filename,
+      },
+      errors: {
+        422: "Validation Error",
+      },
+    })
+  }
+
+  /**
+   * Download Signed File
+   * Download a stored file with a signed URL.
+   * @param data The data for the request.
+   * @param data.filename
+   * @param data.expires
+   * @param data.signature
+   * @param data.ifNoneMatch
+   * @returns unknown Successful Response
+   * @throws ApiError
+   */
+  public static downloadSignedFile(
+    data: PatternsDownloadSignedFileData,
+  ): CancelablePromise<PatternsDownloadSignedFileResponse> {
+    return __request(OpenAPI, {
+      method: "GET",
+      url: "/api/v1/patterns/files/{filename}",
+      path: {
+        filename: data.filename,
+      },
+      headers: {
+        "if-none-match": data.ifNoneMatch,
+      },
+      query: {
+        expires: data.expires,
+        signature: data.signature,
+      },
+      errors: {
+        422: "Validation Error",
+      },
+    })
+  }
+
+  /**
+   * Download Bundle
+   * Download all the files of a pattern in a single ZIP archive.
+   * @param data The data for the request.
+   * @param data.id
+   * @param data.range
+   * @param data.ifRange
+   * @returns unknown Successful Response
+   * @throws ApiError
+   */
+  public static downloadBundle(
+    data: PatternsDownloadBundleData,
+  ): CancelablePromise<PatternsDownloadBundleResponse> {
+    return __request(OpenAPI, {
+      method: "GET",
+      url: "/api/v1/patterns/{id}/bundle.zip",
+      path: {
+        id: data.id,
+      },
+      headers: {
+        Range: data.range,
+        "if-range": data.ifRange,
+      },
       errors: {
         422: "Validation Error",
       },
@@ -338,18 +486,26 @@ export class PatternsService {
    * Read Patterns
    * Retrieve patterns.
    * @param data The data for the request.
+   * @param data.q Full-text search in the title, brand, category, fabric and description, the words may be incomplete. Results are ranked by relevance
    * @param data.title
-   * @param data.brand
+   * @param data.brand Any of these brands, repeat it for several
    * @param data.version
-   * @param data.forWho
-   * @param data.category
+   * @param data.forWho Any of these, repeat it for several
+   * @param data.category Any of these categories, repeat it for several
    * @param data.difficulty
+   * @param data.difficultyMin
+   * @param data.difficultyMax
    * @param data.fabric
-   * @param data.fabricAmount
+   * @param data.fabricAmount Exact amount, use fabric_amount_min and fabric_amount_max
+   * @param data.fabricAmountMin
+   * @param data.fabricAmountMax
    * @param data.skip
    * @param data.limit
+   * @param data.sort A column to sort by, with a leading - for the descending order. By default the most relevant first when searching, then the latest updated
+   * @param data.after The next cursor of the previous page, to get the page after it. Needs a sort when searching
    * @param data.selfPatterns
-   * @returns PatternsPublic Successful Response
+   * @param data.fields Comma separated fields to return, all by default, the id is always returned
+   * @returns unknown Successful Response
    * @throws ApiError
    */
   public static readPatterns(
@@ -359,17 +515,25 @@ export class PatternsService {
       method: "GET",
       url: "/api/v1/patterns/",
       query: {
+        q: data.q,
         title: data.title,
         brand: data.brand,
         version: data.version,
         for_who: data.forWho,
         category: data.category,
         difficulty: data.difficulty,
+        difficulty_min: data.difficultyMin,
+        difficulty_max: data.difficultyMax,
         fabric: data.fabric,
         fabric_amount: data.fabricAmount,
+        fabric_amount_min: data.fabricAmountMin,
+        fabric_amount_max: data.fabricAmountMax,
         skip: data.skip,
         limit: data.limit,
+        sort: data.sort,
+        after: data.after,
         self_patterns: data.selfPatterns,
+        fields: data.fields,
       },
       errors: {
         422: "Validation Error",
@@ -382,6 +546,7 @@ export class PatternsService {
    * Create new pattern.
    * @param data The data for the request.
    * @param data.requestBody
+   * @param data.idempotencyKey Unique per request, a retry with the same key gets the response of the first request instead of processing it again
    * @returns PatternPublic Successful Response
    * @throws ApiError
    */
@@ -391,6 +556,269 @@ export class PatternsService {
     return __request(OpenAPI, {
       method: "POST",
       url: "/api/v1/patterns/",
+      headers: {
+        "idempotency-key": data.idempotencyKey,
+      },
+      body: data.requestBody,
+      mediaType: "application/json",
+      errors: {
+        422: "Validation Error",
+      },
+    })
+  }
+
+  /**
+   * Export Patterns
+   * Export the patterns matching the filters, without pagination.
+   * @param data The data for the request.
+   * @param data.q Full-text search in the title, brand, category, fabric and description, the words may be incomplete. Results are ranked by relevance
+   * @param data.title
+   * @param data.brand Any of these brands, repeat it for several
+   * @param data.version
+   * @param data.forWho Any of these, repeat it for several
+   * @param data.category Any of these categories, repeat it for several
+   * @param data.difficulty
+   * @param data.difficultyMin
+   * @param data.difficultyMax
+   * @param data.fabric
+   * @param data.fabricAmount Exact amount, use fabric_amount_min and fabric_amount_max
+   * @param data.fabricAmountMin
+   * @param data.fabricAmountMax
+   * @param data.selfPatterns
+   * @param data.fields Comma separated fields to export, all by default, the id is always exported
+   * @param data.sort A column to sort by, with a leading - for the descending order. By default the most relevant first when searching, then the latest updated
+   * @param data.format
+   * @returns unknown The patterns, a row per pattern
+   * @throws ApiError
+   */
+  public static exportPatterns(
+    data: PatternsExportPatternsData = {},
+  ): CancelablePromise<PatternsExportPatternsResponse> {
+    return __request(OpenAPI, {
+      method: "GET",
+      url: "/api/v1/patterns/export",
+      query: {
+        q: data.q,
+        title: data.title,
+        brand: data.brand,
+        version: data.version,
+        for_who: data.forWho,
+        category: data.category,
+        difficulty: data.difficulty,
+        difficulty_min: data.difficultyMin,
+        difficulty_max: data.difficultyMax,
+        fabric: data.fabric,
+        fabric_amount: data.fabricAmount,
+        fabric_amount_min: data.fabricAmountMin,
+        fabric_amount_max: data.fabricAmountMax,
+        self_patterns: data.selfPatterns,
+        fields: data.fields,
+        sort: data.sort,
+        format: data.format,
+      },
+      errors: {
+        422: "Validation Error",
+      },
+    })
+  }
+
+  /**
+   * Suggest Patterns
+   * Titles and fabrics starting with a prefix, for a search being typed, the
+   * most frequent first.
+   * @param data The data for the request.
+   * @param data.prefix
+   * @param data.limit
+   * @param data.selfPatterns
+   * @returns PatternSuggestions Successful Response
+   * @throws ApiError
+   */
+  public static suggestPatterns(
+    data: PatternsSuggestPatternsData,
+  ): CancelablePromise<PatternsSuggestPatternsResponse> {
+    return __request(OpenAPI, {
+      method: "GET",
+      url: "/api/v1/patterns/suggest",
+      query: {
+        prefix: data.prefix,
+        limit: data.limit,
+        self_patterns: data.selfPatterns,
+      },
+      errors: {
+        422: "Validation Error",
+      },
+    })
+  }
+
+  /**
+   * Stream Pattern Events
+   * Stream the changes of the patterns as Server-Sent Events.
+   * @param data The data for the request.
+   * @param data.selfPatterns
+   * @param data.after Resume after the event with this id
+   * @param data.lastEventId Resume after the event with this id
+   * @returns unknown The `created`, `updated`, `uploaded` and `deleted` events of the patterns, `reset` when they must be refetched
+   * @throws ApiError
+   */
+  public static streamPatternEvents(
+    data: PatternsStreamPatternEventsData = {},
+  ): CancelablePromise<PatternsStreamPatternEventsResponse> {
+    return __request(OpenAPI, {
+      method: "GET",
+      url: "/api/v1/patterns/events",
+      query: {
+        self_patterns: data.selfPatterns,
+        after: data.after,
+      },
+      headers: {
+        "last-event-id": data.lastEventId,
+      },
+      errors: {
+        422: "Validation Error",
+      },
+    })
+  }
+
+  /**
+   * Import Patterns
+   * Import the patterns of a CSV or NDJSON file in the background.
+   *
+   * The import is polled with its id, the rows that could not be imported
+   * are reported with their line in the file.
+   * @param data The data for the request.
+   * @param data.formData
+   * @param data.format Guessed from the file name by default
+   * @returns PatternImportPublic Successful Response
+   * @throws ApiError
+   */
+  public static importPatterns(
+    data: PatternsImportPatternsData,
+  ): CancelablePromise<PatternsImportPatternsResponse> {
+    return __request(OpenAPI, {
+      method: "POST",
+      url: "/api/v1/patterns/import",
+      query: {
+        format: data.format,
+      },
+      formData: data.formData,
+      mediaType: "multipart/form-data",
+      errors: {
+        422: "Validation Error",
+      },
+    })
+  }
+
+  /**
+   * Read Pattern Import
+   * Get the progress of an import.
+   * @param data The data for the request.
+   * @param data.importId
+   * @returns PatternImportPublic Successful Response
+   * @throws ApiError
+   */
+  public static readPatternImport(
+    data: PatternsReadPatternImportData,
+  ): CancelablePromise<PatternsReadPatternImportResponse> {
+    return __request(OpenAPI, {
+      method: "GET",
+      url: "/api/v1/patterns/import/{import_id}",
+      path: {
+        import_id: data.importId,
+      },
+      errors: {
+        422: "Validation Error",
+      },
+    })
+  }
+
+  /**
+   * Read Pattern Import Errors
+   * Download the report of the rows that could not be imported.
+   * @param data The data for the request.
+   * @param data.importId
+   * @returns unknown The rejected rows, by line in the file
+   * @throws ApiError
+   */
+  public static readPatternImportErrors(
+    data: PatternsReadPatternImportErrorsData,
+  ): CancelablePromise<PatternsReadPatternImportErrorsResponse> {
+    return __request(OpenAPI, {
+      method: "GET",
+      url: "/api/v1/patterns/import/{import_id}/errors",
+      path: {
+        import_id: data.importId,
+      },
+      errors: {
+        422: "Validation Error",
+      },
+    })
+  }
+
+  /**
+   * Create Patterns Bulk
+   * Create several patterns in a single transaction.
+   *
+   * Each item is validated as a pattern to create, the valid ones are
+   * inserted with a single statement and the others are reported with their
+   * validation errors.
+   * @param data The data for the request.
+   * @param data.requestBody
+   * @returns BulkResults Successful Response
+   * @throws ApiError
+   */
+  public static createPatternsBulk(
+    data: PatternsCreatePatternsBulkData,
+  ): CancelablePromise<PatternsCreatePatternsBulkResponse> {
+    return __request(OpenAPI, {
+      method: "POST",
+      url: "/api/v1/patterns/bulk",
+      body: data.requestBody,
+      mediaType: "application/json",
+      errors: {
+        422: "Validation Error",
+      },
+    })
+  }
+
+  /**
+   * Update Patterns Bulk
+   * Update several patterns in a single transaction.
+   *
+   * Each item has the `id` of a pattern and the fields to update. Items
+   * updating the same fields are written with a single statement.
+   * @param data The data for the request.
+   * @param data.requestBody
+   * @returns BulkResults Successful Response
+   * @throws ApiError
+   */
+  public static updatePatternsBulk(
+    data: PatternsUpdatePatternsBulkData,
+  ): CancelablePromise<PatternsUpdatePatternsBulkResponse> {
+    return __request(OpenAPI, {
+      method: "PATCH",
+      url: "/api/v1/patterns/bulk",
+      body: data.requestBody,
+      mediaType: "application/json",
+      errors: {
+        422: "Validation Error",
+      },
+    })
+  }
+
+  /**
+   * Delete Patterns Bulk
+   * Delete several patterns and their stored files.
+   * @param data The data for the request.
+   * @param data.requestBody
+   * @returns BulkResults Successful Response
+   * @throws ApiError
+   */
+  public static deletePatternsBulk(
+    data: PatternsDeletePatternsBulkData,
+  ): CancelablePromise<PatternsDeletePatternsBulkResponse> {
+    return __request(OpenAPI, {
+      method: "DELETE",
+      url: "/api/v1/patterns/bulk",
       body: data.requestBody,
       mediaType: "application/json",
       errors: {
@@ -744,4 +1172,30 @@ export class UtilsService {
       url: "/api/v1/utils/health-check/",
     })
   }
+
+  /**
+   * Profile
+   * Sample the stacks of every thread of the worker serving this request
+   * for some seconds and return them as a speedscope profile.
+   * @param data The data for the request.
+   * @param data.seconds
+   * @param data.intervalMs
+   * @returns unknown Successful Response
+   * @throws ApiError
+   */
+  public static profile(
+    data: UtilsProfileData = {},
+  ): CancelablePromise<UtilsProfileResponse> {
+    return __request(OpenAPI, {
+      method: "GET",
+      url: "/api/v1/utils/profile",
+      query: {
+        seconds: data.seconds,
+        interval_ms: data.intervalMs,
+      },
+      errors: {
+        422: "Validation Error",
+      },
+    })
+  }
 }
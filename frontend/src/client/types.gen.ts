@@ -9,6 +9,10 @@ export type Body_login_login_access_token = {
   client_secret?: string | null
 }
 
+export type Body_patterns_import_patterns = {
+  file: Blob | File
+}
+
 export type Body_patterns_upload_files = {
   id: string
   pattern_a0_file?: (Blob | File) | null
@@ -21,6 +25,22 @@ export type Body_patterns_upload_files = {
   icon?: (Blob | File) | null
 }
 
+export type BulkItemResult = {
+  index: number
+  status: number
+  id?: string | null
+  detail?: unknown
+}
+
+export type BulkResults = {
+  data: Array<BulkItemResult>
+}
+
+export type FileUrl = {
+  url: string
+  expires_at: string
+}
+
 export type HTTPValidationError = {
   detail?: Array<ValidationError>
 }
@@ -105,6 +125,74 @@ export type version = "Paper" | "Digital"
 
 export type for_who = "Baby" | "Kids" | "Men" | "Women" | "Pets" | "Unisex"
 
+export type PatternImportPublic = {
+  format: "csv" | "ndjson"
+  status?: "pending" | "running" | "done" | "failed"
+  size?: number
+  position?: number
+  rows?: number
+  imported?: number
+  failed?: number
+  detail?: string | null
+  created_at?: string
+  finished_at?: string | null
+  id: string
+}
+
+export type PatternPartialPublic = {
+  title?: string | null
+  description?: string | null
+  brand?:
+    | "Fibre Mood"
+    | "Other"
+    | "Seamwork"
+    | "Katia"
+    | "Burda"
+    | "Patrones"
+    | null
+  version?: "Paper" | "Digital" | null
+  pattern_url?: string | null
+  for_who?: "Baby" | "Kids" | "Men" | "Women" | "Pets" | "Unisex" | null
+  category?:
+    | "Accessories"
+    | "Bags"
+    | "Blazers"
+    | "Bodywarmer"
+    | "Cardigans"
+    | "Coats"
+    | "DIY"
+    | "Dresses"
+    | "Hoodie"
+    | "Jackets"
+    | "Jumpers"
+    | "Jumpsuits"
+    | "Overalls"
+    | "Overshirt"
+    | "Pullovers"
+    | "Shirts"
+    | "Shorts"
+    | "Skirts"
+    | "Sweaters"
+    | "Swimwear"
+    | "T-shirts"
+    | "Tops"
+    | "Trousers"
+    | null
+  difficulty?: number | null
+  fabric?: string | null
+  fabric_amount?: number | null
+  id: string
+  owner_id?: string | null
+  pattern_a0_file_id?: string | null
+  pattern_a0_sa_file_id?: string | null
+  pattern_a0_sa_projector_file_id?: string | null
+  pattern_a0_projector_file_id?: string | null
+  pattern_a4_file_id?: string | null
+  pattern_a4_sa_file_id?: string | null
+  pattern_instructables_file_id?: string | null
+  icon?: string | null
+}
+
 export type PatternPublic = {
   title: string
   description?: string | null
@@ -152,9 +240,21 @@ export type PatternPublic = {
   icon?: string | null
 }
 
+export type PatternsPartialPublic = {
+  data: Array<PatternPartialPublic>
+  count: number
+  next?: string | null
+}
+
 export type PatternsPublic = {
   data: Array<PatternPublic>
   count: number
+  next?: string | null
+}
+
+export type PatternSuggestions = {
+  titles: Array<string>
+  fabrics: Array<string>
 }
 
 export type PatternUpdate = {
@@ -324,38 +424,294 @@ export type LoginRecoverPasswordHtmlContentResponse = string
 
 export type PatternsUploadFilesData = {
   formData: Body_patterns_upload_files
+  /**
+   * Unique per request, a retry with the same key gets the response of the first request instead of processing it again
+   */
+  idempotencyKey?: string | null
 }
 
-export type PatternsUploadFilesResponse = unknown
+export type PatternsUploadFilesResponse = PatternPublic
 
 export type PatternsDownloadFileData = {
   filename: string
+  ifNoneMatch?: string | null
 }
 
 export type PatternsDownloadFileResponse = unknown
 
+export type PatternsReadIconData = {
+  filename: string
+  ifNoneMatch?: string | null
+}
+
+export type PatternsReadIconResponse = unknown
+
+export type PatternsCreateDownloadUrlData = {
+  filename: string
+}
+
+export type PatternsCreateDownloadUrlResponse = FileUrl
+
+export type PatternsDownloadSignedFileData = {
+  expires: number
+  filename: string
+  ifNoneMatch?: string | null
+  signature: string
+}
+
+export type PatternsDownloadSignedFileResponse = unknown
+
+export type PatternsDownloadBundleData = {
+  id: string
+  ifRange?: string | null
+  range?: string | null
+}
+
+export type PatternsDownloadBundleResponse = unknown
+
 export type PatternsReadPatternsData = {
-  brand?: string
-  category?: string
-  difficulty?: number
-  fabric?: string
-  fabricAmount?: number
-  forWho?: string
+  /**
+   * The next cursor of the previous page, to get the page after it. Needs a sort when searching
+   */
+  after?: string | null
+  /**
+   * Any of these brands, repeat it for several
+   */
+  brand?: Array<
+    "Fibre Mood" | "Other" | "Seamwork" | "Katia" | "Burda" | "Patrones"
+  > | null
+  /**
+   * Any of these categories, repeat it for several
+   */
+  category?: Array<
+    | "Accessories"
+    | "Bags"
+    | "Blazers"
+    | "Bodywarmer"
+    | "Cardigans"
+    | "Coats"
+    | "DIY"
+    | "Dresses"
+    | "Hoodie"
+    | "Jackets"
+    | "Jumpers"
+    | "Jumpsuits"
+    | "Overalls"
+    | "Overshirt"
+    | "Pullovers"
+    | "Shirts"
+    | "Shorts"
+    | "Skirts"
+    | "Sweaters"
+    | "Swimwear"
+    | "T-shirts"
+    | "Tops"
+    | "Trousers"
+  > | null
+  difficulty?: number | null
+  difficultyMax?: number | null
+  difficultyMin?: number | null
+  fabric?: string | null
+  /**
+   * @deprecated
+   * Exact amount, use fabric_amount_min and fabric_amount_max
+   */
+  fabricAmount?: number | null
+  fabricAmountMax?: number | null
+  fabricAmountMin?: number | null
+  /**
+   * Comma separated fields to return, all by default, the id is always returned
+   */
+  fields?: string | null
+  /**
+   * Any of these, repeat it for several
+   */
+  forWho?: Array<"Baby" | "Kids" | "Men" | "Women" | "Pets" | "Unisex"> | null
   limit?: number
+  /**
+   * Full-text search in the title, brand, category, fabric and description, the words may be incomplete. Results are ranked by relevance
+   */
+  q?: string | null
   selfPatterns?: boolean
   skip?: number
-  title?: string
-  version?: string
+  /**
+   * A column to sort by, with a leading - for the descending order. By default the most relevant first when searching, then the latest updated
+   */
+  sort?:
+    | "title"
+    | "-title"
+    | "difficulty"
+    | "-difficulty"
+    | "fabric_amount"
+    | "-fabric_amount"
+    | "created_at"
+    | "-created_at"
+    | "updated_at"
+    | "-updated_at"
+    | null
+  title?: string | null
+  version?: "Paper" | "Digital" | null
 }
 
-export type PatternsReadPatternsResponse = PatternsPublic
+export type PatternsReadPatternsResponse = PatternsPublic | PatternsPartialPublic
 
 export type PatternsCreatePatternData = {
+  /**
+   * Unique per request, a retry with the same key gets the response of the first request instead of processing it again
+   */
+  idempotencyKey?: string | null
   requestBody: PatternCreate
 }
 
 export type PatternsCreatePatternResponse = PatternPublic
 
+export type PatternsExportPatternsData = {
+  /**
+   * Any of these brands, repeat it for several
+   */
+  brand?: Array<
+    "Fibre Mood" | "Other" | "Seamwork" | "Katia" | "Burda" | "Patrones"
+  > | null
+  /**
+   * Any of these categories, repeat it for several
+   */
+  category?: Array<
+    | "Accessories"
+    | "Bags"
+    | "Blazers"
+    | "Bodywarmer"
+    | "Cardigans"
+    | "Coats"
+    | "DIY"
+    | "Dresses"
+    | "Hoodie"
+    | "Jackets"
+    | "Jumpers"
+    | "Jumpsuits"
+    | "Overalls"
+    | "Overshirt"
+    | "Pullovers"
+    | "Shirts"
+    | "Shorts"
+    | "Skirts"
+    | "Sweaters"
+    | "Swimwear"
+    | "T-shirts"
+    | "Tops"
+    | "Trousers"
+  > | null
+  difficulty?: number | null
+  difficultyMax?: number | null
+  difficultyMin?: number | null
+  fabric?: string | null
+  /**
+   * @deprecated
+   * Exact amount, use fabric_amount_min and fabric_amount_max
+   */
+  fabricAmount?: number | null
+  fabricAmountMax?: number | null
+  fabricAmountMin?: number | null
+  /**
+   * Comma separated fields to export, all by default, the id is always exported
+   */
+  fields?: string | null
+  format?: "ndjson" | "csv" | "parquet"
+  /**
+   * Any of these, repeat it for several
+   */
+  forWho?: Array<"Baby" | "Kids" | "Men" | "Women" | "Pets" | "Unisex"> | null
+  /**
+   * Full-text search in the title, brand, category, fabric and description, the words may be incomplete. Results are ranked by relevance
+   */
+  q?: string | null
+  selfPatterns?: boolean
+  /**
+   * A column to sort by, with a leading - for the descending order. By default the most relevant first when searching, then the latest updated
+   */
+  sort?:
+    | "title"
+    | "-title"
+    | "difficulty"
+    | "-difficulty"
+    | "fabric_amount"
+    | "-fabric_amount"
+    | "created_at"
+    | "-created_at"
+    | "updated_at"
+    | "-updated_at"
+    | null
+  title?: string | null
+  version?: "Paper" | "Digital" | null
+}
+
+export type PatternsExportPatternsResponse = unknown
+
+export type PatternsSuggestPatternsData = {
+  limit?: number
+  prefix: string
+  selfPatterns?: boolean
+}
+
+export type PatternsSuggestPatternsResponse = PatternSuggestions
+
+export type PatternsStreamPatternEventsData = {
+  /**
+   * Resume after the event with this id
+   */
+  after?: string | null
+  /**
+   * Resume after the event with this id
+   */
+  lastEventId?: string | null
+  selfPatterns?: boolean
+}
+
+export type PatternsStreamPatternEventsResponse = unknown
+
+export type PatternsImportPatternsData = {
+  formData: Body_patterns_import_patterns
+  /**
+   * Guessed from the file name by default
+   */
+  format?: "csv" | "ndjson" | null
+}
+
+export type PatternsImportPatternsResponse = PatternImportPublic
+
+export type PatternsReadPatternImportData = {
+  importId: string
+}
+
+export type PatternsReadPatternImportResponse = PatternImportPublic
+
+export type PatternsReadPatternImportErrorsData = {
+  importId: string
+}
+
+export type PatternsReadPatternImportErrorsResponse = unknown
+
+export type PatternsCreatePatternsBulkData = {
+  requestBody: Array<{
+    [key: string]: unknown
+  }>
+}
+
+export type PatternsCreatePatternsBulkResponse = BulkResults
+
+export type PatternsUpdatePatternsBulkData = {
+  requestBody: Array<{
+    [key: string]: unknown
+  }>
+}
+
+export type PatternsUpdatePatternsBulkResponse = BulkResults
+
+export type PatternsDeletePatternsBulkData = {
+  requestBody: Array<string>
+}
+
+export type PatternsDeletePatternsBulkResponse = BulkResults
+
 export type PatternsReadPatternData = {
   id: string
 }
@@ -442,3 +798,10 @@ export type UtilsTestEmailData = {
 export type UtilsTestEmailResponse = Message
 
 export type UtilsHealthCheckResponse = boolean
+
+export type UtilsProfileData = {
+  intervalMs?: number
+  seconds?: number
+}
+
+export type UtilsProfileResponse = unknown
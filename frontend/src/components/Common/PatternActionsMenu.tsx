@@ -1,8 +1,8 @@
 import { IconButton } from "@chakra-ui/react"
 import { BsThreeDotsVertical } from "react-icons/bs"
 import { MenuContent, MenuRoot, MenuTrigger } from "../ui/menu"
-import { useQueryClient } from "@tanstack/react-query"
-import type { PatternPublic } from "@/client"
+import { useQuery, useQueryClient } from "@tanstack/react-query"
+import { type PatternPartialPublic, PatternsService } from "@/client"
 import DeletePattern from "../Patterns/DeletePattern"
 import EditPattern from "../Patterns/EditPattern"
 import AddFiles from "../Patterns/AddFiles"
@@ -11,7 +11,7 @@ import { useState } from "react"
 
 import type { UserPublic } from "@/client"
 interface PatternActionsMenuProps {
-  pattern: PatternPublic
+  pattern: Pick<PatternPartialPublic, "id" | "owner_id">
 }
 
 export const PatternActionsMenu = ({ pattern }: PatternActionsMenuProps) => {
@@ -19,6 +19,13 @@ export const PatternActionsMenu = ({ pattern }: PatternActionsMenuProps) => {
   const queryClient = useQueryClient()
   // Get the current user from the query cache
   const currentUser = queryClient.getQueryData<UserPublic>(["currentUser"])
+  // Listings only have the fields shown in the grid, the files and the edit
+  // form need the whole pattern, fetched when the menu is opened
+  const { data: fullPattern } = useQuery({
+    queryKey: ["pattern", pattern.id],
+    queryFn: () => PatternsService.readPattern({ id: pattern.id }),
+    enabled: open,
+  })
   return (
     <MenuRoot open={open} onOpenChange={({ open }) => setOpen(open)}>
       <MenuTrigger asChild>
@@ -31,10 +38,12 @@ export const PatternActionsMenu = ({ pattern }: PatternActionsMenuProps) => {
         {(currentUser?.is_superuser || currentUser?.id == pattern.owner_id) && (
           <AddFiles id={pattern.id} closeMenu={() => setOpen(false)} />
         )}
-        <PatternFilesView pattern={pattern} closeMenu={() => setOpen(false)} />
+        {fullPattern && (
+          <PatternFilesView pattern={fullPattern} closeMenu={() => setOpen(false)} />
+        )}
         {/* Conditionally render EditPattern if the user has permissions */}
-        {(currentUser?.is_superuser || currentUser?.id == pattern.owner_id) && (
-          <EditPattern pattern={pattern} closeMenu={() => setOpen(false)} />
+        {fullPattern && (currentUser?.is_superuser || currentUser?.id == pattern.owner_id) && (
+          <EditPattern pattern={fullPattern} closeMenu={() => setOpen(false)} />
         )}
         {/* Conditionally render DeletePattern if the user has permissions */}
         {(currentUser?.is_superuser || currentUser?.id == pattern.owner_id) && (
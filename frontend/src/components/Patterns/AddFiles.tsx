@@ -12,7 +12,7 @@ import { FaPlus } from "react-icons/fa"
 
 import { type ApiError, type Body_patterns_upload_files, PatternsService } from "@/client"
 import useCustomToast from "@/hooks/useCustomToast"
-import { handleError } from "@/utils"
+import { handleError, retryWithoutResponse } from "@/utils"
 import {
     DialogBody,
     DialogCloseTrigger,
@@ -42,8 +42,9 @@ const AddFiles = ({ id, closeMenu }: { id: string, closeMenu?: () => void }) =>
     const { t: tPattern } = useTranslation('pattern'); // 👈 tells i18next to use "pattern.json"
     const { t: tCommon } = useTranslation('common'); // 👈 tells i18next to use "common.json"
     const mutation = useMutation({
-        mutationFn: (data: Body_patterns_upload_files) =>
-            PatternsService.uploadFiles({ formData: data }),
+        mutationFn: ({ data, key }: { data: Body_patterns_upload_files, key: string }) =>
+            PatternsService.uploadFiles({ formData: data, idempotencyKey: key }),
+        retry: retryWithoutResponse,
         onSuccess: () => {
             showSuccessToast(tPattern('add_files_success'))
             reset()
@@ -72,7 +73,8 @@ const AddFiles = ({ id, closeMenu }: { id: string, closeMenu?: () => void }) =>
             icon: data.icon?.[0] || null,
         }
 
-        mutation.mutate(payload)
+        // Kept by the retries of this submission
+        mutation.mutate({ data: payload, key: crypto.randomUUID() })
     }
 
     return (
@@ -16,7 +16,7 @@ import { FaPlus } from "react-icons/fa"
 import { type PatternCreate, Body_patterns_upload_files, PatternsService } from "@/client"
 import type { ApiError } from "@/client/core/ApiError"
 import useCustomToast from "@/hooks/useCustomToast"
-import { handleError } from "@/utils"
+import { handleError, retryWithoutResponse } from "@/utils"
 import {
     DialogBody,
     DialogCloseTrigger,
@@ -50,9 +50,12 @@ const AddPatternAndFiles = () => {
     })
     const { t: tPattern } = useTranslation('pattern'); // 👈 tells i18next to use "pattern.json"
     const mutation = useMutation({
-        mutationFn: async (data: ExtendedFormValues) => {
+        mutationFn: async ({ data, keys }: { data: ExtendedFormValues, keys: { create: string, upload: string } }) => {
             // Step 1: Create the pattern
-            const created = await PatternsService.createPattern({ requestBody: data })
+            const created = await PatternsService.createPattern({
+                requestBody: data,
+                idempotencyKey: keys.create,
+            })
             const id = created.id
             // Step 2: Upload the files
             const filePayload: Body_patterns_upload_files = {
@@ -67,9 +70,13 @@ const AddPatternAndFiles = () => {
                 icon: data.icon?.[0] || null,
             }
 
-            await PatternsService.uploadFiles({ formData: filePayload })
+            await PatternsService.uploadFiles({
+                formData: filePayload,
+                idempotencyKey: keys.upload,
+            })
             return created
         },
+        retry: retryWithoutResponse,
         onSuccess: () => {
             showSuccessToast(tPattern('files_upload_success'))
             reset()
@@ -92,7 +99,9 @@ const AddPatternAndFiles = () => {
             fabric: data.fabric === "" ? null : data.fabric, // Convert empty string to null
             fabric_amount: !data.fabric_amount ? null : data.fabric_amount, // Convert empty string to null
         };
-        mutation.mutate(processedData);
+        // Kept by the retries of this submission, so they don't duplicate it
+        const keys = { create: crypto.randomUUID(), upload: crypto.randomUUID() }
+        mutation.mutate({ data: processedData, keys });
     }
     const brandOptions: PatternCreate["brand"][] = ["Fibre Mood", "Other", "Seamwork", "Katia", "Burda", "Patrones"]
     const versionOptions: PatternCreate["version"][] = ["Paper", "Digital"]
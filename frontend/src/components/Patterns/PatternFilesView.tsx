@@ -13,9 +13,9 @@ import { saveAs } from "file-saver"
 
 import {
     type PatternPublic,
-    OpenAPI
+    OpenAPI,
+    PatternsService,
 } from "@/client"
-import { getHeaders } from "@/client/core/request"
 import useCustomToast from "@/hooks/useCustomToast"
 import {
     DialogBody,
@@ -66,16 +66,9 @@ const PatternFilesView = ({ pattern, closeMenu }: PatternFilesViewProps) => {
             // saveAs(blob, filename)
             // showSuccessToast("File downloaded.")
 
-            const headers = await getHeaders(OpenAPI, {
-                method: "GET",
-                url: "/api/v1/patterns/download/{filename}",
-                path: { filename },
-            })
-            const baseUrl = OpenAPI.BASE
-            const response = await fetch(`${baseUrl}/api/v1/patterns/download/${filename}`, {
-                method: "GET",
-                headers,
-            })
+            // Signed URLs stay the same for a while, so the browser can reuse its cached copy
+            const { url } = await PatternsService.createDownloadUrl({ filename })
+            const response = await fetch(`${OpenAPI.BASE}${url}`)
 
             if (!response.ok) throw new Error(t('download_failed'));
 
@@ -8,6 +8,8 @@ import {
   Text,
   Separator,
 } from "@chakra-ui/react"
+import { useQuery } from "@tanstack/react-query"
+import { PatternsService } from "@/client"
 import { Checkbox } from "@/components/ui/checkbox"
 import { useTranslation } from "react-i18next"
 import { useState, useEffect } from "react"
@@ -26,6 +28,14 @@ const FOR_WHO = ["Women", "Men", "Kids", "Baby", "Unisex", "Pets"] as const
 const BRANDS = ["Fibre Mood", "Seamwork", "Katia", "Burda", "Patrones", "Other"] as const
 const VERSIONS = ["Paper", "Digital"] as const
 const DIFFICULTIES = [1, 2, 3, 4, 5] as const
+// Sorted by the server, the default is the most relevant or latest first
+const SORTS = [
+  "title",
+  "difficulty",
+  "-difficulty",
+  "fabric_amount",
+  "-created_at",
+] as const satisfies NonNullable<PatternsSearch["sort"]>[]
 
 interface PatternFiltersProps {
   search: PatternsSearch
@@ -53,31 +63,55 @@ function FilterSection({ labelKey, children }: { labelKey: string; children: Rea
 
 export function PatternFilters({ search, onUpdate }: PatternFiltersProps) {
   const { t } = useTranslation("pattern")
-  const [titleInput, setTitleInput] = useState(search.title ?? "")
+  const [searchInput, setSearchInput] = useState(search.q ?? "")
 
   // Sync local input when URL changes externally (e.g. clear all)
   useEffect(() => {
-    setTitleInput(search.title ?? "")
-  }, [search.title])
+    setSearchInput(search.q ?? "")
+  }, [search.q])
 
-  // Debounce title search — only fires when input differs from URL param
+  // Debounce search — only fires when input differs from URL param
   useEffect(() => {
-    const currentTitle = search.title ?? ""
-    if (titleInput === currentTitle) return
+    const currentSearch = search.q ?? ""
+    if (searchInput === currentSearch) return
     const timer = setTimeout(() => {
-      onUpdate({ title: titleInput || undefined })
+      onUpdate({ q: searchInput || undefined })
     }, 400)
     return () => clearTimeout(timer)
-  }, [titleInput])
+  }, [searchInput])
+
+  // Completions of the search being typed, from the patterns listed
+  const prefix = searchInput.trim()
+  const selfPatterns = search.selfPatterns ?? false
+  const { data: suggestions } = useQuery({
+    queryKey: ["patternSuggestions", prefix, selfPatterns],
+    queryFn: () =>
+      PatternsService.suggestPatterns({ prefix, limit: 8, selfPatterns }),
+    enabled: prefix.length >= 2,
+    staleTime: 60_000,
+    placeholderData: (prevData) => prevData,
+  })
 
   const toggle = (key: keyof PatternsSearch, value: string | number) => {
     onUpdate({ [key]: search[key] === value ? undefined : value })
   }
 
+  // Any of the selected values match, none selected matches all
+  type AnyOfKey = "brand" | "category" | "forWho"
+  const isSelected = (key: AnyOfKey, value: string) =>
+    search[key]?.includes(value) ?? false
+  const toggleAnyOf = (key: AnyOfKey, value: string) => {
+    const selected = search[key] ?? []
+    const next = selected.includes(value)
+      ? selected.filter((v) => v !== value)
+      : [...selected, value]
+    onUpdate({ [key]: next.length ? next : undefined })
+  }
+
   const clearAll = () => {
-    setTitleInput("")
+    setSearchInput("")
     onUpdate({
-      title: undefined,
+      q: undefined,
       brand: undefined,
       category: undefined,
       forWho: undefined,
@@ -88,7 +122,7 @@ export function PatternFilters({ search, onUpdate }: PatternFiltersProps) {
   }
 
   const hasActiveFilters = Boolean(
-    search.title || search.brand || search.category ||
+    search.q || search.brand || search.category ||
     search.forWho || search.version || search.difficulty || search.selfPatterns
   )
 
@@ -114,13 +148,37 @@ export function PatternFilters({ search, onUpdate }: PatternFiltersProps) {
       </Flex>
 
       <VStack align="stretch" gap={4}>
-        <FilterSection labelKey="title">
+        <FilterSection labelKey="search">
           <Input
             placeholder={t("search_placeholder")}
-            value={titleInput}
-            onChange={(e) => setTitleInput(e.target.value)}
+            value={searchInput}
+            onChange={(e) => setSearchInput(e.target.value)}
             size="sm"
+            list="pattern-suggestions"
           />
+          <datalist id="pattern-suggestions">
+            {[...(suggestions?.titles ?? []), ...(suggestions?.fabrics ?? [])].map(
+              (value) => <option key={value} value={value} />,
+            )}
+          </datalist>
+        </FilterSection>
+
+        <FilterSection labelKey="sort">
+          <select
+            value={search.sort ?? ""}
+            onChange={(e) =>
+              onUpdate({
+                sort: (e.target.value || undefined) as PatternsSearch["sort"],
+              })
+            }
+          >
+            <option value="">{t("sort_options.default")}</option>
+            {SORTS.map((sort) => (
+              <option key={sort} value={sort}>
+                {t(`sort_options.${sort}`)}
+              </option>
+            ))}
+          </select>
         </FilterSection>
 
         <Separator />
@@ -143,9 +201,9 @@ export function PatternFilters({ search, onUpdate }: PatternFiltersProps) {
               <Button
                 key={fw}
                 size="xs"
-                variant={search.forWho === fw ? "solid" : "outline"}
-                colorPalette={search.forWho === fw ? "teal" : "gray"}
-                onClick={() => toggle("forWho", fw)}
+                variant={isSelected("forWho", fw) ? "solid" : "outline"}
+                colorPalette={isSelected("forWho", fw) ? "teal" : "gray"}
+                onClick={() => toggleAnyOf("forWho", fw)}
                 borderRadius="full"
               >
                 {t(`for_who_categories.${fw}`)}
@@ -162,9 +220,9 @@ export function PatternFilters({ search, onUpdate }: PatternFiltersProps) {
               <Button
                 key={cat}
                 size="xs"
-                variant={search.category === cat ? "solid" : "outline"}
-                colorPalette={search.category === cat ? "teal" : "gray"}
-                onClick={() => toggle("category", cat)}
+                variant={isSelected("category", cat) ? "solid" : "outline"}
+                colorPalette={isSelected("category", cat) ? "teal" : "gray"}
+                onClick={() => toggleAnyOf("category", cat)}
                 borderRadius="full"
               >
                 {t(`categories.${cat}`)}
@@ -181,9 +239,9 @@ export function PatternFilters({ search, onUpdate }: PatternFiltersProps) {
               <Button
                 key={brand}
                 size="xs"
-                variant={search.brand === brand ? "solid" : "outline"}
-                colorPalette={search.brand === brand ? "teal" : "gray"}
-                onClick={() => toggle("brand", brand)}
+                variant={isSelected("brand", brand) ? "solid" : "outline"}
+                colorPalette={isSelected("brand", brand) ? "teal" : "gray"}
+                onClick={() => toggleAnyOf("brand", brand)}
                 borderRadius="full"
               >
                 {brand === "Other" ? t("brand_null") : brand}
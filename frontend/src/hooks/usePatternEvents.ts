@@ -0,0 +1,116 @@
+import { type QueryClient, useQueryClient } from "@tanstack/react-query"
+import { useEffect } from "react"
+
+import { OpenAPI, type PatternPublic } from "@/client"
+
+type PatternEvent = {
+  id: string
+  owner_id: string
+  // The pattern as it is now, null once deleted
+  pattern: PatternPublic | null
+}
+
+// EventSource can't send the Authorization header, the stream is read with fetch
+const resolveToken = async () =>
+  typeof OpenAPI.TOKEN === "function"
+    ? OpenAPI.TOKEN({ method: "GET", url: "/api/v1/patterns/events" })
+    : OpenAPI.TOKEN
+
+function applyEvent(queryClient: QueryClient, name: string, data: string) {
+  if (name === "reset") {
+    // Events were missed, everything shown is refetched
+    queryClient.invalidateQueries({ queryKey: ["patterns"] })
+    queryClient.invalidateQueries({ queryKey: ["pattern"] })
+    return
+  }
+  const event: PatternEvent = JSON.parse(data)
+  if (event.pattern) {
+    queryClient.setQueryData(["pattern", event.id], event.pattern)
+  } else {
+    queryClient.removeQueries({ queryKey: ["pattern", event.id] })
+  }
+  // The listings depend on their filters and sort, they are refetched
+  queryClient.invalidateQueries({ queryKey: ["patterns"] })
+}
+
+/**
+ * Keeps the cached patterns up to date with the changes streamed by the
+ * API, resuming after the last event received when the stream ends.
+ */
+const usePatternEvents = () => {
+  const queryClient = useQueryClient()
+
+  useEffect(() => {
+    const controller = new AbortController()
+    let lastEventId: string | null = null
+    let retry = 3000
+
+    const read = async () => {
+      const token = await resolveToken()
+      const response = await fetch(`${OpenAPI.BASE}/api/v1/patterns/events`, {
+        headers: {
+          Accept: "text/event-stream",
+          ...(token ? { Authorization: `Bearer ${token}` } : {}),
+          ...(lastEventId ? { "Last-Event-ID": lastEventId } : {}),
+        },
+        signal: controller.signal,
+      })
+      if (!response.ok || !response.body) {
+        throw new Error(`Pattern events answered ${response.status}`)
+      }
+      const reader = response.body.pipeThrough(new TextDecoderStream()).getReader()
+      let buffer = ""
+      for (;;) {
+        const { value, done } = await reader.read()
+        if (done) {
+          return
+        }
+        buffer += value
+        let end = buffer.indexOf("\n\n")
+        while (end !== -1) {
+          const fields: Record<string, string> = {}
+          for (const line of buffer.slice(0, end).split("\n")) {
+            const separator = line.indexOf(": ")
+            // Lines starting with a colon are heartbeats
+            if (separator > 0) {
+              fields[line.slice(0, separator)] = line.slice(separator + 2)
+            }
+          }
+          buffer = buffer.slice(end + 2)
+          end = buffer.indexOf("\n\n")
+          if (fields.retry) {
+            retry = Number(fields.retry)
+          }
+          if (fields.id) {
+            lastEventId = fields.id
+          }
+          if (fields.event === "reset") {
+            // Resuming would be reset again, the next stream starts live
+            lastEventId = null
+          }
+          if (fields.event) {
+            applyEvent(queryClient, fields.event, fields.data)
+          }
+        }
+      }
+    }
+
+    const run = async () => {
+      while (!controller.signal.aborted) {
+        try {
+          // Streams end after a while, the next one resumes right away
+          await read()
+        } catch {
+          if (controller.signal.aborted) {
+            return
+          }
+          await new Promise((resolve) => setTimeout(resolve, retry))
+        }
+      }
+    }
+    run()
+    return () => controller.abort()
+  }, [queryClient])
+}
+
+export default usePatternEvents
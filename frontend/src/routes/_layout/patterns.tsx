@@ -9,17 +9,21 @@ import {
   Image,
   Badge, Spinner, Center, Text
 } from "@chakra-ui/react"
-import { useState, useEffect } from 'react';
 import { useQuery } from "@tanstack/react-query"
 import { createFileRoute, useNavigate } from "@tanstack/react-router"
 import { FiSearch } from "react-icons/fi"
 import { z } from "zod"
-import { PatternsService, OpenAPI } from "@/client"
-import { getHeaders } from "@/client/core/request"
+import {
+  type PatternsPartialPublic,
+  type PatternsReadPatternsData,
+  PatternsService,
+  OpenAPI,
+} from "@/client"
 import { PatternActionsMenu } from "@/components/Common/PatternActionsMenu"
 import AddPatternAndFiles from "@/components/Patterns/AddPatternAndFiles"
 import { PatternFilters } from "@/components/Patterns/PatternFilters"
 import PendingPatterns from "@/components/Pending/PendingPatterns"
+import usePatternEvents from "@/hooks/usePatternEvents"
 import {
   PaginationItems,
   PaginationNextTrigger,
@@ -34,18 +38,43 @@ import { Suspense } from "react"
 
 const patternsSearchSchema = z.object({
   page: z.number().catch(1),
-  title: z.string().optional(),
-  brand: z.string().optional(),
-  category: z.string().optional(),
-  forWho: z.string().optional(),
+  q: z.string().optional(),
+  brand: z.array(z.string()).optional(),
+  category: z.array(z.string()).optional(),
+  forWho: z.array(z.string()).optional(),
   version: z.string().optional(),
   difficulty: z.number().optional(),
   selfPatterns: z.boolean().optional(),
+  sort: z
+    .enum([
+      "title",
+      "-title",
+      "difficulty",
+      "-difficulty",
+      "fabric_amount",
+      "-fabric_amount",
+      "created_at",
+      "-created_at",
+      "updated_at",
+      "-updated_at",
+    ])
+    .optional(),
 })
 
 export type PatternsSearch = z.infer<typeof patternsSearchSchema>
 
 const PER_PAGE = 10
+// Only the fields shown in the grid are fetched
+const GRID_FIELDS = [
+  "id",
+  "owner_id",
+  "title",
+  "brand",
+  "category",
+  "for_who",
+  "fabric_amount",
+  "icon",
+]
 
 function getPatternsQueryOptions(search: PatternsSearch) {
   return {
@@ -53,14 +82,17 @@ function getPatternsQueryOptions(search: PatternsSearch) {
       PatternsService.readPatterns({
         skip: (search.page - 1) * PER_PAGE,
         limit: PER_PAGE,
-        title: search.title,
-        brand: search.brand,
-        category: search.category,
-        forWho: search.forWho,
-        version: search.version,
+        q: search.q,
+        // Values of the URL, an unknown one is answered with a 422
+        brand: search.brand as PatternsReadPatternsData["brand"],
+        category: search.category as PatternsReadPatternsData["category"],
+        forWho: search.forWho as PatternsReadPatternsData["forWho"],
+        version: search.version as PatternsReadPatternsData["version"],
         difficulty: search.difficulty,
         selfPatterns: search.selfPatterns,
-      }),
+        sort: search.sort,
+        fields: GRID_FIELDS.join(","),
+      }) as Promise<PatternsPartialPublic>,
     queryKey: ["patterns", search],
   }
 }
@@ -147,7 +179,7 @@ function PatternsTable() {
           {patterns?.map((pattern) => (
             <Table.Row key={pattern.id} opacity={isPlaceholderData ? 0.5 : 1}>
               <Table.Cell truncate maxW="sm">
-                <IconImage filename={pattern.icon ?? ""} alt={pattern.title} />
+                <IconImage filename={pattern.icon ?? ""} alt={pattern.title ?? ""} />
               </Table.Cell>
               <Table.Cell truncate maxW="sm">
                 <Text
@@ -213,6 +245,7 @@ function Patterns() {
   const { t, ready } = useTranslation('pattern');
   const navigate = useNavigate({ from: Route.fullPath })
   const search = Route.useSearch()
+  usePatternEvents()
 
   const handleFilterUpdate = (updates: Partial<PatternsSearch>) => {
     navigate({
@@ -247,40 +280,14 @@ function Patterns() {
 }
 
 const IconImage = ({ filename, alt }: { filename: string; alt: string }) => {
-  const [imageUrl, setImageUrl] = useState<string | null>(null);
-
-  useEffect(() => {
-    const fetchImage = async () => {
-      if (filename) {
-        try {
-          const headers = await getHeaders(OpenAPI, {
-            method: "GET",
-            url: "/api/v1/patterns/download/{filename}",
-            path: { filename },
-          })
-          const baseUrl = OpenAPI.BASE
-          const response = await fetch(`${baseUrl}/api/v1/patterns/download/${filename}`, {
-            method: "GET",
-            headers,
-          })
-
-          if (!response.ok) throw new Error("Download failed");
-
-          const blob = await response.blob();
-          const objectURL = URL.createObjectURL(blob);
-          setImageUrl(objectURL);
-        } catch (error) {
-          console.error('Error loading image:', error);
-        }
-      }
-    };
-
-    fetchImage();
-  }, [filename]);
-
+  // Icons are public and immutable, the browser serves them from its cache
   return (
     <Image
-      src={imageUrl || placeholderImage}
+      src={filename ? `${OpenAPI.BASE}/api/v1/patterns/icons/${filename}` : placeholderImage}
+      onError={(event) => {
+        event.currentTarget.src = placeholderImage
+      }}
+      loading="lazy"
       alt={alt}
       boxSize="90px"
       objectFit="scale-down"
@@ -17,7 +17,7 @@ import {
 } from "@chakra-ui/react"
 import { useQuery } from "@tanstack/react-query"
 import { createFileRoute, useNavigate } from "@tanstack/react-router"
-import { useEffect, useState, Suspense } from "react"
+import { Suspense } from "react"
 import { FaArrowLeft, FaDownload, FaExternalLinkAlt, FaStar } from "react-icons/fa"
 import { saveAs } from "file-saver"
 import { useTranslation } from "react-i18next"
@@ -63,20 +63,34 @@ function PatternDetail() {
   })
 
   const handleDownload = async (filename: string) => {
+    try {
+      // Signed URLs stay the same for a while, so the browser can reuse its cached copy
+      const { url } = await PatternsService.createDownloadUrl({ filename })
+      const response = await fetch(`${OpenAPI.BASE}${url}`)
+      if (!response.ok) throw new Error(t("download_failed"))
+      const blob = await response.blob()
+      saveAs(blob, filename)
+      showSuccessToast(t("file_downloaded"))
+    } catch (error) {
+      console.error(t("download_failed"), error)
+    }
+  }
+
+  const handleDownloadAll = async () => {
     try {
       const headers = await getHeaders(OpenAPI, {
         method: "GET",
-        url: "/api/v1/patterns/download/{filename}",
-        path: { filename },
+        url: "/api/v1/patterns/{id}/bundle.zip",
+        path: { id },
       })
       const baseUrl = OpenAPI.BASE
       const response = await fetch(
-        `${baseUrl}/api/v1/patterns/download/${filename}`,
+        `${baseUrl}/api/v1/patterns/${id}/bundle.zip`,
         { method: "GET", headers },
       )
       if (!response.ok) throw new Error(t("download_failed"))
       const blob = await response.blob()
-      saveAs(blob, filename)
+      saveAs(blob, `${pattern?.title ?? id}.zip`)
       showSuccessToast(t("file_downloaded"))
     } catch (error) {
       console.error(t("download_failed"), error)
@@ -216,9 +230,15 @@ function PatternDetail() {
       </Grid>
 
       <Box>
-        <Heading size="md" mb={4}>
-          {t("pattern_files")}
-        </Heading>
+        <Flex justify="space-between" align="center" mb={4}>
+          <Heading size="md">{t("pattern_files")}</Heading>
+          {FILE_KEYS.some(({ key }) => pattern[key]) && (
+            <Button size="sm" variant="outline" onClick={handleDownloadAll}>
+              <FaDownload />
+              {t("download_all")}
+            </Button>
+          )}
+        </Flex>
         <Grid
           templateColumns={{ base: "1fr", sm: "repeat(2, 1fr)", lg: "repeat(3, 1fr)" }}
           gap={3}
@@ -262,35 +282,17 @@ function PatternDetail() {
 }
 
 function PatternImage({ filename, alt }: { filename: string; alt: string }) {
-  const [imageUrl, setImageUrl] = useState<string | null>(null)
-
-  useEffect(() => {
-    if (!filename) return
-    const fetchImage = async () => {
-      try {
-        const headers = await getHeaders(OpenAPI, {
-          method: "GET",
-          url: "/api/v1/patterns/download/{filename}",
-          path: { filename },
-        })
-        const baseUrl = OpenAPI.BASE
-        const response = await fetch(
-          `${baseUrl}/api/v1/patterns/download/${filename}`,
-          { method: "GET", headers },
-        )
-        if (!response.ok) throw new Error("Download failed")
-        const blob = await response.blob()
-        setImageUrl(URL.createObjectURL(blob))
-      } catch (error) {
-        console.error("Error loading image:", error)
-      }
-    }
-    fetchImage()
-  }, [filename])
-
+  // Icons are public and immutable, the browser serves them from its cache
   return (
     <Image
-      src={imageUrl || placeholderImage}
+      src={
+        filename
+          ? `${OpenAPI.BASE}/api/v1/patterns/icons/${filename}`
+          : placeholderImage
+      }
+      onError={(event) => {
+        event.currentTarget.src = placeholderImage
+      }}
       alt={alt}
       w="full"
       maxH="400px"
@@ -1,4 +1,4 @@
-import type { ApiError } from "./client"
+import { ApiError } from "./client"
 import useCustomToast from "./hooks/useCustomToast"
 
 export const emailPattern = {
@@ -53,3 +53,8 @@ export const handleError = (err: ApiError) => {
   }
   showErrorToast(errorMessage)
 }
+
+// Requests sent with an idempotency key are retried when they got no
+// response, the API answers a retry of a processed one with its response
+export const retryWithoutResponse = (failureCount: number, error: Error) =>
+  failureCount < 3 && !(error instanceof ApiError)